@@ -0,0 +1,51 @@
+"""
+Compare the per-call time of the general transform functions with that
+of specialized (code-generated) positional and keyword functions, for
+each transform in the sample Transform MDF.
+
+usage: python bench/call_overhead.py [--calls N]
+"""
+import argparse
+import time
+from pathlib import Path
+from bento_transforms.mdf import TransformReader
+from bento_transforms.converters.converter import create_transform_function
+from synth import values
+
+SAMPLES = Path(__file__).resolve().parent.parent / "tests" / "samples"
+
+
+def per_call(func, vals, keyword=None):
+    t0 = time.perf_counter()
+    if keyword:
+        for v in vals:
+            func(**{keyword: v})
+    else:
+        for v in vals:
+            func(v)
+    return (time.perf_counter() - t0) / len(vals) * 1e9
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=200_000)
+    args = ap.parse_args()
+    tmdf = TransformReader(SAMPLES / "tf_func_test.yaml",
+                           mdf_schema=SAMPLES / "mdf-schema-tf.yaml")
+    print(f"{'transform':<52} {'general':>9} {'positional':>11} "
+          f"{'keyword':>9}   (ns/call)")
+    for (hdl, gtf) in tmdf.transforms.items():
+        vals = values(gtf, args.calls)
+        (arg,) = [f"{i.Node}_{p}" for i in gtf.Inputs for p in i.Props]
+        general = create_transform_function(gtf)
+        pos = create_transform_function(gtf, handle=hdl, calling="positional")
+        kw = create_transform_function(gtf, handle=hdl, calling="keyword")
+        base = per_call(general, vals)
+        tp = per_call(pos, vals)
+        tk = per_call(kw, vals, keyword=arg)
+        print(f"{hdl:<52} {base:9.0f} {tp:11.0f} {tk:9.0f}   "
+              f"speedup {base / tp:4.2f}x / {base / tk:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
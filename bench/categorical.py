@@ -0,0 +1,49 @@
+"""
+Compare record conversion with and without dictionary-encoding of
+low-cardinality columns, on the race lookup transforms.
+
+usage: python bench/categorical.py [--rows N] [--chunksize N]
+"""
+import argparse
+import time
+from pathlib import Path
+from bento_transforms.mdf import TransformReader
+from bento_transforms.converters.converter import Converter
+
+SAMPLES = Path(__file__).resolve().parent.parent / "tests" / "samples"
+RACES = ["African American", "European", "Asian", "Native American",
+         "Pacific Islander", "Other", "Unknown", "Not Reported"]
+
+
+def records(n):
+    for i in range(n):
+        yield {"race": RACES[(i * 7) % len(RACES)]}
+
+
+def timed(cvtr, rows, chunksize, categorical):
+    t0 = time.perf_counter()
+    for _ in cvtr.convert_records(records(rows), "participant",
+                                  chunksize=chunksize,
+                                  categorical=categorical):
+        pass
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--chunksize", type=int, default=10_000)
+    args = ap.parse_args()
+    cvtr = Converter(tmdf=TransformReader(
+        SAMPLES / "tf_func_test.yaml",
+        mdf_schema=SAMPLES / "mdf-schema-tf.yaml"))
+    base = timed(cvtr, args.rows, args.chunksize, None)
+    print(f"per-row      {args.rows / base:>12,.0f} rows/s")
+    for cat in ("auto", {"race"}):
+        el = timed(cvtr, args.rows, args.chunksize, cat)
+        print(f"{str(cat):<12} {args.rows / el:>12,.0f} rows/s  "
+              f"speedup {base / el:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Compare two benchmark suite results (see suite.py), reporting the ratio
+new/old for each throughput measure, and flagging regressions.
+
+usage: python bench/compare.py old.json new.json [--threshold 0.9]
+
+Exits with status 1 if any throughput fell below threshold * old.
+"""
+import argparse
+import json
+import sys
+
+
+def rates(results):
+    ret = {}
+    for section in ("transforms", "nodes"):
+        for (name, r) in results.get(section, {}).items():
+            for (size, m) in r.items():
+                if not isinstance(m, dict):
+                    continue
+                for (k, v) in m.items():
+                    if k.endswith("rows_per_sec"):
+                        ret[(section, name, size, k)] = v
+    return ret
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("old")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=0.9)
+    args = ap.parse_args()
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    (o, n) = (rates(old), rates(new))
+    print(f"old: {old['meta'].get('commit')}  new: {new['meta'].get('commit')}")
+    regressed = False
+    for key in sorted(o.keys() & n.keys()):
+        ratio = n[key] / o[key]
+        flag = ""
+        if ratio < args.threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(f"{'/'.join(key):<70} {ratio:6.2f}x{flag}")
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Measure Converter.convert_records_parallel throughput against the number
+of worker processes.
+
+usage: python bench/parallel_scaling.py [transforms.yaml] [--rows N]
+           [--chunksize N] [--max-procs N]
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+from bento_transforms.mdf import TransformReader
+from bento_transforms.converters.converter import Converter
+
+SAMPLES = Path(__file__).resolve().parent.parent / "tests" / "samples"
+
+
+def records(n):
+    names = ["James Earl Jones", "Sigismund Leonhart Popbutton",
+             "Ada King Lovelace"]
+    for i in range(n):
+        yield {"personnel_name": names[i % 3],
+               "email_address": f"person{i}@example.com"}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("transforms", nargs="?",
+                    default=SAMPLES / "tf_func_test.yaml")
+    ap.add_argument("--rows", type=int, default=500_000)
+    ap.add_argument("--chunksize", type=int, default=5000)
+    ap.add_argument("--max-procs", type=int, default=os.cpu_count())
+    args = ap.parse_args()
+    cvtr = Converter(tmdf=TransformReader(
+        args.transforms, mdf_schema=SAMPLES / "mdf-schema-tf.yaml"))
+
+    t0 = time.perf_counter()
+    for _ in cvtr.convert_records(records(args.rows), "study_personnel",
+                                  chunksize=args.chunksize):
+        pass
+    base = time.perf_counter() - t0
+    print(f"serial      {args.rows / base:>12,.0f} rows/s")
+    procs = 1
+    while procs <= args.max_procs:
+        t0 = time.perf_counter()
+        for _ in cvtr.convert_records_parallel(
+                records(args.rows), "study_personnel",
+                chunksize=args.chunksize, processes=procs):
+            pass
+        el = time.perf_counter() - t0
+        print(f"processes={procs:<2} {args.rows / el:>12,.0f} rows/s  "
+              f"speedup {base / el:5.2f}x")
+        procs *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark suite: conversion throughput and latency for every transform
+in a Transform MDF file, on synthetic input data (see synth.py).
+
+For each transform and each data size it measures
+
+* cold: the time to build a Converter for the transform, compile it
+  (first Converter.tfunction) and make the first call, starting from an
+  empty step resolution cache;
+* scalar: warm throughput of the tfunction, and per-call latency
+  percentiles (on up to --latency-sample calls);
+* batch: throughput of the columnar bfunction on a whole column;
+
+and for each source node, the throughput of Converter.convert_records on
+synthetic records.
+
+Results are written as JSON (to --out, or stdout), with the commit and
+environment, for comparison across commits with compare.py.
+
+usage: python bench/suite.py [transforms.yaml ...] [--sizes 1000,100000]
+           [--out results.json]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import quantiles
+from bento_transforms.mdf import TransformReader
+from bento_transforms.converters import steps
+from bento_transforms.converters.converter import Converter
+from synth import values, records
+
+SAMPLES = Path(__file__).resolve().parent.parent / "tests" / "samples"
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentiles(ns):
+    qs = quantiles(ns, n=100, method="inclusive")
+    return {"p50_us": qs[49] / 1000, "p90_us": qs[89] / 1000,
+            "p99_us": qs[98] / 1000}
+
+
+def bench_transform(transforms, hdl, sizes, latency_sample):
+    gtf = transforms[hdl]
+    ret = {}
+    vals = values(gtf, 1)
+    steps._resolved.clear()
+    t0 = time.perf_counter_ns()
+    cvtr = Converter(gtfs={hdl: gtf})
+    tf = cvtr.tfunction(hdl)
+    tf(vals[0])
+    ret["cold_us"] = (time.perf_counter_ns() - t0) / 1000
+    bf = cvtr.bfunction(hdl)
+    for n in sizes:
+        vals = values(gtf, n)
+        t0 = time.perf_counter()
+        for v in vals:
+            tf(v)
+        scalar = time.perf_counter() - t0
+        lat = []
+        for v in vals[:latency_sample]:
+            t0 = time.perf_counter_ns()
+            tf(v)
+            lat.append(time.perf_counter_ns() - t0)
+        cols = list(zip(*vals)) if isinstance(vals[0], tuple) else [vals]
+        t0 = time.perf_counter()
+        bf(*cols)
+        batch = time.perf_counter() - t0
+        ret[str(n)] = {
+            "scalar_rows_per_sec": n / scalar,
+            "batch_rows_per_sec": n / batch,
+            **percentiles(lat),
+        }
+    return ret
+
+
+def bench_node(transforms, node, hdls, sizes):
+    ret = {}
+    recs = records([transforms[h] for h in hdls], 1)
+    steps._resolved.clear()
+    t0 = time.perf_counter_ns()
+    cvtr = Converter(gtfs={h: transforms[h] for h in hdls})
+    list(cvtr.convert_records(recs, node))
+    ret["cold_us"] = (time.perf_counter_ns() - t0) / 1000
+    for n in sizes:
+        recs = records([transforms[h] for h in hdls], n)
+        t0 = time.perf_counter()
+        for _ in cvtr.convert_records(recs, node):
+            pass
+        ret[str(n)] = {"rows_per_sec": n / (time.perf_counter() - t0)}
+    return ret
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("transforms", nargs="*",
+                    default=[SAMPLES / "tf_func_test.yaml"])
+    ap.add_argument("--schema", default=SAMPLES / "mdf-schema-tf.yaml")
+    ap.add_argument("--sizes", default="1000,100000")
+    ap.add_argument("--latency-sample", type=int, default=10000)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+    transforms = TransformReader(*args.transforms,
+                                 mdf_schema=args.schema).transforms
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "transforms_files": [str(f) for f in args.transforms],
+            "sizes": sizes,
+        },
+        "transforms": {},
+        "nodes": {},
+        "errors": {},
+    }
+    ok = []
+    for hdl in transforms:
+        try:
+            results["transforms"][hdl] = bench_transform(
+                transforms, hdl, sizes, args.latency_sample)
+            ok.append(hdl)
+        except Exception as e:
+            results["errors"][hdl] = f"{type(e).__name__}: {e}"
+    nodes = {}
+    for hdl in ok:
+        ns = {inp.Node for inp in transforms[hdl].Inputs}
+        if len(ns) == 1:
+            nodes.setdefault(ns.pop(), []).append(hdl)
+    for (node, hdls) in nodes.items():
+        results["nodes"][node] = bench_node(transforms, node, hdls, sizes)
+    out = json.dumps(results, indent=2)
+    if args.out:
+        Path(args.out).write_text(out)
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
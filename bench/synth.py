@@ -0,0 +1,119 @@
+"""
+Synthetic input data for transforms, generated from their definitions.
+
+The kind of value generated for a transform's inputs is chosen by the
+entrypoint of its first step (day counts for arith.days_to_years, full
+names for string.split, race values for the race lookups, ...), and
+failing that, by the input property name. Generation is seeded, so runs
+are reproducible.
+"""
+import random
+import string
+from bento_transforms.tflib.lookup import RACE_CCDI_TO_CDS, RACE_CDS_TO_CCDI
+
+FIRST = ["James", "Sigismund", "Ada", "Grace", "Alan", "Barbara", "Edsger",
+         "Frances", "Donald", "Radia"]
+MIDDLE = ["Earl", "Leonhart", "King", "Brewster", "Mathison", "Jean", "W",
+          "Elizabeth", "Ervin", "Joy"]
+LAST = ["Jones", "Popbutton", "Lovelace", "Hopper", "Turing", "Liskov",
+        "Dijkstra", "Allen", "Knuth", "Perlman"]
+
+
+def _word(rng, n=8):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(n))
+
+
+def _days(rng):
+    return -999 if rng.random() < 0.02 else rng.randint(0, 36500)
+
+
+def _years(rng):
+    return None if rng.random() < 0.02 else round(rng.uniform(0, 100), 2)
+
+
+def _name(rng):
+    return " ".join([rng.choice(FIRST), rng.choice(MIDDLE), rng.choice(LAST)])
+
+
+def _race_ccdi(rng):
+    return rng.choice(list(RACE_CCDI_TO_CDS) + ["Martian"])
+
+
+def _race_cds(rng):
+    return rng.choice(list(RACE_CDS_TO_CCDI) + ["Martian"])
+
+
+def _email(rng):
+    return f"{_word(rng, 6)}@{_word(rng, 5)}.org"
+
+
+def _acl(rng):
+    return rng.choice(["['open']", "['controlled']", "['phs000720']"])
+
+
+def _acronym(rng):
+    return rng.choice(["CCDI-MCI", "TARGET", "CBTN", "OS-PDX", "NBL"])
+
+
+BY_ENTRYPOINT = {
+    "arith.days_to_years": _days,
+    "arith.years_to_days": _years,
+    "string.split": _name,
+    "string.extract_middle_name": _name,
+    "string.normalize_case": _name,
+    "lookup.race_ccdi_to_cds": _race_ccdi,
+    "lookup.race_cds_to_ccdi": _race_cds,
+}
+
+BY_PROP = {
+    "email": _email,
+    "acl": _acl,
+    "acronym": _acronym,
+    "name": _name,
+    "race": _race_ccdi,
+    "age": _days,
+}
+
+
+def generator(gtf):
+    """
+    Return a function of a random.Random that generates one input value
+    (a tuple, for multiple inputs) for transform `gtf`.
+    """
+    gen = BY_ENTRYPOINT.get(gtf.Steps[0].Entrypoint)
+    props = [p for inp in gtf.Inputs for p in inp.Props]
+    gens = []
+    for p in props:
+        g = gen
+        if g is None:
+            g = next((g for (k, g) in BY_PROP.items() if k in p),
+                     lambda rng: _word(rng))
+        gens.append(g)
+    if len(gens) == 1:
+        return gens[0]
+    return lambda rng: tuple(g(rng) for g in gens)
+
+
+def values(gtf, n, seed=0):
+    """Return a list of `n` synthetic input values for transform `gtf`."""
+    rng = random.Random(seed)
+    gen = generator(gtf)
+    return [gen(rng) for _ in range(n)]
+
+
+def records(gtfs, n, seed=0):
+    """
+    Return a list of `n` synthetic source records having every input
+    property of transforms `gtfs` (which should share a source node).
+    """
+    rng = random.Random(seed)
+    gens = {}
+    for gtf in gtfs:
+        gen = generator(gtf)
+        props = [p for inp in gtf.Inputs for p in inp.Props]
+        if len(props) == 1:
+            gens.setdefault(props[0], gen)
+        else:
+            for (i, p) in enumerate(props):
+                gens.setdefault(p, lambda rng, gen=gen, i=i: gen(rng)[i])
+    return [{p: g(rng) for (p, g) in gens.items()} for _ in range(n)]
@@ -0,0 +1,44 @@
+"""
+Compare the throughput of minting deterministic (version 5) UUIDs with
+ids.generate_uuid called per row, and with its batch kernel, as strings
+and as binary UUIDs.
+
+usage: python bench/uuid_mint.py [--rows N]
+"""
+import argparse
+import time
+from bento_transforms.tflib.ids import generate_uuid, generate_uuid_batch
+from bento_transforms.tflib.pymodels import UuidNS
+
+
+def timed(func, *args):
+    t0 = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    args = ap.parse_args()
+    study = ["phs002431"] * args.rows
+    pids = [f"PT_{i:08d}" for i in range(args.rows)]
+    seeds = list(zip(study, pids))
+    params = UuidNS()
+    binary = UuidNS(binary=True)
+    base = timed(lambda: [generate_uuid(s, params) for s in seeds])
+    print(f"scalar         {args.rows / base:>12,.0f} ids/s")
+    for (label, func, p) in [
+            ("batch tuples", lambda p: generate_uuid_batch(seeds, params=p),
+             params),
+            ("batch columns",
+             lambda p: generate_uuid_batch(study, pids, params=p), params),
+            ("batch binary",
+             lambda p: generate_uuid_batch(study, pids, params=p), binary)]:
+        el = timed(func, p)
+        print(f"{label:<14} {args.rows / el:>12,.0f} ids/s  "
+              f"speedup {base / el:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+bento_transforms.converters.aggregate
+
+Apply reducer transforms: many source records -> one target value per
+group (see tflib.reduce).
+
+A reducer transform's last step is a reducer; its earlier steps map the
+input values column by column, as in a batch function. Source records are
+fed node by node, `chunksize` at a time; each value of an input property
+of the record's node is mapped and folded into the accumulator of the
+record's group, named by the reducer's `group_by` Param: a column name
+(e.g., 'study.study_id', the link column of a Bento node file), or
+{ <node>: <column> } for sources whose group column differs. Records
+without a group are not counted in any group.
+
+Memory is bounded by the number of groups held, not the number of
+records: when more than `max_groups` accumulators are held, they are
+hash-partitioned by group to temporary files (a spill run) and dropped.
+At the end, each partition's runs are read back in order and their
+accumulators combined with the reducer's merge function, so results do
+not depend on whether (or how often) the aggregation spilled. (Groups
+then come out in partition order rather than first-seen order.)
+"""
+from __future__ import annotations
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Tuple
+from toolz import compose_left, partition_all
+from ..mdf.pymodels import GeneralTransform
+from ..tflib.reduce import is_reducer
+from .steps import batch_step, resolve_step, step_kwargs
+from .join import _load, _records
+
+
+def reducer_step(gtf: GeneralTransform):
+    """
+    Return the function of the last step of `gtf` if it is a reducer
+    (see tflib.reduce), else None.
+    """
+    step = gtf.Steps[-1]
+    if step.Package.Name == "Identity":
+        return None
+    try:
+        method = resolve_step(step)
+    except (RuntimeError, ImportError):
+        return None
+    return method if is_reducer(method) else None
+
+
+class Aggregator:
+    """
+    Streams source records through reducer transform `gtf`, keeping one
+    accumulator per group (see module docstring).
+    """
+    def __init__(self, gtf: GeneralTransform, max_groups: int = 100_000,
+                 partitions: int = 16, spill_dir: str | Path | None = None):
+        self._reducer = reducer_step(gtf)
+        if self._reducer is None:
+            raise RuntimeError(f"Last step '{gtf.Steps[-1].Entrypoint}' is "
+                               "not a reducer")
+        self._slots = [(o.Node, p) for o in gtf.Outputs for p in o.Props]
+        if len(self._slots) != 1:
+            raise RuntimeError("A reducer transform must have exactly one "
+                               "output property")
+        self._params = step_kwargs(gtf.Steps[-1],
+                                   self._reducer).get("params")
+        group_by = getattr(self._params, "group_by", None)
+        if group_by is None:
+            raise RuntimeError(f"Reducer step '{gtf.Steps[-1].Entrypoint}' "
+                               "requires Params 'group_by'")
+        self._props = {}
+        for i in gtf.Inputs:
+            self._props.setdefault(i.Node, []).extend(i.Props)
+        if isinstance(group_by, str):
+            self._group_by = {n: group_by for n in self._props}
+        else:
+            self._group_by = group_by
+            missing = set(self._props) - set(group_by)
+            if missing:
+                raise RuntimeError(f"Params 'group_by' has no column for "
+                                   f"input nodes {sorted(missing)}")
+        funcs = [batch_step(step) for step in gtf.Steps[:-1]]
+        if not funcs:
+            self._map = None
+        elif len(funcs) == 1:
+            self._map = funcs[0]
+        else:
+            self._map = compose_left(*funcs)
+        self._max_groups = max_groups
+        self._partitions = partitions
+        self._spill_dir = spill_dir
+        self._tmp = None
+        self._runs = 0
+        self._accs = {}
+        self.stats = {"records": 0, "ungrouped": 0, "spills": 0}
+
+    @property
+    def nodes(self) -> list:
+        """The source nodes the transform reduces from."""
+        return list(self._props)
+
+    def feed(self, node: str, records: Iterable[dict],
+             chunksize: int = 1000) -> None:
+        """Fold the values of source node `node`'s `records` in."""
+        props = self._props.get(node)
+        if props is None:
+            raise RuntimeError(f"Node '{node}' is not an input of the "
+                               "transform")
+        col = self._group_by[node]
+        (step, params) = (self._reducer, self._params)
+        accs = self._accs
+        for chunk in partition_all(chunksize, records):
+            self.stats["records"] += len(chunk)
+            keys = [rec.get(col) for rec in chunk]
+            for p in props:
+                vals = [rec.get(p) for rec in chunk]
+                if self._map is not None:
+                    vals = self._map(vals)
+                for (k, v) in zip(keys, vals):
+                    if k is None:
+                        continue
+                    accs[k] = step(accs.get(k), v, params)
+            self.stats["ungrouped"] += keys.count(None)
+            if len(accs) > self._max_groups:
+                self._spill()
+                accs = self._accs
+
+    def results(self) -> Iterator[Tuple[object, dict]]:
+        """
+        Yield (group, { <target node>: { <target prop>: <value> } }) for
+        every group fed so far, and reset the Aggregator.
+        """
+        ((node, prop),) = self._slots
+        (final, params) = (self._reducer.final, self._params)
+        for (k, acc) in self._groups():
+            yield (k, {node: {prop: final(acc, params)}})
+
+    def run(self, sources: Dict[str, Iterable[dict] | str | Path],
+            chunksize: int = 1000) -> Iterator[Tuple[object, dict]]:
+        """
+        Feed `sources` ({ <node>: <records or node file path> }) and yield
+        the results.
+        """
+        for (node, source) in sources.items():
+            if node in self._props:
+                self.feed(node, _records(source), chunksize=chunksize)
+        return self.results()
+
+    def _spill(self) -> None:
+        if self._tmp is None:
+            self._tmp = tempfile.TemporaryDirectory(dir=self._spill_dir)
+        n = self._partitions
+        parts = [open(Path(self._tmp.name) / f"r{self._runs}.{i}", "wb")
+                 for i in range(n)]
+        try:
+            for (k, acc) in self._accs.items():
+                pickle.dump((k, acc), parts[hash(k) % n])
+        finally:
+            for f in parts:
+                f.close()
+        self._accs = {}
+        self._runs += 1
+        self.stats["spills"] += 1
+
+    def _groups(self) -> Iterator[Tuple[object, object]]:
+        if self._tmp is None:
+            (accs, self._accs) = (self._accs, {})
+            yield from accs.items()
+            return
+        self._spill()
+        (tmp, runs) = (self._tmp, self._runs)
+        (self._tmp, self._runs) = (None, 0)
+        (merge, params) = (self._reducer.merge, self._params)
+        try:
+            for i in range(self._partitions):
+                accs = {}
+                for r in range(runs):
+                    for (k, acc) in _load(Path(tmp.name) / f"r{r}.{i}"):
+                        accs[k] = (merge(accs[k], acc, params) if k in accs
+                                   else acc)
+                yield from accs.items()
+        finally:
+            tmp.cleanup()
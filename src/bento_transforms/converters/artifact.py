@@ -0,0 +1,150 @@
+"""
+bento_transforms.converters.artifact
+
+Save a Converter to, and load it from, a compiled artifact file, so that
+short-lived workers can skip YAML loading, schema validation and
+pydantic parsing of Transform MDF at startup.
+
+An artifact file is a one-line JSON header followed by a pickled payload.
+The header records
+
+* the artifact format version and the bento-transforms version that
+  wrote it (an artifact from another version is stale);
+* a SHA-256 hash of the source Transform MDF files the Converter was
+  built from (an artifact whose sources have changed is stale);
+* a SHA-256 hash of the payload, checked on load.
+
+The payload holds the Converter's normalized transforms and indexes, and
+the step entrypoints that resolved when it was saved; these are resolved
+again (to warm the resolution cache) on load.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import pickle
+from importlib.metadata import version, PackageNotFoundError
+from pathlib import Path
+from typing import List
+from ..mdf.reader import TransformReader
+from .steps import resolve_step
+
+ARTIFACT_FORMAT = 2
+
+
+def package_version() -> str:
+    try:
+        return version("bento-transforms")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def source_hash(files: tuple | list | None) -> str | None:
+    """
+    Return the SHA-256 hash of the contents of the (local) source files
+    `files`, or None if there are none.
+    """
+    paths = []
+    for f in files or []:
+        if isinstance(f, (list, tuple)):
+            paths.extend(f)
+        else:
+            paths.append(f)
+    paths = [Path(p) for p in paths if Path(p).is_file()]
+    if not paths:
+        return None
+    h = hashlib.sha256()
+    for p in paths:
+        h.update(p.read_bytes())
+    return h.hexdigest()
+
+
+def save_converter(cvtr, path: str | Path) -> dict:
+    """Write Converter `cvtr` to artifact file `path`. Returns the header."""
+    entrypoints = []
+    for gtf in cvtr.transforms.values():
+        for step in gtf.Steps:
+            if step.Package.Name == "Identity":
+                continue
+            try:
+                resolve_step(step)
+            except (RuntimeError, ImportError):
+                continue
+            entrypoints.append(step)
+    payload = pickle.dumps({"converter": cvtr, "entrypoints": entrypoints},
+                           protocol=pickle.HIGHEST_PROTOCOL)
+    header = {
+        "format": ARTIFACT_FORMAT,
+        "bento_transforms": package_version(),
+        "source_hash": cvtr.source_hash,
+        "content_hash": hashlib.sha256(payload).hexdigest(),
+    }
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(json.dumps(header).encode() + b"\n")
+        f.write(payload)
+    os.replace(tmp, path)
+    return header
+
+
+def read_header(path: str | Path) -> dict:
+    """Return the header of artifact file `path`."""
+    with Path(path).open("rb") as f:
+        try:
+            return json.loads(f.readline())
+        except ValueError:
+            raise RuntimeError(f"'{path}' is not a Converter artifact")
+
+
+def is_stale(path: str | Path, yaml_files: List | None = None) -> bool:
+    """
+    Return True if artifact file `path` does not exist, was written by
+    another artifact format or package version, or (if `yaml_files` are
+    given) was built from sources other than `yaml_files`.
+    """
+    if not Path(path).exists():
+        return True
+    header = read_header(path)
+    if (header.get("format") != ARTIFACT_FORMAT or
+            header.get("bento_transforms") != package_version()):
+        return True
+    if yaml_files and header.get("source_hash") != source_hash(yaml_files):
+        return True
+    return False
+
+
+def load_converter(cls, path: str | Path,
+                   yaml_files: List | None = None,
+                   mdf_schema: str | Path | None = None):
+    """
+    Load a Converter (of class `cls`) from artifact file `path`.
+    If `yaml_files` are given and the artifact is stale with respect to
+    them (see is_stale), the Converter is instead built from the YAML,
+    and the artifact rewritten. Otherwise, an artifact of another format
+    or package version raises RuntimeError.
+    """
+    if yaml_files and is_stale(path, yaml_files):
+        cvtr = cls(tmdf=TransformReader(*yaml_files, mdf_schema=mdf_schema))
+        save_converter(cvtr, path)
+        return cvtr
+    with Path(path).open("rb") as f:
+        header = json.loads(f.readline())
+        payload = f.read()
+    if header.get("format") != ARTIFACT_FORMAT:
+        raise RuntimeError(f"Artifact '{path}' has format "
+                           f"{header.get('format')}; expected "
+                           f"{ARTIFACT_FORMAT}")
+    if header.get("bento_transforms") != package_version():
+        raise RuntimeError(f"Artifact '{path}' was written by "
+                           "bento-transforms "
+                           f"{header.get('bento_transforms')}; this is "
+                           f"{package_version()}")
+    if hashlib.sha256(payload).hexdigest() != header.get("content_hash"):
+        raise RuntimeError(f"Artifact '{path}' fails its content hash check")
+    data = pickle.loads(payload)
+    if not isinstance(data["converter"], cls):
+        raise RuntimeError(f"Artifact '{path}' does not hold a {cls.__name__}")
+    for step in data["entrypoints"]:
+        resolve_step(step)
+    return data["converter"]
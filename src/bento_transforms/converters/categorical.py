@@ -0,0 +1,101 @@
+"""
+bento_transforms.converters.categorical
+
+Dictionary-encoded (categorical) columns.
+
+Many source properties have only a handful of distinct values over
+millions of rows. Encoded as a Categorical -- a list of distinct values
+(`categories`) and, per row, the index of its value (`codes`) -- an
+elementwise batch step need only be run on the categories; the result
+is a Categorical with the same codes. Categoricals can be passed to
+batch transform functions and are produced by execution plans for
+low-cardinality columns.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Iterable, Iterator, List, Sequence
+
+
+class Categorical:
+    """A dictionary-encoded column: row i has value categories[codes[i]]."""
+    __slots__ = ("codes", "categories")
+
+    def __init__(self, codes: List[int], categories: List[Any]):
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def encode(cls, values: Iterable) -> Categorical:
+        """
+        Dictionary-encode `values`. Raises TypeError if a value is not
+        hashable.
+        """
+        index = {}
+        codes = [index.setdefault(v, len(index)) for v in values]
+        return cls(codes, list(index))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __iter__(self) -> Iterator:
+        cats = self.categories
+        return (cats[c] for c in self.codes)
+
+    def __getitem__(self, i: int) -> Any:
+        return self.categories[self.codes[i]]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Categorical):
+            other = other.decode()
+        if isinstance(other, (list, tuple)):
+            return self.decode() == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return (f"Categorical({len(self.codes)} rows, "
+                f"{len(self.categories)} categories)")
+
+    def decode(self) -> list:
+        """Return the column as a plain list."""
+        cats = self.categories
+        return [cats[c] for c in self.codes]
+
+    def take(self, rows: Sequence[int]) -> Categorical:
+        """Return the categorical column restricted to `rows`."""
+        codes = self.codes
+        return Categorical([codes[i] for i in rows], self.categories)
+
+    def map(self, func: Callable) -> Categorical:
+        """
+        Apply batch (column) function `func` to the categories only,
+        returning a Categorical with the same codes.
+        """
+        return Categorical(self.codes, list(func(self.categories)))
+
+    def item(self, idx: int) -> Categorical:
+        """
+        For a column of list values (a multi-output step), return the
+        categorical column of element `idx` of each value (None for values
+        with fewer elements).
+        """
+        return Categorical(self.codes,
+                           [v[idx] if isinstance(v, (list, tuple))
+                            and idx < len(v) else None
+                            for v in self.categories])
+
+
+def low_cardinality(column: Sequence, sample: int = 256,
+                    max_ratio: float = 0.2, min_rows: int = 16) -> bool:
+    """
+    Guess whether `column` is worth dictionary-encoding: True if the
+    distinct values in its first `sample` entries are at most `max_ratio`
+    of the entries sampled. Columns shorter than `min_rows`, or with
+    unhashable values, are not.
+    """
+    if len(column) < min_rows:
+        return False
+    head = column[:sample]
+    try:
+        distinct = len(set(head))
+    except TypeError:
+        return False
+    return distinct <= max_ratio * len(head)
@@ -0,0 +1,93 @@
+"""
+bento_transforms.converters.codegen
+
+Generate specialized transform functions.
+
+The general transform function (create_transform_function) accepts its
+inputs positionally or by keyword, dispatches on the input type, checks
+input keys, and runs its steps through a composed pipeline of bound
+partials. When the calling convention is fixed in advance, all of that
+can be decided once: specialize() generates Python source for a function
+with exactly the transform's inputs as arguments, in which the steps are
+fused into a single nested call expression, with their Params bound as
+constants, and Identity steps dropped. As in the general function, a
+list result is returned as a dict of its elements keyed by the outputs
+(zipped, so outputs beyond the list's length are left out), and any
+other result as is. For example, for a transform of one input by two
+steps:
+
+  def tf_lookup_and_prefix(participant_race):
+      ret = f1(f0(participant_race), params=p1_params)
+      if isinstance(ret, list):
+          return dict(zip(outs, ret))
+      return ret
+
+The generated function is compiled once, per transform. It is not
+picklable; a Converter recompiles it where needed.
+"""
+from __future__ import annotations
+import keyword
+import linecache
+import re
+from itertools import count
+from typing import Callable, List, Tuple
+
+CALLING = ("positional", "keyword")
+
+_serial = count()
+
+
+def specialize(name: str, args: List[str], outs: List[str],
+               steps: List[Tuple[Callable | None, dict]],
+               calling: str = "positional") -> Callable:
+    """
+    Return a function of input arguments `args` (positional or
+    keyword-only, per `calling`) that applies `steps` in order, and
+    returns the result as the general transform function does: a list
+    as a dict keyed by `outs`, any other value as is. Each step is a
+    (function, keyword args) pair; a function of None is an Identity
+    step.
+    """
+    if calling not in CALLING:
+        raise RuntimeError(f"Unknown calling convention '{calling}'; "
+                           f"valid conventions are {CALLING}")
+    fname = "tf_" + re.sub(r"\W", "_", name)
+    for a in args:
+        if not a.isidentifier() or keyword.iskeyword(a):
+            raise RuntimeError(f"Transform '{name}': input '{a}' is not a "
+                               "valid argument name")
+    ns = {}
+    expr = ", ".join(args)
+    nvals = len(args)
+    for (i, (func, kw)) in enumerate(steps):
+        if func is None and nvals == 1:
+            continue
+        if func is None:
+            raise RuntimeError(f"Transform '{name}': Identity step on "
+                               f"{nvals} inputs")
+        ns[f"f{i}"] = func
+        call_args = [expr]
+        for (k, v) in kw.items():
+            ns[f"p{i}_{k}"] = v
+            call_args.append(f"{k}=p{i}_{k}")
+        expr = f"f{i}({', '.join(call_args)})"
+        nvals = 1
+    params = ", ".join(args)
+    if calling == "keyword" and args:
+        params = "*, " + params
+    ns["outs"] = tuple(outs)
+    # (argument names are <node>_<prop>, so cannot shadow these names)
+    lines = [f"def {fname}({params}):",
+             f"    ret = {expr}",
+             "    if isinstance(ret, list):",
+             "        return dict(zip(outs, ret))",
+             "    return ret"]
+    src = "\n".join(lines) + "\n"
+    # register the source, so that tracebacks show the generated code
+    filename = f"<transform {name} #{next(_serial)}>"
+    linecache.cache[filename] = (len(src), None, src.splitlines(True),
+                                 filename)
+    exec(compile(src, filename, "exec"), ns)
+    func = ns[fname]
+    func.source = src
+    return func
@@ -8,35 +8,158 @@ from an MDB or from an MDF-Tranform YAML file
 """
 
 from __future__ import annotations
-import importlib
-import json
-from toolz import compose_left, curry
+from toolz import compose_left, partition_all
 from functools import partial, reduce
+from pathlib import Path
 from collections import Counter
-from typing import Callable, List, Tuple
+from typing import Callable, Collection, Iterable, Iterator, List, Tuple
 from ..mdf.pymodels import GeneralTransform
 from ..mdf.reader import TransformReader
+from .steps import (batch_step, output_item, resolve_step, scalar_step,
+                    step_is_pure, step_kwargs)
+from .plan import ExecutionPlan
+from .memo import MemoizedTransform
+from .instrument import Instruments
+from .errors import ErrorBudget, check_on_error, send
+from .codegen import specialize
+from .join import JoinEngine, Links
+from .aggregate import Aggregator, reducer_step
+from .categorical import Categorical
+from .artifact import load_converter, save_converter, source_hash
+from .parallel import convert_records_parallel
+from .files import convert_files
+from .jobs import ConversionJob
 
 
 class Converter:
     def __init__(self, tmdf: TransformReader | None = None,
-                 gtfs: List[GeneralTransform] | None = None):
+                 gtfs: List[GeneralTransform] | None = None,
+                 memo_size: int = 0, memo_policy: str = "lru",
+                 instrument: bool = False, calling: str | None = None):
+        """
+        If `memo_size` > 0, the functions returned by tfunction() for pure
+        transforms are memoized, with caches of at most `memo_size`
+        entries, evicted per `memo_policy` ('lru' or 'fifo').
+        If `instrument` is True, transform functions and execution plans
+        are compiled to record call counts and timings (see stats() and
+        converters.instrument); otherwise they are not instrumented at all.
+        If `calling` is 'positional' or 'keyword', tfunction() returns
+        specialized functions taking their inputs only in that way (see
+        create_transform_function).
+        """
+        self._memo_size = memo_size
+        self._memo_policy = memo_policy
+        self._instruments = Instruments() if instrument else None
+        self._calling = calling
         self._from_model = None
         self._to_model = None
         self._tfnames_by_io = {}
+        self._tfnames_by_input = {}
+        self._tfnames_by_output = {}
+        self._tfnames_by_node = {}
+        self._reducers = []
         self._tfuncs = {}
+        self._bfuncs = {}
+        self._plans = {}
+        self._source_hash = None
         if tmdf:
             self._transforms = tmdf.transforms
+            self._source_hash = source_hash(tmdf.files)
         elif gtfs:
             self._transforms = gtfs
         else:
             raise RuntimeError("Converter constructor requires either MDF"
                                "object or dict of GeneralTransforms")
-        # create signature hash table
-        for hdl in self._transforms:
-            self._tfnames_by_io[
-                hash_gtf_by_io(self._transforms[hdl])
-            ] = hdl
+        # create signature table and property/node indexes
+        for (hdl, gtf) in self._transforms.items():
+            (inp, out) = io_signature(gtf)
+            self._tfnames_by_io[(inp, out)] = hdl
+            for p in dict.fromkeys(inp):
+                self._tfnames_by_input.setdefault(p, []).append(hdl)
+            for p in out:
+                self._tfnames_by_output.setdefault(p, []).append(hdl)
+            if reducer_step(gtf) is not None:
+                self._reducers.append(hdl)
+                continue
+            nodes = {i.Node for i in gtf.Inputs}
+            if len(nodes) == 1:
+                self._tfnames_by_node.setdefault(nodes.pop(), []).append(hdl)
+        self.validate_params()
+
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        # compiled functions, plans and memo caches are rebuilt on demand
+        state["_tfuncs"] = {}
+        state["_bfuncs"] = {}
+        state["_plans"] = {}
+        return state
+
+    @property
+    def source_hash(self) -> str | None:
+        """Hash of the Transform MDF files the Converter was built from."""
+        return self._source_hash
+
+    def save(self, path: str | Path) -> dict:
+        """
+        Save the Converter to compiled artifact file `path` (see
+        converters.artifact). Returns the artifact header.
+        """
+        return save_converter(self, path)
+
+    @classmethod
+    def load(cls, path: str | Path, yaml_files: List | None = None,
+             mdf_schema: str | Path | None = None) -> Converter:
+        """
+        Load a Converter from compiled artifact file `path`. If the
+        Transform MDF `yaml_files` are given, and the artifact is missing
+        or was not built from them as they are now, the Converter is built
+        from the YAML instead and the artifact rewritten; if not, an
+        artifact written by another bento-transforms version raises
+        RuntimeError.
+        """
+        return load_converter(cls, path, yaml_files=yaml_files,
+                              mdf_schema=mdf_schema)
+
+    def resolve_all(self) -> None:
+        """
+        Resolve the function of every step of every transform now, rather
+        than when each transform is first compiled (a warm-up for
+        short-lived workers). Raises a RuntimeError listing all the steps
+        that cannot be resolved.
+        """
+        errs = []
+        for (hdl, gtf) in self._transforms.items():
+            for step in gtf.Steps:
+                if step.Package.Name == "Identity":
+                    continue
+                try:
+                    resolve_step(step)
+                except (RuntimeError, ImportError) as e:
+                    errs.append(f"Transform '{hdl}', step "
+                                f"'{step.Entrypoint}': {e}")
+        if errs:
+            raise RuntimeError("Cannot resolve step entrypoints:\n"
+                               + "\n".join(errs))
+
+    def validate_params(self) -> None:
+        """
+        Validate the Params of every step whose function declares a params
+        model, so that configuration errors surface when the Converter is
+        built. Steps whose entrypoint cannot be imported are left to fail
+        when their transform is compiled.
+        """
+        for (hdl, gtf) in self._transforms.items():
+            for step in gtf.Steps:
+                if step.Package.Name == "Identity":
+                    continue
+                try:
+                    method = resolve_step(step)
+                except (RuntimeError, ImportError):
+                    continue
+                try:
+                    step_kwargs(step, method)
+                except RuntimeError as e:
+                    raise RuntimeError(f"Transform '{hdl}': {e}") from e
 
     @property
     def transforms(self) -> dict:
@@ -66,113 +189,476 @@ class Converter:
         if not self._tfuncs.get(handle):
             if not self._transforms.get(handle):
                 raise RuntimeError(f"No such transform '{handle}'")
+            self._check_not_reducer(handle)
             self._tfuncs[handle] = create_transform_function(
-                self._transforms[handle]
+                self._transforms[handle],
+                instruments=self._instruments, handle=handle,
+                calling=self._calling
             )
+            if self._memo_size > 0 and self.is_pure(handle):
+                self._tfuncs[handle] = MemoizedTransform(
+                    self._tfuncs[handle], maxsize=self._memo_size,
+                    policy=self._memo_policy)
         return self._tfuncs[handle]
 
+    def is_pure(self, handle) -> bool:
+        """
+        Return False if any step of transform `handle` is declared impure
+        (see tflib.purity).
+        """
+        return all(step_is_pure(step)
+                   for step in self._transforms[handle].Steps)
+
+    def memo_stats(self) -> dict:
+        """Return memo cache counters for each memoized transform."""
+        return {hdl: tf.stats() for (hdl, tf) in self._tfuncs.items()
+                if isinstance(tf, MemoizedTransform)}
+
+    @property
+    def instruments(self) -> Instruments | None:
+        """The Converter's Instruments, if created with instrument=True."""
+        return self._instruments
+
+    def stats(self) -> dict:
+        """
+        Return a snapshot of the call counts and timings of the transform
+        functions and execution plans compiled so far (see
+        Instruments.stats()). Calls of memoized transforms answered from
+        the cache are not counted here (see memo_stats()).
+        Requires instrument=True.
+        """
+        if self._instruments is None:
+            raise RuntimeError("Converter was not created with "
+                               "instrument=True")
+        return self._instruments.stats()
+
+    def add_hook(self, hook: Callable) -> None:
+        """
+        Add `hook` to be called with each timed event, as
+        hook(name, step, ns, error) (see converters.instrument).
+        Requires instrument=True.
+        """
+        if self._instruments is None:
+            raise RuntimeError("Converter was not created with "
+                               "instrument=True")
+        self._instruments.add_hook(hook)
+
+    def bfunction(self, handle) -> Callable:
+        """Return the columnar (batch) form of transform `handle`."""
+        if not self._bfuncs.get(handle):
+            if not self._transforms.get(handle):
+                raise RuntimeError(f"No such transform '{handle}'")
+            self._check_not_reducer(handle)
+            self._bfuncs[handle] = create_batch_function(
+                self._transforms[handle]
+            )
+        return self._bfuncs[handle]
+
+    def _check_not_reducer(self, handle) -> None:
+        if handle in self._reducers:
+            raise RuntimeError(f"Transform '{handle}' is a reducer; apply "
+                               "it with aggregate()")
+
     def convert(self, frm: str | List[str], to: str | List(str)) -> Callable:
         if isinstance(frm, str):
             frm = [frm]
         if isinstance(to, str):
             to = [to]
-        idx = hash(json.dumps([sorted(frm), sorted(to)]))
+        idx = (tuple(sorted(frm)), tuple(sorted(to)))
         if not self._tfnames_by_io.get(idx):
             raise RuntimeError(f"No transformation available with inputs '{frm}' and outputs '{to}'")
         return self.tfunction(self._tfnames_by_io[idx])
 
+    def transforms_for_node(self, node: str) -> List[str]:
+        """
+        Return the handles of transforms whose inputs all come from
+        source node `node`.
+        """
+        return list(self._tfnames_by_node.get(node, []))
 
-def create_transform_function(gtf: GeneralTransform) -> Callable:
-    def porcelain(func: Callable, *args, **kwargs):
-        if args:
-            return func(args)
-        elif kwargs:
-            return func(kwargs)
-        else:
-            return func()
-        
-    def wrapper(inp,
-                func: Callable, arglist: List[str],
-                outlist: List[str]):
-        if isinstance(inp, Tuple | List):
-            ret = func(*inp)
-        elif isinstance(inp, dict):
-            if not {k for k in inp} <= {a for a in arglist}:
-                raise RuntimeError("Invalid input. "
-                                   f"Valid input keys are '{arglist}'")
-            # this creates a list of args in the correct order
-            rrgs = [inp[a] for a in arglist if a in inp]
-            ret = func(*rrgs)
-        else:
-            ret = func(*[inp])
-        if isinstance(ret, list):
-            # return dict
-            return {x: y for (x, y) in zip(outlist, ret)}
-        else:
-            # return value
-            return ret
+    def joined_transforms(self) -> List[str]:
+        """
+        Return the handles of transforms whose inputs come from more than
+        one source node (see convert_joined()).
+        """
+        single = {h for hdls in self._tfnames_by_node.values() for h in hdls}
+        return [hdl for hdl in self._transforms
+                if hdl not in single and hdl not in self._reducers]
 
-    args = []
-    for inp in gtf.Inputs:
-        for prop in inp.Props:
-            args.append(inp.Node+"_"+prop)
-    outs = []
-    for outp in gtf.Outputs:
-        for prop in outp.Props:
-            outs.append(outp.Node+"_"+prop)
+    def reducer_transforms(self) -> List[str]:
+        """
+        Return the handles of transforms whose last step is a reducer
+        (see tflib.reduce and aggregate()).
+        """
+        return list(self._reducers)
+
+    def transforms_consuming(self, prop: str) -> List[str]:
+        """
+        Return the handles of transforms having source property `prop`
+        (as '<node>.<prop>') among their inputs.
+        """
+        return list(self._tfnames_by_input.get(prop, []))
+
+    def transforms_producing(self, prop: str) -> List[str]:
+        """
+        Return the handles of transforms having target property `prop`
+        (as '<node>.<prop>') among their outputs.
+        """
+        return list(self._tfnames_by_output.get(prop, []))
+
+    def computable_from(self, props: Iterable[str]) -> List[str]:
+        """
+        Return the handles of transforms all of whose inputs are among
+        source properties `props` (as '<node>.<prop>'), i.e., everything
+        that can be computed from a record having those properties.
+        """
+        found = Counter(hdl for p in set(props)
+                        for hdl in self._tfnames_by_input.get(p, []))
+        return [hdl for (hdl, n) in found.items()
+                if len(set(io_signature(self._transforms[hdl])[0])) == n]
+
+    def find_transforms(self, frm: str | List[str] | None = None,
+                        to: str | List[str] | None = None) -> List[str]:
+        """
+        Return the handles of transforms whose inputs include all of `frm`
+        and whose outputs include all of `to` (properties as
+        '<node>.<prop>'); a partial-signature version of convert().
+        """
+        if isinstance(frm, str):
+            frm = [frm]
+        if isinstance(to, str):
+            to = [to]
+        found = None
+        for (index, props) in ((self._tfnames_by_input, frm or []),
+                               (self._tfnames_by_output, to or [])):
+            for p in props:
+                hdls = set(index.get(p, []))
+                found = hdls if found is None else found & hdls
+        if found is None:
+            return list(self._transforms)
+        return [hdl for hdl in self._transforms if hdl in found]
+
+    def convert_records(self, records: Iterable[dict], source_node: str,
+                        chunksize: int = 1000,
+                        categorical: str | Collection[str] | None = "auto",
+                        on_error: str = "raise",
+                        dead_letter: Callable | None = None,
+                        max_errors: int | None = None,
+                        max_error_rate: float | None = None
+                        ) -> Iterator[dict]:
+        """
+        Apply every transform that can be computed from a `source_node`
+        record to each record in `records`.
+        Yields one dict per source record, of the form
+        { <target node>: { <target prop>: <value>, ... }, ... }.
+        Records are consumed `chunksize` at a time, so memory use does not
+        depend on the length of `records`. Each chunk is converted column
+        by column by the node's execution plan (see plan()); low-cardinality
+        columns are dictionary-encoded per `categorical` (see
+        ExecutionPlan.execute()).
+
+        With `on_error` 'raise' (the default), a failing step raises. With
+        'collect', records on which a step fails lack the outputs of the
+        transforms using it, and an error record (see converters.errors)
+        for each failure is passed to `dead_letter` (a callable, e.g. a
+        converters.errors.JsonLinesSink). The job stops with a
+        RuntimeError once more than `max_errors` errors, or a fraction of
+        more than `max_error_rate` of the records, have failed; the chunk
+        in which that happens is still yielded first.
+        """
+        check_on_error(on_error)
+        plan = self.plan(source_node)
+        if on_error == "raise":
+            for chunk in partition_all(chunksize, records):
+                yield from plan.execute(chunk, categorical=categorical)
+            return
+        budget = ErrorBudget(max_errors=max_errors, max_rate=max_error_rate)
+        offset = 0
+        for chunk in partition_all(chunksize, records):
+            errs = []
+            outs = plan.execute(chunk, categorical=categorical, errors=errs)
+            send(errs, dead_letter, offset)
+            offset += len(chunk)
+            try:
+                budget.check(len(chunk), len(errs))
+            except RuntimeError:
+                yield from outs
+                raise
+            yield from outs
+
+    def convert_columns(self, records: Iterable[dict], source_node: str,
+                        chunksize: int = 1000,
+                        categorical: str | Collection[str] | None = "auto"
+                        ) -> Iterator[dict]:
+        """
+        As convert_records, but yield each converted chunk by column, as
+        { <target node>: { <target prop>: <column>, ... }, ... }.
+        Dictionary-encoded output columns are yielded as Categoricals.
+        """
+        plan = self.plan(source_node)
+        for chunk in partition_all(chunksize, records):
+            yield plan.execute_columns(chunk, categorical=categorical)
+
+    def plan(self, source_node: str) -> ExecutionPlan:
+        """
+        Return the execution plan for the transforms applicable to
+        `source_node` records. Plans are compiled once and cached.
+        """
+        if not self._plans.get(source_node):
+            self._plans[source_node] = ExecutionPlan(
+                source_node,
+                {hdl: self._transforms[hdl]
+                 for hdl in self.transforms_for_node(source_node)},
+                instruments=self._instruments)
+        return self._plans[source_node]
+
+    def plans(self) -> dict:
+        """
+        Return execution plans covering every transform whose inputs come
+        from a single source node, keyed by source node.
+        """
+        return {n: self.plan(n) for n in self._tfnames_by_node}
+
+    def convert_records_parallel(self, records: Iterable[dict],
+                                 source_node: str, chunksize: int = 1000,
+                                 processes: int | None = None,
+                                 ordered: bool = True) -> Iterator[dict]:
+        """
+        As convert_records, but convert chunks of records in a pool of
+        `processes` worker processes (default: one per CPU). If `ordered`
+        is False, chunks are yielded as soon as they are done, rather than
+        in input order.
+        """
+        return convert_records_parallel(
+            self.plan(source_node), records,
+            chunksize=chunksize, processes=processes, ordered=ordered)
+
+    def join_engine(self, handle: str, links: Links,
+                    **kwargs) -> JoinEngine:
+        """
+        Return a JoinEngine for transform `handle`, joining its input nodes
+        along child -> parent `links` (see converters.join for the form of
+        `links`, and for options).
+        """
+        if not self._transforms.get(handle):
+            raise RuntimeError(f"No such transform '{handle}'")
+        return JoinEngine(self._transforms[handle], links, **kwargs)
+
+    def convert_joined(self, handle: str, sources: dict, links: Links,
+                       batch_size: int = 1000,
+                       **kwargs) -> Iterator[Tuple[dict, dict]]:
+        """
+        Apply transform `handle`, whose inputs span several source nodes,
+        to the records of `sources` ({ <node>: <records or node file> }),
+        hash-joined along `links`. Yields (probe record, output), where
+        output is { <target node>: { <target prop>: <value> } }, and the
+        probe record is the record of the transform's most-child input
+        node. See converters.join.
+        """
+        engine = self.join_engine(handle, links, **kwargs)
+        return engine.run(self.bfunction(handle), sources,
+                          batch_size=batch_size)
+
+    def aggregator(self, handle: str, **kwargs) -> Aggregator:
+        """
+        Return an Aggregator for reducer transform `handle`, to feed
+        source records to incrementally (see converters.aggregate for
+        options).
+        """
+        if not self._transforms.get(handle):
+            raise RuntimeError(f"No such transform '{handle}'")
+        return Aggregator(self._transforms[handle], **kwargs)
+
+    def aggregate(self, handle: str, sources: dict, chunksize: int = 1000,
+                  **kwargs) -> Iterator[Tuple[object, dict]]:
+        """
+        Apply reducer transform `handle` to the records of `sources`
+        ({ <node>: <records or node file> }). Yields (group, output) for
+        each group, where output is { <target node>: { <target prop>:
+        <value> } }. See converters.aggregate.
+        """
+        return self.aggregator(handle, **kwargs).run(sources,
+                                                     chunksize=chunksize)
+
+    def convert_files(self, sources: dict, outdir: str | Path,
+                      **kwargs) -> dict:
+        """
+        Stream-convert source node files `sources`
+        ({ <source node>: <path> }) into a file per target node in
+        `outdir`. See converters.files.convert_files for options.
+        Returns the output files and per-stage rows/sec statistics.
+        """
+        return convert_files(self, sources, outdir, **kwargs)
+
+    def conversion_job(self, jobdir: str | Path, sources: dict,
+                       **kwargs) -> ConversionJob:
+        """
+        Create (or reopen, to resume) a checkpointed, partitioned job
+        converting source node files `sources` ({ <source node>: <path> })
+        in directory `jobdir`; run it with its run() or work() methods.
+        See converters.jobs for options.
+        """
+        return ConversionJob.create(jobdir, self, sources, **kwargs)
+
+
+def create_transform_function(gtf: GeneralTransform,
+                              instruments: Instruments | None = None,
+                              handle: str | None = None,
+                              calling: str | None = None) -> Callable:
+    """
+    Create the scalar form of a transform. If `instruments` is given, the
+    function and each of its steps record their timings there, under
+    transform `handle`.
+    By default, the function takes its inputs positionally, by keyword
+    (<node>_<prop>), or as a single list or dict. If `calling` is
+    'positional' or 'keyword', a function specialized to the transform
+    taking its inputs only in that way is generated instead (see
+    converters.codegen), which avoids the per-call dispatch; it is not
+    picklable.
+    """
+    (args, outs) = io_names(gtf)
     tf_func = None
     funcs = []
     for step in gtf.Steps:
-        mod = step.Package.Name
-        if (mod == "Identity"):
-            funcs.append(lambda x: x)
-            continue
-        ep = step.Entrypoint.split(".")
-        mth = ep.pop()
-        method = None
-        if len(ep) > 0:
-            qmod = ".".join([mod]+ep)
-        try:
-            module = importlib.import_module(qmod)
-            if hasattr(module, mth):
-                method = getattr(module, mth)
-        except ModuleNotFoundError:
-            # check if imported to the top level via __init__.py
-            module = importlib.import_module(".".join([mod, "__init__"]))
-            if hasattr(module, ".".join(ep)):
-                method = getattr(getattr(module, ".".join(ep)), mth)
-        if method is None:
-            raise RuntimeError(f"Module {mod} has no method '{mth}'")
-        if step.Params is not None:
-            method = curry(method)
-            method = method(params=step.Params)
-            if not isinstance(method, Callable):
-                RuntimeError("Didn't get a function back from a curried function; check the transformation implementation")
-        funcs.append(method)
+        funcs.append(scalar_step(step))
+    if instruments is not None:
+        funcs = instruments.instrument_steps(
+            handle, [(s.Entrypoint, f) for (s, f) in zip(gtf.Steps, funcs)])
+    if calling is not None:
+        if instruments is not None:
+            steps = [(f, {}) for f in funcs]
+        else:
+            steps = [_unbound_step(step) for step in gtf.Steps]
+        tf = specialize(handle or "transform", args, outs, steps,
+                        calling=calling)
     if len(funcs) == 1:
         tf_func = funcs.pop()
     else:
         tf_func = compose_left(*funcs)
 
-    wrapper = curry(wrapper)
-    tf = partial(porcelain, wrapper(func=tf_func, arglist=args, outlist=outs))
+    if calling is None:
+        # built from module-level functions and partials so that the
+        # result can be pickled (e.g., sent to a process pool)
+        tf = partial(_porcelain,
+                     partial(_wrapper, func=tf_func, arglist=args,
+                             outlist=outs))
+    if instruments is not None:
+        tf = instruments.instrument_transform(handle, tf)
     tf.__setattr__("inputs", gtf.Inputs)
     tf.__setattr__("outputs", gtf.Outputs)
+    tf.__setattr__("pipeline", tf_func)
     return tf
 
 
-def hash_gtf_by_io(gtf: GeneralTransform) -> int:
-    inp = []
-    out = []
-    for item in gtf.Inputs:
-        node = item.Node
-        for p in item.Props:
-            inp.append(f"{node}.{p}")
-    for item in gtf.Outputs:
-        node = item.Node
-        for p in item.Props:
-            out.append(f"{node}.{p}")
-    inp.sort()
-    out.sort()
-    return hash(json.dumps([inp, out]))
-    
+def _unbound_step(step) -> Tuple[Callable | None, dict]:
+    # a step's function and its Params keyword args; None for Identity
+    if step.Package.Name == "Identity":
+        return (None, {})
+    method = resolve_step(step)
+    return (method, step_kwargs(step, method))
+
+
+def create_batch_function(gtf: GeneralTransform) -> Callable:
+    """
+    Create the columnar form of a transform. The returned function takes
+    one column (list or array) of values per input property, either
+    positionally or keyed as for create_transform_function, and returns
+    a column of output values, or a dict of output columns when the
+    transform has more than one output (holding None where a step
+    returned fewer values than there are outputs).
+    Steps with a registered batch kernel (see tflib.kernels) get the
+    whole column; other steps are run element by element. A single
+    Categorical input column is converted by its categories only, and
+    gives Categorical output columns.
+    """
+    (args, outs) = io_names(gtf)
+    funcs = []
+    for step in gtf.Steps:
+        funcs.append(batch_step(step))
+    if len(funcs) == 1:
+        tf_func = funcs.pop()
+    else:
+        tf_func = compose_left(*funcs)
+    bf = partial(_batch, func=tf_func, arglist=args, outlist=outs)
+    bf.__setattr__("inputs", gtf.Inputs)
+    bf.__setattr__("outputs", gtf.Outputs)
+    bf.__setattr__("pipeline", tf_func)
+    return bf
+
+
+def _porcelain(func: Callable, *args, **kwargs):
+    if args:
+        return func(args)
+    elif kwargs:
+        return func(kwargs)
+    else:
+        return func()
+
+
+def _wrapper(inp,
+             func: Callable, arglist: List[str],
+             outlist: List[str]):
+    if isinstance(inp, Tuple | List):
+        ret = func(*inp)
+    elif isinstance(inp, dict):
+        if not {k for k in inp} <= {a for a in arglist}:
+            raise RuntimeError("Invalid input. "
+                               f"Valid input keys are '{arglist}'")
+        # this creates a list of args in the correct order
+        rrgs = [inp[a] for a in arglist if a in inp]
+        ret = func(*rrgs)
+    else:
+        ret = func(*[inp])
+    if isinstance(ret, list):
+        # return dict
+        return {x: y for (x, y) in zip(outlist, ret)}
+    else:
+        # return value
+        return ret
+
+
+def _batch(*columns, func: Callable, arglist: List[str],
+           outlist: List[str], **named):
+    if named:
+        if not {k for k in named} <= {a for a in arglist}:
+            raise RuntimeError("Invalid input. "
+                               f"Valid input keys are '{arglist}'")
+        columns = [named[a] for a in arglist if a in named]
+    if len(columns) == 1 and isinstance(columns[0], Categorical):
+        ret = columns[0].map(func)
+        if len(outlist) > 1:
+            return {o: ret.item(i) for (i, o) in enumerate(outlist)}
+        return ret
+    ret = func(*columns)
+    if len(outlist) > 1:
+        # transpose list-valued rows into output columns; rows with
+        # fewer values than outputs give None in the missing columns
+        return {o: [output_item(r, i) for r in ret]
+                for (i, o) in enumerate(outlist)}
+    return ret
+
+
+def io_names(gtf: GeneralTransform) -> Tuple[List[str], List[str]]:
+    """
+    Return the argument names (<node>_<prop>) for the inputs and
+    outputs of a transform, in order.
+    """
+    args = []
+    for inp in gtf.Inputs:
+        for prop in inp.Props:
+            args.append(inp.Node+"_"+prop)
+    outs = []
+    for outp in gtf.Outputs:
+        for prop in outp.Props:
+            outs.append(outp.Node+"_"+prop)
+    return (args, outs)
+
+
+def io_signature(gtf: GeneralTransform) -> Tuple[Tuple[str], Tuple[str]]:
+    """
+    Return the sorted input and output properties of a transform, as
+    '<node>.<prop>' strings.
+    """
+    inp = sorted(f"{item.Node}.{p}" for item in gtf.Inputs for p in item.Props)
+    out = sorted(f"{item.Node}.{p}" for item in gtf.Outputs for p in item.Props)
+    return (tuple(inp), tuple(out))
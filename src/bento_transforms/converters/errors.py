@@ -0,0 +1,115 @@
+"""
+bento_transforms.converters.errors
+
+Error collection for non-raising conversion (on_error='collect').
+
+When a step fails on some value, the conversion of the other records
+continues: the failing records get no output from the transforms that
+depend on that step, and an error record is sent to a dead-letter sink.
+An error record is a dict:
+
+  { 'record': <index of the source record in the job>,
+    'handles': [ <transforms using the step>, ... ],
+    'entrypoint': <step entrypoint>,
+    'input': [ <step input values>, ... ],
+    'error': <exception class name>,
+    'message': <exception message> }
+
+An ErrorBudget stops the job (raising RuntimeError) when too many errors
+have been collected.
+"""
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Callable, List
+
+ON_ERROR = ("raise", "collect")
+
+
+def error_record(record: int, handles: List[str], entrypoint: str,
+                 inputs: list, exc: Exception) -> dict:
+    return {
+        "record": record,
+        "handles": list(handles),
+        "entrypoint": entrypoint,
+        "input": list(inputs),
+        "error": type(exc).__name__,
+        "message": str(exc),
+    }
+
+
+class ErrorBudget:
+    """
+    Counts the errors and records of a job, and raises RuntimeError on
+    check() once more than `max_errors` errors, or a fraction of more than
+    `max_rate` of the records (after at least `min_records`), have failed.
+    With neither limit set, the budget is unlimited.
+    """
+    def __init__(self, max_errors: int | None = None,
+                 max_rate: float | None = None,
+                 min_records: int = 1000):
+        self.max_errors = max_errors
+        self.max_rate = max_rate
+        self.min_records = min_records
+        self.errors = 0
+        self.records = 0
+
+    def check(self, records: int, errors: int) -> None:
+        self.records += records
+        self.errors += errors
+        if self.max_errors is not None and self.errors > self.max_errors:
+            raise RuntimeError(f"Error budget exceeded: {self.errors} errors "
+                               f"in {self.records} records (max_errors "
+                               f"{self.max_errors})")
+        if (self.max_rate is not None and self.records >= self.min_records
+                and self.errors > self.max_rate * self.records):
+            raise RuntimeError(f"Error budget exceeded: {self.errors} errors "
+                               f"in {self.records} records (max_rate "
+                               f"{self.max_rate})")
+
+
+class JsonLinesSink:
+    """
+    Dead-letter sink writing each error record as a line of JSON to file
+    `path`. Values that are not JSON-serializable are written as strings.
+    """
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._fh = None
+        self.count = 0
+
+    def __call__(self, err: dict) -> None:
+        if self._fh is None:
+            self._fh = self.path.open("w")
+        self._fh.write(json.dumps(err, default=str) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self) -> JsonLinesSink:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def check_on_error(on_error: str) -> None:
+    if on_error not in ON_ERROR:
+        raise RuntimeError(f"Unknown on_error mode '{on_error}'; "
+                           f"valid modes are {ON_ERROR}")
+
+
+def send(errors: List[dict], sink: Callable | None, offset: int = 0,
+         **extra) -> None:
+    """
+    Send the error records `errors` (of a chunk starting at job record
+    `offset`) to `sink`, adding the fields `extra` to each.
+    """
+    for err in errors:
+        err["record"] += offset
+        err.update(extra)
+        if sink is not None:
+            sink(err)
@@ -0,0 +1,240 @@
+"""
+bento_transforms.converters.files
+
+Convert Bento node files: read one TSV (or CSV) file of records per source
+node, convert them with the Converter, and write one file per target node.
+
+Files are streamed in chunks through three stages -- read, convert, write --
+connected by bounded queues, so that memory use is bounded by the chunk
+size and queue length, not by the size of the input, and a slow stage
+holds back the others (backpressure). Reading and writing run in their
+own threads, overlapping file I/O with conversion.
+
+Output files have a 'type' column holding the target node name, followed
+by the target node's properties, as written by the transforms in the job.
+Values are written as-is, except that None is written as an empty field,
+and binary UUIDs (see tflib.ids) as UUID strings. Input values are
+strings, except that empty fields are read as None; pass `parsers` to
+convert other properties (e.g., {'age_at_diagnosis': int}).
+
+With on_error='collect', step failures do not stop the job (within the
+error budget): they are written, as JSON lines, to 'dead_letter.jsonl' in
+the output directory (see converters.errors). When the budget is exceeded,
+the rows converted up to and including the chunk that exceeded it are
+written, and the job stops with a RuntimeError. An error's 'record' is the
+row number of the failing record in its source file, counted from 0.
+"""
+from __future__ import annotations
+import csv
+import threading
+import time
+from pathlib import Path
+from queue import Queue, Full
+from typing import Callable, Collection, Dict
+from toolz import partition_all
+from .errors import ErrorBudget, JsonLinesSink, check_on_error, send
+from ..tflib.ids import uuid_str
+
+_DONE = object()
+
+
+class _Stage:
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.seconds = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "rows": self.rows,
+            "seconds": round(self.seconds, 6),
+            "rows_per_sec": (round(self.rows / self.seconds, 1)
+                             if self.seconds else None),
+        }
+
+
+def convert_files(cvtr, sources: Dict[str, str | Path],
+                  outdir: str | Path,
+                  delimiter: str = "\t",
+                  chunksize: int = 10000,
+                  queue_size: int = 4,
+                  parsers: Dict[str, Callable] | None = None,
+                  categorical: str | Collection[str] | None = "auto",
+                  on_error: str = "raise",
+                  max_errors: int | None = None,
+                  max_error_rate: float | None = None
+                  ) -> dict:
+    """
+    Convert source node files `sources` ({ <source node>: <path> }) with
+    Converter `cvtr`, writing a file per target node in directory
+    `outdir`. Returns a dict of the output files ({ <target node>: <path> })
+    and of rows/sec statistics for each stage, and with
+    on_error='collect', the dead-letter file and error count. Output
+    files left in `outdir` by an earlier run are removed first.
+    """
+    check_on_error(on_error)
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    parsers = parsers or {}
+    plans = {node: cvtr.plan(node) for node in sources}
+    headers = {}
+    for plan in plans.values():
+        for (n, p, _, _) in plan.outputs:
+            hdr = headers.setdefault(n, ["type"])
+            if p not in hdr:
+                hdr.append(p)
+    ext = "tsv" if delimiter == "\t" else "csv"
+    outfiles = {n: outdir / f"{n}.{ext}" for n in headers}
+    # outputs of an earlier run, which this one may not rewrite
+    for path in outfiles.values():
+        path.unlink(missing_ok=True)
+    stages = {s: _Stage(s) for s in ("read", "convert", "write")}
+    q_in = Queue(maxsize=queue_size)
+    q_out = Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+    collect = (on_error == "collect")
+    budget = ErrorBudget(max_errors=max_errors, max_rate=max_error_rate)
+    dead_letter = JsonLinesSink(outdir / "dead_letter.jsonl")
+    if collect:
+        dead_letter.path.unlink(missing_ok=True)
+    offsets = {}
+
+    def read():
+        st = stages["read"]
+        try:
+            for (node, path) in sources.items():
+                with open(path, newline="") as f:
+                    rdr = csv.DictReader(f, delimiter=delimiter)
+                    t0 = time.perf_counter()
+                    for chunk in partition_all(chunksize, rdr):
+                        chunk = [_parse(rec, parsers) for rec in chunk]
+                        st.rows += len(chunk)
+                        st.seconds += time.perf_counter() - t0
+                        if not _put(q_in, (node, chunk), stop):
+                            return
+                        t0 = time.perf_counter()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            _put(q_in, _DONE, stop)
+
+    def write():
+        st = stages["write"]
+        fhs = {}
+        writers = {}
+        try:
+            while True:
+                item = q_out.get()
+                if item is _DONE:
+                    break
+                if errors:
+                    continue  # drain
+                t0 = time.perf_counter()
+                for (n, rows) in item.items():
+                    if n not in writers:
+                        fhs[n] = open(outfiles[n], "w", newline="",
+                                      buffering=1 << 20)
+                        writers[n] = csv.writer(fhs[n], delimiter=delimiter,
+                                                lineterminator="\n")
+                        writers[n].writerow(headers[n])
+                    writers[n].writerows(rows)
+                    st.rows += len(rows)
+                st.seconds += time.perf_counter() - t0
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+            while q_out.get() is not _DONE:
+                pass
+        finally:
+            for fh in fhs.values():
+                fh.close()
+
+    reader = threading.Thread(target=read, daemon=True)
+    writer = threading.Thread(target=write, daemon=True)
+    reader.start()
+    writer.start()
+    st = stages["convert"]
+    over = None
+    try:
+        while True:
+            item = q_in.get()
+            if item is _DONE:
+                break
+            if errors:
+                break
+            (node, chunk) = item
+            t0 = time.perf_counter()
+            if collect:
+                errs = []
+                outs = plans[node].execute(chunk, categorical=categorical,
+                                           errors=errs)
+                send(errs, dead_letter, offsets.get(node, 0), node=node)
+                offsets[node] = offsets.get(node, 0) + len(chunk)
+                try:
+                    budget.check(len(chunk), len(errs))
+                except RuntimeError as e:
+                    # stop after writing this chunk, as convert_records
+                    # yields it before raising
+                    over = e
+            else:
+                outs = plans[node].execute(chunk, categorical=categorical)
+            rows = {}
+            for out in outs:
+                for (n, rec) in out.items():
+                    if rec:
+                        rows.setdefault(n, []).append(
+                            [n] + [_fmt(rec.get(p)) for p in headers[n][1:]])
+            st.rows += len(chunk)
+            st.seconds += time.perf_counter() - t0
+            if not _put(q_out, rows, stop) or over is not None:
+                break
+    except Exception as e:
+        errors.append(e)
+    finally:
+        stop.set()
+        q_out.put(_DONE)
+        writer.join()
+        reader.join()
+        dead_letter.close()
+    if errors:
+        raise errors[0]
+    if over is not None:
+        raise over
+    ret = {
+        "files": {n: p for (n, p) in outfiles.items() if p.exists()},
+        "stages": {s: stages[s].stats() for s in stages},
+    }
+    if collect:
+        ret["errors"] = budget.errors
+        ret["dead_letter"] = (dead_letter.path if dead_letter.count
+                              else None)
+    return ret
+
+
+def _put(q: Queue, item, stop: threading.Event) -> bool:
+    # put item on q, unless asked to stop while waiting
+    while True:
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except Full:
+            if stop.is_set():
+                return False
+
+
+def _parse(rec: dict, parsers: Dict[str, Callable]) -> dict:
+    for (k, v) in rec.items():
+        if v == "" or v is None:
+            rec[k] = None
+        elif k in parsers:
+            rec[k] = parsers[k](v)
+    return rec
+
+
+def _fmt(v) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, bytes):
+        return uuid_str(v)
+    return v
@@ -0,0 +1,193 @@
+"""
+bento_transforms.converters.instrument
+
+Optional timing and counter instrumentation for transform functions and
+execution plans.
+
+An Instruments object collects, per transform, the number of calls and
+of errors, cumulative time and latency percentiles (over a window of the
+most recent calls), and the same for each step of the transform's
+pipeline; and, per execution plan, the time spent in each batch op.
+Hooks added with Instruments.add_hook() are called on every timed event,
+to export measurements to an external metrics system.
+
+Instrumentation is applied when functions and plans are compiled, by
+wrapping them; uninstrumented functions and plans are unchanged, so
+there is no cost when it is not enabled (see Converter(instrument=True)).
+"""
+from __future__ import annotations
+import time
+from functools import partial
+from typing import Callable, List, Tuple
+
+
+class Timings:
+    """
+    Counters for one instrumented function: calls, errors, total time,
+    and the latencies (ns) of the most recent `window` calls.
+    """
+    def __init__(self, window: int = 1024):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ns = 0
+        self._window = window
+        self._recent = []
+        self._pos = 0
+
+    def record(self, ns: int, error: bool = False, rows: int = 1) -> None:
+        self.calls += 1
+        self.rows += rows
+        self.total_ns += ns
+        if error:
+            self.errors += 1
+        if len(self._recent) < self._window:
+            self._recent.append(ns)
+        else:
+            self._recent[self._pos] = ns
+            self._pos = (self._pos + 1) % self._window
+
+    def stats(self) -> dict:
+        """Return the counters, with times in microseconds."""
+        ret = {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_us": self.total_ns / 1000,
+            "mean_us": (self.total_ns / self.calls / 1000
+                        if self.calls else None),
+        }
+        lat = sorted(self._recent)
+        for q in (50, 90, 99):
+            ret[f"p{q}_us"] = (lat[min(len(lat) - 1, len(lat) * q // 100)]
+                               / 1000 if lat else None)
+        return ret
+
+
+class Instruments:
+    """
+    Collects Timings for the transform functions and execution plans
+    compiled with it, and passes timed events to hooks.
+
+    A hook is a callable `hook(name, step, ns, error)`, called after each
+    call of an instrumented transform (with `step` None) and of each of
+    its steps (with `step` the step's entrypoint), and after each batch
+    op of an instrumented plan (with `name` 'plan:<source node>').
+    `ns` is the elapsed time in nanoseconds, and `error` the exception
+    raised, or None.
+    """
+    def __init__(self, window: int = 1024):
+        self._window = window
+        self._transforms = {}  # handle -> Timings
+        self._steps = {}  # handle -> [(entrypoint, Timings), ...]
+        # source node -> { op key: (entrypoint, handles, Timings) }
+        self._plans = {}
+        self._hooks = []
+
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        # hooks need not be picklable, and are not sent to workers
+        state["_hooks"] = []
+        return state
+
+    def add_hook(self, hook: Callable) -> None:
+        """Add `hook` (see class docstring) to the hooks called on events."""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable) -> None:
+        self._hooks.remove(hook)
+
+    def reset(self) -> None:
+        """Zero all counters."""
+        for t in self._transforms.values():
+            t.__init__(self._window)
+        for steps in self._steps.values():
+            for (_, t) in steps:
+                t.__init__(self._window)
+        for ops in self._plans.values():
+            for (_, _, t) in ops.values():
+                t.__init__(self._window)
+
+    def instrument_transform(self, handle: str, func: Callable) -> Callable:
+        """
+        Return transform function `func` wrapped to record its timings
+        under transform `handle`.
+        """
+        t = self._transforms.setdefault(handle, Timings(self._window))
+        return partial(_timed, func, t, self, handle, None)
+
+    def instrument_steps(self, handle: str,
+                         steps: List[Tuple[str, Callable]]) -> List[Callable]:
+        """
+        Return the step functions `steps` ([(entrypoint, function), ...])
+        of transform `handle`, wrapped to record their timings.
+        """
+        if handle not in self._steps:
+            self._steps[handle] = [(ep, Timings(self._window))
+                                   for (ep, _) in steps]
+        return [partial(_timed, func, t, self, handle, ep)
+                for ((ep, func), (_, t)) in zip(steps, self._steps[handle])]
+
+    def instrument_op(self, source_node: str, op) -> Callable:
+        """
+        Return the function of execution plan op `op` wrapped to record
+        its timings (one call per chunk) under plan `source_node`.
+        """
+        ops = self._plans.setdefault(source_node, {})
+        if op.key not in ops:
+            ops[op.key] = (op.entrypoint, op.handles, Timings(self._window))
+        t = ops[op.key][2]
+        return partial(_timed_batch, op.func, t, self,
+                       f"plan:{source_node}", op.entrypoint)
+
+    def stats(self) -> dict:
+        """
+        Return a snapshot of all counters, of the form
+        { 'transforms': { <handle>: { <counters>, 'steps': [...] } },
+          'plans': { <source node>: [ { 'op', 'handles', <counters> } ] } }.
+        """
+        transforms = {}
+        for (hdl, t) in self._transforms.items():
+            transforms[hdl] = t.stats()
+            transforms[hdl]["steps"] = [
+                {"entrypoint": ep, **st.stats()}
+                for (ep, st) in self._steps.get(hdl, [])]
+        plans = {}
+        for (node, ops) in self._plans.items():
+            plans[node] = [
+                {"op": f"${i}", "entrypoint": ep, "handles": list(hdls),
+                 "rows": t.rows, **t.stats()}
+                for (i, (ep, hdls, t)) in enumerate(ops.values())]
+        return {"transforms": transforms, "plans": plans}
+
+
+def _timed(func: Callable, timings: Timings, instruments: Instruments,
+           name: str, step: str | None, *args, **kwargs):
+    err = None
+    t0 = time.perf_counter_ns()
+    try:
+        return func(*args, **kwargs)
+    except Exception as e:
+        err = e
+        raise
+    finally:
+        ns = time.perf_counter_ns() - t0
+        timings.record(ns, err is not None)
+        for hook in instruments._hooks:
+            hook(name, step, ns, err)
+
+
+def _timed_batch(func: Callable, timings: Timings,
+                 instruments: Instruments, name: str, step: str, *columns):
+    err = None
+    t0 = time.perf_counter_ns()
+    try:
+        return func(*columns)
+    except Exception as e:
+        err = e
+        raise
+    finally:
+        ns = time.perf_counter_ns() - t0
+        timings.record(ns, err is not None,
+                       rows=len(columns[0]) if columns else 0)
+        for hook in instruments._hooks:
+            hook(name, step, ns, err)
@@ -0,0 +1,432 @@
+"""
+bento_transforms.converters.jobs
+
+Checkpointed, resumable conversion of Bento node files, split into
+partitions that are converted independently -- by several local worker
+processes, or by workers on several machines sharing the job directory.
+
+A job directory holds
+
+  manifest.json       the source files (with sizes and modification
+                      times), the converter's hash, the output headers,
+                      and the partitions: runs of `partition_rows`
+                      records of one source file, located by byte offset
+  locks/<id>.lock     claims of partitions being converted
+  parts/<id>/<node>   a partition's converted rows, per target node
+  checkpoints/<id>.json
+                      written when a partition is complete, with the
+                      SHA-256 hash and row count of each of its outputs
+  output/<node>.tsv   the merged output files (see merge())
+
+A partition is done when its checkpoint exists and its outputs match the
+checkpoint's hashes; resuming a job (running it again) converts only the
+partitions that are not done. Workers claim a partition by creating its
+lock file exclusively; a lock left by a crashed worker is reclaimed when
+its process is gone (same host) or it is older than `stale_after`
+seconds. (Should two workers still convert a partition at once, they
+write their outputs to temporary files of their own, each replacing the
+partition's outputs atomically with the same contents.) Output files
+are formatted as by converters.files, and merged in manifest order, so
+the merged outputs do not depend on how the partitions were scheduled,
+and equal those of Converter.convert_files().
+"""
+from __future__ import annotations
+import csv
+import hashlib
+import json
+import os
+import shutil
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Collection, Dict, List
+from toolz import partition_all
+from .files import _fmt, _parse
+
+MANIFEST = "manifest.json"
+JOB_FORMAT = 1
+
+
+def converter_hash(cvtr) -> str:
+    """Hash of the Converter's transforms."""
+    tfs = {hdl: gtf.model_dump() for (hdl, gtf) in cvtr.transforms.items()}
+    return hashlib.sha256(json.dumps(tfs, sort_keys=True, default=str)
+                          .encode()).hexdigest()
+
+
+class ConversionJob:
+    """A partitioned conversion job in directory `jobdir` (see module docs)."""
+    def __init__(self, jobdir: str | Path):
+        self.jobdir = Path(jobdir)
+        path = self.jobdir / MANIFEST
+        if not path.exists():
+            raise RuntimeError(f"No job manifest in '{jobdir}'")
+        with path.open() as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != JOB_FORMAT:
+            raise RuntimeError(f"Job '{jobdir}' has format "
+                               f"{self.manifest.get('format')}; expected "
+                               f"{JOB_FORMAT}")
+
+    @classmethod
+    def create(cls, jobdir: str | Path, cvtr, sources: Dict[str, str | Path],
+               partition_rows: int = 100_000,
+               delimiter: str = "\t") -> ConversionJob:
+        """
+        Create a job converting source node files `sources`
+        ({ <source node>: <path> }) with Converter `cvtr`, or if `jobdir`
+        already holds the same job, return it (to resume).
+        """
+        jobdir = Path(jobdir)
+        headers = {}
+        for node in sources:
+            for (n, p, _, _) in cvtr.plan(node).outputs:
+                hdr = headers.setdefault(n, ["type"])
+                if p not in hdr:
+                    hdr.append(p)
+        manifest = {
+            "format": JOB_FORMAT,
+            "converter": converter_hash(cvtr),
+            "delimiter": delimiter,
+            "partition_rows": partition_rows,
+            "sources": {node: _file_info(path)
+                        for (node, path) in sources.items()},
+            "headers": headers,
+        }
+        if (jobdir / MANIFEST).exists():
+            job = cls(jobdir)
+            have = {k: v for (k, v) in job.manifest.items()
+                    if k != "partitions"}
+            if have != manifest:
+                raise RuntimeError(f"Job directory '{jobdir}' holds a "
+                                   "different job")
+            return job
+        parts = []
+        for (node, path) in sources.items():
+            (header, runs) = _scan(Path(path), delimiter, partition_rows)
+            for (offset, rows) in runs:
+                parts.append({"id": f"{len(parts):05d}", "node": node,
+                              "header": header, "offset": offset,
+                              "rows": rows})
+        manifest["partitions"] = parts
+        jobdir.mkdir(parents=True, exist_ok=True)
+        _write_json(jobdir / MANIFEST, manifest)
+        return cls(jobdir)
+
+    @property
+    def partitions(self) -> List[dict]:
+        return self.manifest["partitions"]
+
+    def checkpoint(self, pid: str) -> dict | None:
+        """Return the checkpoint of partition `pid`, if it is complete."""
+        path = self.jobdir / "checkpoints" / f"{pid}.json"
+        if not path.exists():
+            return None
+        with path.open() as f:
+            return json.load(f)
+
+    def status(self) -> dict:
+        """Return the ids of the partitions "done" and "pending"."""
+        done = [p["id"] for p in self.partitions if self.checkpoint(p["id"])]
+        return {"done": done,
+                "pending": [p["id"] for p in self.partitions
+                            if p["id"] not in done]}
+
+    def verify(self) -> List[str]:
+        """
+        Check the outputs of the completed partitions against their
+        checkpoints; drop the checkpoints of those that do not match (so
+        that they are converted again), and return their ids.
+        """
+        bad = []
+        for p in self.partitions:
+            ckpt = self.checkpoint(p["id"])
+            if ckpt is not None and not self._matches(ckpt):
+                (self.jobdir / "checkpoints" / f"{p['id']}.json").unlink()
+                bad.append(p["id"])
+        return bad
+
+    def run_partition(self, cvtr, pid: str,
+                      parsers: Dict[str, Callable] | None = None,
+                      categorical: str | Collection[str] | None = "auto",
+                      chunksize: int = 10000) -> dict:
+        """
+        Convert partition `pid` with Converter `cvtr`, and write its
+        checkpoint. (Does not claim the partition; see work().)
+        """
+        self._check_converter(cvtr)
+        part = {p["id"]: p for p in self.partitions}[pid]
+        (node, delim) = (part["node"], self.manifest["delimiter"])
+        src = self.manifest["sources"][node]
+        if _file_info(src["path"]) != src:
+            raise RuntimeError(f"Source file '{src['path']}' has changed "
+                               "since the job was created")
+        headers = self.manifest["headers"]
+        plan = cvtr.plan(node)
+        outdir = self.jobdir / "parts" / pid
+        outdir.mkdir(parents=True, exist_ok=True)
+        (fhs, writers, counts) = ({}, {}, {})
+
+        def tmp_name(n):
+            return f"{n}.{os.getpid()}.tmp"
+        t0 = time.perf_counter()
+        try:
+            with open(src["path"], "rb") as f:
+                f.seek(part["offset"])
+                rdr = csv.reader((raw.decode() for raw in f), delimiter=delim)
+                recs = (dict(zip(part["header"], row))
+                        for row in islice(rdr, part["rows"]))
+                for chunk in partition_all(chunksize, recs):
+                    chunk = [_parse(rec, parsers or {}) for rec in chunk]
+                    for out in plan.execute(chunk, categorical=categorical):
+                        for (n, rec) in out.items():
+                            if not rec:
+                                continue
+                            if n not in writers:
+                                fhs[n] = open(outdir / tmp_name(n), "w",
+                                              newline="")
+                                writers[n] = csv.writer(
+                                    fhs[n], delimiter=delim,
+                                    lineterminator="\n")
+                                counts[n] = 0
+                            writers[n].writerow(
+                                [n] + [_fmt(rec.get(p))
+                                       for p in headers[n][1:]])
+                            counts[n] += 1
+        finally:
+            for fh in fhs.values():
+                fh.close()
+        outputs = {}
+        for n in writers:
+            os.replace(outdir / tmp_name(n), outdir / n)
+            outputs[n] = {"rows": counts[n], "sha256": _sha256(outdir / n)}
+        ckpt = {"id": pid, "rows": part["rows"], "outputs": outputs,
+                "host": socket.gethostname(), "pid": os.getpid(),
+                "seconds": round(time.perf_counter() - t0, 6)}
+        (self.jobdir / "checkpoints").mkdir(exist_ok=True)
+        _write_json(self.jobdir / "checkpoints" / f"{pid}.json", ckpt)
+        return ckpt
+
+    def work(self, cvtr, stale_after: float = 3600, **kwargs) -> List[str]:
+        """
+        Claim and convert pending partitions, one at a time, until none
+        is left unclaimed; this is what each worker runs, on any machine.
+        Returns the ids of the partitions converted. Keyword arguments are
+        passed to run_partition().
+        """
+        self._check_converter(cvtr)
+        converted = []
+        for p in self.partitions:
+            if self.checkpoint(p["id"]):
+                continue
+            token = self._claim(p["id"], stale_after)
+            if token is None:
+                continue
+            try:
+                if not self.checkpoint(p["id"]):
+                    self.run_partition(cvtr, p["id"], **kwargs)
+                    converted.append(p["id"])
+            finally:
+                self._release(p["id"], token)
+        return converted
+
+    def run(self, cvtr, processes: int | None = None,
+            stale_after: float = 3600, **kwargs) -> dict:
+        """
+        Run (or resume) the job in `processes` local worker processes
+        (default: one per CPU; 1 runs in this process), then merge the
+        outputs if all partitions are done. Returns the ids of the
+        partitions "converted" by this run, and the merged "files" (None
+        if partitions claimed by other workers are still pending).
+        """
+        self._check_converter(cvtr)
+        self.verify()
+        processes = processes or os.cpu_count() or 1
+        if processes == 1:
+            converted = self.work(cvtr, stale_after=stale_after, **kwargs)
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                futs = [pool.submit(_work, self.jobdir, cvtr, stale_after,
+                                    kwargs) for _ in range(processes)]
+                converted = sorted(pid for fut in futs
+                                   for pid in fut.result())
+        files = None if self.status()["pending"] else self.merge()
+        if files is not None:
+            # left by workers that died while taking over a stale lock
+            for aside in (self.jobdir / "locks").glob("*.stale"):
+                aside.unlink(missing_ok=True)
+        return {"converted": converted, "files": files}
+
+    def merge(self, outdir: str | Path | None = None) -> Dict[str, Path]:
+        """
+        Concatenate the partition outputs, in manifest order, into a file
+        per target node (with a header row) in `outdir` (default:
+        <jobdir>/output). Raises RuntimeError if a partition is not done.
+        """
+        outdir = Path(outdir) if outdir else self.jobdir / "output"
+        outdir.mkdir(parents=True, exist_ok=True)
+        ckpts = []
+        for p in self.partitions:
+            ckpt = self.checkpoint(p["id"])
+            if ckpt is None or not self._matches(ckpt):
+                raise RuntimeError(f"Partition {p['id']} is not done")
+            ckpts.append(ckpt)
+        delim = self.manifest["delimiter"]
+        ext = "tsv" if delim == "\t" else "csv"
+        files = {}
+        for (n, hdr) in self.manifest["headers"].items():
+            parts = [self.jobdir / "parts" / c["id"] / n
+                     for c in ckpts if n in c["outputs"]]
+            if not parts:
+                continue
+            path = outdir / f"{n}.{ext}"
+            tmp = outdir / f".{n}.{ext}.{os.getpid()}.tmp"
+            with tmp.open("w", newline="") as out:
+                csv.writer(out, delimiter=delim,
+                           lineterminator="\n").writerow(hdr)
+                out.flush()
+                for part in parts:
+                    with part.open(newline="") as f:
+                        shutil.copyfileobj(f, out)
+            os.replace(tmp, path)
+            files[n] = path
+        return files
+
+    def _check_converter(self, cvtr) -> None:
+        if converter_hash(cvtr) != self.manifest["converter"]:
+            raise RuntimeError("Job was created with a different converter")
+
+    def _matches(self, ckpt: dict) -> bool:
+        for (n, info) in ckpt["outputs"].items():
+            path = self.jobdir / "parts" / ckpt["id"] / n
+            if not path.exists() or _sha256(path) != info["sha256"]:
+                return False
+        return True
+
+    def _claim(self, pid: str, stale_after: float) -> str | None:
+        # claim partition `pid`; returns the claim's token, or None if the
+        # partition is claimed by another worker
+        locks = self.jobdir / "locks"
+        locks.mkdir(exist_ok=True)
+        lock = locks / f"{pid}.lock"
+        for _ in range(2):
+            try:
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                owner = _stale(lock, stale_after)
+                if owner is None:
+                    return None
+                aside = locks / f"{pid}.{os.getpid()}.stale"
+                try:
+                    # only one worker gets to move a stale lock aside
+                    os.rename(lock, aside)
+                except FileNotFoundError:
+                    return None
+                if _read_lock(aside) != owner:
+                    # another worker took the stale lock over first, and
+                    # this is its fresh lock: put it back
+                    try:
+                        os.link(aside, lock)
+                    except (FileExistsError, FileNotFoundError):
+                        pass
+                    aside.unlink(missing_ok=True)
+                    return None
+                aside.unlink()
+                continue
+            claim = {"host": socket.gethostname(), "pid": os.getpid(),
+                     "time": time.time(), "token": os.urandom(8).hex()}
+            with os.fdopen(fd, "w") as f:
+                json.dump(claim, f)
+            # the lock may have been moved aside meanwhile by a worker
+            # that found the one before it stale
+            if _read_lock(lock) != claim:
+                return None
+            return claim["token"]
+        return None
+
+    def _release(self, pid: str, token: str) -> None:
+        lock = self.jobdir / "locks" / f"{pid}.lock"
+        if (_read_lock(lock) or {}).get("token") == token:
+            lock.unlink(missing_ok=True)
+
+
+def _work(jobdir: Path, cvtr, stale_after: float, kwargs: dict) -> List[str]:
+    return ConversionJob(jobdir).work(cvtr, stale_after=stale_after,
+                                      **kwargs)
+
+
+def _read_lock(lock: Path) -> dict | None:
+    try:
+        with lock.open() as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None  # gone, or being written
+
+
+def _stale(lock: Path, stale_after: float) -> dict | None:
+    # the contents of `lock` if it is stale, else None
+    owner = _read_lock(lock)
+    if owner is None:
+        return None
+    if time.time() - owner["time"] > stale_after:
+        return owner
+    if owner["host"] != socket.gethostname():
+        return None
+    try:
+        os.kill(owner["pid"], 0)
+    except ProcessLookupError:
+        return owner
+    except PermissionError:
+        pass
+    return None
+
+
+def _scan(path: Path, delimiter: str,
+          partition_rows: int) -> tuple:
+    # the header of node file `path`, and the (byte offset, row count) of
+    # each run of `partition_rows` records
+    with path.open("rb") as f:
+        pos = 0
+
+        def lines():
+            nonlocal pos
+            for raw in f:
+                pos += len(raw)
+                yield raw.decode()
+        rdr = csv.reader(lines(), delimiter=delimiter)
+        header = next(rdr, None)
+        if header is None:
+            return ([], [])
+        runs = []
+        (start, n) = (pos, 0)
+        for _ in rdr:
+            n += 1
+            if n == partition_rows:
+                runs.append((start, n))
+                (start, n) = (pos, 0)
+        if n:
+            runs.append((start, n))
+    return (header, runs)
+
+
+def _file_info(path: str | Path) -> dict:
+    st = Path(path).stat()
+    return {"path": str(Path(path).resolve()), "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns}
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_json(path: Path, obj) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp.open("w") as f:
+        json.dump(obj, f, indent=1)
+    os.replace(tmp, path)
@@ -0,0 +1,253 @@
+"""
+bento_transforms.converters.join
+
+Join the records of several source nodes, for transforms whose Inputs
+span nodes (execution plans, being per source node, do not apply them).
+
+Source nodes are linked child -> parent as in Bento node files: a child
+record holds its parent's key in a column named '<parent>.<parent key>'.
+Links are given as { <child>: { <parent>: (<child column>, <parent key>) } };
+links_from_model() derives them from a bento_meta Model's relationships
+and key properties.
+
+A transform is driven by its probe node: the input node of which every
+other input node is an ancestor. Each probe record is joined to its
+parent, grandparent, ... a hop at a time, by hash join: the parent node's
+records are the build side, indexed by key, and the child rows probe it.
+Only the properties needed downstream are kept from build records. If the
+build side of a hop has more than `max_build_rows` records, the hop
+spills: build and probe rows are hash-partitioned to temporary files and
+joined one partition at a time (a Grace hash join), so that memory use is
+bounded by the budget rather than by the size of the parent node. (Rows
+then come out in partition order rather than probe order.)
+
+Probe records without a matching ancestor, or lacking an input property,
+are not converted. The joined argument tuples are fed to the transform's
+batch function (see Converter.bfunction) `batch_size` at a time.
+"""
+from __future__ import annotations
+import csv
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+from toolz import partition_all
+from ..mdf.pymodels import GeneralTransform
+
+Links = Dict[str, Dict[str, Tuple[str, str]]]
+
+
+def links_from_model(model) -> Links:
+    """
+    Return the child -> parent links of bento_meta Model `model`: for
+    each relationship whose parent (destination) node has a single key
+    property, the child column '<parent>.<key>' and the key.
+    """
+    links = {}
+    for edge in model.edges.values():
+        (child, parent) = (edge.src.handle, edge.dst.handle)
+        keys = [p.handle for p in edge.dst.props.values() if p.is_key]
+        if len(keys) == 1:
+            links.setdefault(child, {})[parent] = (f"{parent}.{keys[0]}",
+                                                   keys[0])
+    return links
+
+
+class JoinEngine:
+    """
+    Joins source node records for transform `gtf` along `links`, and
+    applies it in batches (see module docstring).
+    """
+    def __init__(self, gtf: GeneralTransform, links: Links,
+                 max_build_rows: int = 1_000_000, partitions: int = 16,
+                 spill_dir: str | Path | None = None):
+        self._gtf = gtf
+        self._links = links
+        self._max_build_rows = max_build_rows
+        self._partitions = partitions
+        self._spill_dir = spill_dir
+        self._args = [(i.Node, p) for i in gtf.Inputs for p in i.Props]
+        self._slots = [(o.Node, p) for o in gtf.Outputs for p in o.Props]
+        nodes = list(dict.fromkeys(n for (n, _) in self._args))
+        self._probe = None
+        self._hops = None
+        for cand in nodes:
+            hops = self._plan_hops(cand, set(nodes) - {cand})
+            if hops is not None:
+                (self._probe, self._hops) = (cand, hops)
+                break
+        if self._probe is None:
+            raise RuntimeError(f"No input node of which the other input "
+                               f"nodes {nodes} are all ancestors, via the "
+                               "given links")
+        # properties kept from each node's records: transform inputs, and
+        # the link columns of further hops
+        self._keep = {}
+        for (n, p) in self._args:
+            self._keep.setdefault(n, set()).add(p)
+        for (child, parent, col, _) in self._hops:
+            self._keep.setdefault(child, set()).add(col)
+        self.stats = {"probe_rows": 0, "joined_rows": 0, "unmatched": 0,
+                      "spilled_hops": []}
+
+    @property
+    def probe(self) -> str:
+        return self._probe
+
+    @property
+    def hops(self) -> List[Tuple[str, str, str, str]]:
+        """The hops of the join, as (child, parent, column, key)."""
+        return list(self._hops)
+
+    def _plan_hops(self, probe: str, needed: set) -> list | None:
+        # breadth-first up the links from probe; keep the hops on a path
+        # to a needed node
+        (frontier, via) = ([probe], {probe: None})
+        while frontier:
+            nxt = []
+            for child in frontier:
+                for (parent, (col, key)) in self._links.get(child,
+                                                            {}).items():
+                    if parent not in via:
+                        via[parent] = (child, parent, col, key)
+                        nxt.append(parent)
+            frontier = nxt
+        if not needed <= set(via):
+            return None
+        hops = set()
+        for n in needed:
+            while via[n] is not None:
+                hops.add(via[n])
+                n = via[n][0]
+        order = list(via)
+        return sorted(hops, key=lambda h: order.index(h[1]))
+
+    def join(self, sources: Dict[str, Iterable[dict] | str | Path]
+             ) -> Iterator[dict]:
+        """
+        Yield joined rows ({ <node>: <record>, ... }, with the full probe
+        record) from `sources`, { <node>: <records or node file path> }.
+        """
+        rows = ({self._probe: rec} for rec in self._count(
+            _records(sources[self._probe])))
+        for (child, parent, col, key) in self._hops:
+            if parent not in sources:
+                raise RuntimeError(f"No source given for node '{parent}'")
+            rows = self._hop(rows, child, parent, col, key,
+                             _records(sources[parent]))
+        return rows
+
+    def run(self, bfunc: Callable,
+            sources: Dict[str, Iterable[dict] | str | Path],
+            batch_size: int = 1000) -> Iterator[Tuple[dict, dict]]:
+        """
+        Apply batch function `bfunc` (the transform's, per
+        create_batch_function) to the joined rows, `batch_size` at a time.
+        Yields (probe record, { <target node>: { <prop>: <value> } }).
+        """
+        args = self._args
+        outs = [f"{n}_{p}" for (n, p) in self._slots]
+        for batch in partition_all(batch_size, self._complete(
+                self.join(sources))):
+            cols = [[row[n][p] for row in batch] for (n, p) in args]
+            ret = bfunc(*cols)
+            if len(outs) == 1:
+                ret = {outs[0]: ret}
+            for (i, row) in enumerate(batch):
+                out = {}
+                for ((n, p), o) in zip(self._slots, outs):
+                    out.setdefault(n, {})[p] = ret[o][i]
+                self.stats["joined_rows"] += 1
+                yield (row[self._probe], out)
+
+    def _count(self, records: Iterable[dict]) -> Iterator[dict]:
+        for rec in records:
+            self.stats["probe_rows"] += 1
+            yield rec
+
+    def _complete(self, rows: Iterable[dict]) -> Iterator[dict]:
+        for row in rows:
+            if all(p in row[n] for (n, p) in self._args):
+                yield row
+            else:
+                self.stats["unmatched"] += 1
+
+    def _hop(self, rows: Iterable[dict], child: str, parent: str, col: str,
+             key: str, build: Iterable[dict]) -> Iterator[dict]:
+        keep = self._keep.get(parent, set())
+        table = {}
+        build = iter(build)
+        for rec in build:
+            if rec.get(key) is not None:
+                table[rec[key]] = {k: rec[k] for k in keep if k in rec}
+            if len(table) > self._max_build_rows:
+                self.stats["spilled_hops"].append((child, parent))
+                yield from self._spilled_hop(rows, child, parent, col, key,
+                                             table, build)
+                return
+        for row in rows:
+            prec = table.get(row[child].get(col))
+            if prec is None:
+                self.stats["unmatched"] += 1
+                continue
+            row[parent] = prec
+            yield row
+
+    def _spilled_hop(self, rows: Iterable[dict], child: str, parent: str,
+                     col: str, key: str, table: dict,
+                     build: Iterator[dict]) -> Iterator[dict]:
+        keep = self._keep.get(parent, set())
+        n = self._partitions
+        with tempfile.TemporaryDirectory(dir=self._spill_dir) as tmp:
+            bparts = [open(Path(tmp) / f"b{i}", "wb") for i in range(n)]
+            pparts = [open(Path(tmp) / f"p{i}", "wb") for i in range(n)]
+            try:
+                for (k, prec) in table.items():
+                    pickle.dump((k, prec), bparts[hash(k) % n])
+                table.clear()
+                for rec in build:
+                    if rec.get(key) is not None:
+                        pickle.dump((rec[key], {k: rec[k] for k in keep
+                                                if k in rec}),
+                                    bparts[hash(rec[key]) % n])
+                for row in rows:
+                    k = row[child].get(col)
+                    if k is None:
+                        self.stats["unmatched"] += 1
+                        continue
+                    pickle.dump(row, pparts[hash(k) % n])
+            finally:
+                for f in bparts + pparts:
+                    f.close()
+            for i in range(n):
+                table = dict(_load(Path(tmp) / f"b{i}"))
+                for row in _load(Path(tmp) / f"p{i}"):
+                    prec = table.get(row[child][col])
+                    if prec is None:
+                        self.stats["unmatched"] += 1
+                        continue
+                    row[parent] = prec
+                    yield row
+
+
+def _load(path: Path) -> Iterator:
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def _records(source: Iterable[dict] | str | Path) -> Iterable[dict]:
+    # records, or a TSV/CSV node file of them (empty fields read as None)
+    if not isinstance(source, (str, Path)):
+        return source
+    return _read_node_file(Path(source))
+
+
+def _read_node_file(path: Path) -> Iterator[dict]:
+    delim = "," if path.suffix.lower() == ".csv" else "\t"
+    with path.open(newline="") as f:
+        for rec in csv.DictReader(f, delimiter=delim):
+            yield {k: (None if v == "" else v) for (k, v) in rec.items()}
@@ -0,0 +1,112 @@
+"""
+bento_transforms.converters.memo
+
+Memoize transform functions.
+
+Transform functions are pure, and the columns they convert are often
+highly repetitive (race, personnel_type, acl, ...), so caching results by
+input avoids recomputing pipelines for values already seen. A
+MemoizedTransform wraps a transform function (as returned by
+create_transform_function) with a bounded cache and hit/miss/eviction
+counters.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Callable
+
+POLICIES = ("lru", "fifo")
+
+
+class MemoizedTransform:
+    """
+    Callable wrapping transform function `func` with a cache of at most
+    `maxsize` results. When the cache is full, the least recently used
+    ('lru') or the oldest ('fifo') entry is evicted, per `policy`.
+    Calls with inputs that cannot be made hashable bypass the cache.
+    """
+    def __init__(self, func: Callable, maxsize: int = 4096,
+                 policy: str = "lru"):
+        if policy not in POLICIES:
+            raise RuntimeError(f"Unknown eviction policy '{policy}'; "
+                               f"valid policies are {POLICIES}")
+        if maxsize < 1:
+            raise RuntimeError("Memo cache maxsize must be at least 1")
+        self._func = func
+        self._maxsize = maxsize
+        self._lru = (policy == "lru")
+        self._policy = policy
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.uncacheable = 0
+        for attr in ("inputs", "outputs", "pipeline"):
+            if hasattr(func, attr):
+                setattr(self, attr, getattr(func, attr))
+
+    def __call__(self, *args, **kwargs) -> Any:
+        try:
+            key = (_freeze(args), _freeze(kwargs))
+            hash(key)
+        except TypeError:
+            self.uncacheable += 1
+            return self._func(*args, **kwargs)
+        cache = self._cache
+        if key in cache:
+            self.hits += 1
+            if self._lru:
+                cache.move_to_end(key)
+            return _copy(cache[key])
+        self.misses += 1
+        ret = self._func(*args, **kwargs)
+        cache[key] = ret
+        if len(cache) > self._maxsize:
+            cache.popitem(last=False)
+            self.evictions += 1
+        return _copy(ret)
+
+    @property
+    def func(self) -> Callable:
+        return self._func
+
+    def stats(self) -> dict:
+        """Return the cache counters and configuration."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "uncacheable": self.uncacheable,
+            "size": len(self._cache),
+            "maxsize": self._maxsize,
+            "policy": self._policy,
+        }
+
+    def clear(self) -> None:
+        """Empty the cache and reset the counters."""
+        self._cache.clear()
+        self.hits = self.misses = self.evictions = self.uncacheable = 0
+
+
+def _freeze(obj: Any) -> Any:
+    """
+    Return a hashable stand-in for `obj`, converting lists and tuples
+    (which transform functions treat alike) and dicts recursively. Other
+    values are paired with their type, as by functools.lru_cache(typed=
+    True), since equal values of different types (1, 1.0, True) can give
+    different results.
+    """
+    if isinstance(obj, (list, tuple)):
+        return tuple(_freeze(x) for x in obj)
+    if isinstance(obj, dict):
+        return (dict, tuple(sorted((k, _freeze(v)) for (k, v) in obj.items())))
+    return (type(obj), obj)
+
+
+def _copy(ret: Any) -> Any:
+    # cached dict (multi-output) and list results are copied, so that
+    # callers can't alter the cache
+    if isinstance(ret, dict):
+        return dict(ret)
+    if isinstance(ret, list):
+        return list(ret)
+    return ret
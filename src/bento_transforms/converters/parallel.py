@@ -0,0 +1,70 @@
+"""
+bento_transforms.converters.parallel
+
+Convert records in a pool of worker processes.
+
+The execution plan for a source node (Converter.plan) is picklable; it is
+sent to each worker once, when the worker starts.
+Records are then sent to the workers in chunks. At most `window` chunks
+are in flight at any time, so memory use stays bounded however long the
+input is.
+"""
+from __future__ import annotations
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable, Iterator, List, Sequence
+from toolz import partition_all
+from .plan import ExecutionPlan
+
+_plan = None
+
+
+def _init_worker(plan: ExecutionPlan) -> None:
+    global _plan
+    _plan = plan
+
+
+def _convert(chunk: Sequence[dict]) -> List[dict]:
+    return _plan.execute(chunk)
+
+
+def convert_records_parallel(plan: ExecutionPlan,
+                             records: Iterable[dict],
+                             chunksize: int = 1000,
+                             processes: int | None = None,
+                             ordered: bool = True,
+                             window: int | None = None) -> Iterator[dict]:
+    """
+    Convert `records` with execution plan `plan` in a pool of `processes`
+    workers.
+    Yields converted records in input order, or if `ordered` is False,
+    a chunk at a time in order of completion. `window` (default: twice
+    the number of processes) limits the number of chunks in flight.
+    """
+    processes = processes or os.cpu_count() or 1
+    window = window or 2 * processes
+    with ProcessPoolExecutor(max_workers=processes,
+                             initializer=_init_worker,
+                             initargs=(plan,)) as pool:
+        if ordered:
+            pending = deque()
+            for chunk in partition_all(chunksize, records):
+                if len(pending) >= window:
+                    yield from pending.popleft().result()
+                pending.append(pool.submit(_convert, chunk))
+            while pending:
+                yield from pending.popleft().result()
+        else:
+            pending = set()
+            for chunk in partition_all(chunksize, records):
+                if len(pending) >= window:
+                    (done, pending) = wait(pending,
+                                           return_when=FIRST_COMPLETED)
+                    for f in done:
+                        yield from f.result()
+                pending.add(pool.submit(_convert, chunk))
+            while pending:
+                (done, pending) = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    yield from f.result()
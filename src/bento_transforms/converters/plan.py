@@ -0,0 +1,378 @@
+"""
+bento_transforms.converters.plan
+
+Execution plans: the transforms that apply to records of one source node,
+compiled together into a DAG of
+
+  source property columns -> batch step operations -> target property slots
+
+so that
+
+* each source property is read once per chunk of records, however many
+  transforms consume it;
+* Identity steps are dropped, so an identity transform is a direct copy
+  of a source column into its target slot;
+* a step is keyed by its signature (package, entrypoint, Params) and by
+  everything upstream of it, so a step prefix shared by several
+  transforms is computed once (except impure steps -- see tflib.purity
+  -- which each transform computes for itself);
+* low-cardinality source columns are dictionary-encoded (see
+  converters.categorical), so that their steps run once per distinct
+  value. Impure steps are always run once per row, on decoded columns.
+
+Transforms can also be chained, a transform's inputs being the output
+columns of others (see compile_transform()); converters.route compiles
+a multi-hop conversion into a single plan this way.
+
+A plan is picklable, and converts a chunk of records at a time with
+ExecutionPlan.execute(). A plan compiled with an Instruments object (see
+converters.instrument) records the time spent in each of its ops.
+"""
+from __future__ import annotations
+from functools import partial
+from typing import Callable, Collection, Dict, List, Sequence, Tuple
+from ..mdf.pymodels import GeneralTransform
+from .categorical import Categorical, low_cardinality
+from .errors import error_record
+from .instrument import Instruments
+from .steps import (batch_step, output_item, step_is_pure, step_signature,
+                    _pass_column)
+
+
+class PlanOp:
+    """
+    A batch step operation in an ExecutionPlan: computes column `key` by
+    applying `func` to the columns `inputs`. An op that is not `pure` is
+    used by one transform only.
+    """
+    def __init__(self, key: tuple, inputs: tuple, func: Callable,
+                 entrypoint: str, handle: str, pure: bool = True):
+        self.key = key
+        self.inputs = inputs
+        self.func = func
+        self.entrypoint = entrypoint
+        self.handles = [handle]
+        self.pure = pure
+
+
+class ExecutionPlan:
+    def __init__(self, source_node: str,
+                 gtfs: Dict[str, GeneralTransform],
+                 instruments: Instruments | None = None):
+        self._source_node = source_node
+        self._instruments = instruments
+        self._handles = []
+        self._sources = []  # source props, in order of first use
+        self._op_sources = []  # source props that feed step ops
+        self._ops = []  # PlanOps, in dependency order
+        self._ops_by_key = {}
+        self._outputs = []  # (target node, target prop, column key, index)
+        self._targets = []
+        for (hdl, gtf) in gtfs.items():
+            self.add_transform(hdl, gtf)
+
+    @property
+    def source_node(self) -> str:
+        return self._source_node
+
+    @property
+    def handles(self) -> List[str]:
+        return self._handles
+
+    @property
+    def sources(self) -> List[str]:
+        return self._sources
+
+    @property
+    def ops(self) -> List[PlanOp]:
+        return self._ops
+
+    @property
+    def outputs(self) -> List[tuple]:
+        return self._outputs
+
+    @property
+    def targets(self) -> List[str]:
+        return self._targets
+
+    def add_transform(self, handle: str, gtf: GeneralTransform) -> None:
+        """Compile transform `gtf` into the plan."""
+        inputs = []
+        for inp in gtf.Inputs:
+            if inp.Node != self._source_node:
+                raise RuntimeError(f"Transform '{handle}' has an input from "
+                                   f"node '{inp.Node}'; plan is for source "
+                                   f"node '{self._source_node}'")
+            for p in inp.Props:
+                inputs.append(self.source(p))
+        key = self._compile(handle, gtf, tuple(inputs))
+        slots = [(outp.Node, p) for outp in gtf.Outputs for p in outp.Props]
+        for (i, (n, p)) in enumerate(slots):
+            self._outputs.append((n, p, key,
+                                  None if len(slots) == 1 else i))
+            if n not in self._targets:
+                self._targets.append(n)
+        self._handles.append(handle)
+
+    def source(self, prop: str) -> tuple:
+        """Return the column key of source property `prop`."""
+        if prop not in self._sources:
+            self._sources.append(prop)
+        return ("src", prop)
+
+    def compile_transform(self, handle: str, gtf: GeneralTransform,
+                          inputs: Sequence[tuple]) -> List[tuple]:
+        """
+        Compile transform `gtf`, applied to the columns `inputs` (column
+        keys, one per input property, in order: source() keys, or output
+        keys of transforms compiled earlier), without writing its outputs.
+        Returns the column key of each of its output properties, in order;
+        see add_output().
+        """
+        key = self._compile(handle, gtf, tuple(inputs))
+        self._handles.append(handle)
+        nslots = sum(len(outp.Props) for outp in gtf.Outputs)
+        if nslots == 1:
+            return [key]
+        return [self._add_op((key,), f"item[{i}]", f"item[{i}]", handle,
+                             lambda: partial(_item, i))
+                for i in range(nslots)]
+
+    def add_output(self, node: str, prop: str, key: tuple) -> None:
+        """Write column `key` to target property `prop` of `node`."""
+        self._outputs.append((node, prop, key, None))
+        if node not in self._targets:
+            self._targets.append(node)
+
+    def _compile(self, handle: str, gtf: GeneralTransform,
+                 inputs: tuple) -> tuple:
+        for step in gtf.Steps:
+            if step.Package.Name == "Identity" and len(inputs) == 1:
+                continue
+            inputs = (self._add_op(inputs, step_signature(step),
+                                   step.Entrypoint, handle,
+                                   lambda: batch_step(step),
+                                   pure=step_is_pure(step)),)
+        if len(inputs) > 1:
+            # inputs passed through unchanged
+            inputs = (self._add_op(inputs, "Identity", "identity",
+                                   handle, lambda: _pass_column),)
+        return inputs[0]
+
+    def _add_op(self, inputs: tuple, sig: str, entrypoint: str,
+                handle: str, get_func: Callable, pure: bool = True) -> tuple:
+        if pure:
+            for (kind, p) in [k for k in inputs if k[0] == "src"]:
+                if p not in self._op_sources:
+                    self._op_sources.append(p)
+        key = (inputs, sig) if pure else (inputs, sig, handle)
+        if key in self._ops_by_key:
+            self._ops_by_key[key].handles.append(handle)
+        else:
+            op = PlanOp(key, inputs, get_func(), entrypoint, handle,
+                        pure=pure)
+            if self._instruments is not None:
+                op.func = self._instruments.instrument_op(
+                    self._source_node, op)
+            self._ops_by_key[key] = op
+            self._ops.append(op)
+        return key
+
+    def execute(self, chunk: Sequence[dict],
+                categorical: str | Collection[str] | None = "auto",
+                errors: List[dict] | None = None) -> List[dict]:
+        """
+        Convert a chunk of source node records (dicts of property values),
+        returning a list with one dict per record, of the form
+        { <target node>: { <target prop>: <value>, ... }, ... }.
+        A transform is not applied to a record lacking any of its inputs;
+        as with its scalar form, outputs for which a multi-output step
+        returns no value are left out.
+
+        `categorical` selects the source columns to dictionary-encode, so
+        that (pure) steps run once per distinct value rather than once per
+        row:
+        'auto' (the default) encodes those that look low-cardinality, a
+        collection of source property names encodes exactly those, and
+        None encodes none.
+
+        By default, a step that fails raises. If `errors` is a list, a
+        step that fails on a chunk is instead retried record by record:
+        records on which it fails get no output from the transforms that
+        use the step, and an error record (see converters.errors) for each
+        is appended to `errors`.
+        """
+        outs = [{n: {} for n in self._targets} for _ in chunk]
+        cols = self._run(chunk, categorical, errors)
+        for (n, p, key, idx) in self._outputs:
+            (rows, col) = cols[key]
+            if rows is None:
+                rows = range(len(chunk))
+            if idx is None:
+                for (i, v) in zip(rows, col):
+                    outs[i][n][p] = v
+            else:
+                # as in the scalar form, outputs a step returned no value
+                # for are left out
+                for (i, v) in zip(rows, col):
+                    if isinstance(v, (list, tuple)) and idx < len(v):
+                        outs[i][n][p] = v[idx]
+        return outs
+
+    def execute_columns(self, chunk: Sequence[dict],
+                        categorical: str | Collection[str] | None = "auto",
+                        errors: List[dict] | None = None
+                        ) -> Dict[str, dict]:
+        """
+        As execute(), but return the converted chunk by column, as
+        { <target node>: { <target prop>: <column>, ... }, ... }.
+        Where a transform did not apply to a record, or its step returned
+        no value for an output, the output column holds None.
+        Dictionary-encoded columns are returned as Categoricals,
+        unexpanded.
+        """
+        outs = {n: {} for n in self._targets}
+        cols = self._run(chunk, categorical, errors)
+        for (n, p, key, idx) in self._outputs:
+            (rows, col) = cols[key]
+            if idx is not None:
+                col = (col.item(idx) if isinstance(col, Categorical)
+                       else _item(idx, col))
+            if rows is not None:
+                full = [None] * len(chunk)
+                for (i, v) in zip(rows, col):
+                    full[i] = v
+                col = full
+            outs[n][p] = col
+        return outs
+
+    def _run(self, chunk: Sequence[dict],
+             categorical: str | Collection[str] | None,
+             errors: List[dict] | None = None) -> dict:
+        # column key -> (row indices, or None for all rows; column values)
+        cols = {}
+        for p in self._sources:
+            try:
+                cols[("src", p)] = (None, [rec[p] for rec in chunk])
+            except KeyError:
+                rows = [i for (i, rec) in enumerate(chunk) if p in rec]
+                cols[("src", p)] = (rows, [chunk[i][p] for i in rows])
+        if categorical:
+            for p in self._op_sources:
+                (rows, col) = cols[("src", p)]
+                if (p in categorical if categorical != "auto"
+                        else low_cardinality(col)):
+                    try:
+                        cols[("src", p)] = (rows, Categorical.encode(col))
+                    except TypeError:
+                        pass
+        for op in self._ops:
+            (rows, args) = _align([cols[k] for k in op.inputs])
+            if rows is not None and not rows:
+                cols[op.key] = (rows, [])
+            elif errors is None:
+                cols[op.key] = (rows, _apply(op, args))
+            else:
+                try:
+                    cols[op.key] = (rows, _apply(op, args))
+                except Exception:
+                    cols[op.key] = _apply_by_row(op, rows, args, errors)
+        return cols
+
+    def summary(self) -> dict:
+        """Counts of the plan's transforms, source reads, ops and copies."""
+        return {
+            "transforms": len(self._handles),
+            "sources": len(self._sources),
+            "ops": len(self._ops),
+            "shared_ops": len([op for op in self._ops
+                               if len(op.handles) > 1]),
+            "outputs": len(self._outputs),
+            "copies": len([o for o in self._outputs if o[2][0] == "src"]),
+        }
+
+    def describe(self) -> str:
+        """Return a human-readable listing of the plan."""
+        names = {}
+        lines = []
+        for p in self._sources:
+            names[("src", p)] = f"{self._source_node}.{p}"
+            lines.append(f"read  {names[('src', p)]}")
+        for (i, op) in enumerate(self._ops):
+            names[op.key] = f"${i}"
+            lines.append(
+                f"op    ${i} = {op.entrypoint}("
+                + ", ".join(names[k] for k in op.inputs)
+                + f")  [{', '.join(op.handles)}]")
+        for (n, p, key, idx) in self._outputs:
+            src = names[key] + ("" if idx is None else f"[{idx}]")
+            verb = "copy " if key[0] == "src" else "write"
+            lines.append(f"{verb} {n}.{p} <- {src}")
+        return "\n".join(lines)
+
+
+def _apply(op: PlanOp, args: List[list]) -> list | Categorical:
+    if not op.pure:
+        return op.func(*[_decoded(col) for col in args])
+    if len(args) == 1 and isinstance(args[0], Categorical):
+        return args[0].map(op.func)
+    return op.func(*args)
+
+
+def _apply_by_row(op: PlanOp, rows: list | None, args: List[list],
+                  errors: List[dict]) -> Tuple[list, list]:
+    """
+    Apply `op` record by record, collecting errors. Returns the rows it
+    succeeded on and their values.
+    """
+    args = [_decoded(col) for col in args]
+    if rows is None:
+        rows = range(len(args[0]))
+    (ok, col) = ([], [])
+    for (i, vals) in zip(rows, zip(*args)):
+        try:
+            (v,) = op.func(*[[x] for x in vals])
+        except Exception as e:
+            errors.append(error_record(i, op.handles, op.entrypoint,
+                                       vals, e))
+            continue
+        ok.append(i)
+        col.append(v)
+    return (ok, col)
+
+
+def _align(entries: List[Tuple[list | None, list]]) -> Tuple[list | None,
+                                                             List[list]]:
+    """
+    Restrict a set of (rows, column) entries to the rows they have in
+    common. Returns the common rows (None if all) and the aligned columns.
+    """
+    if all(rows is None for (rows, _) in entries):
+        if len(entries) > 1:
+            entries = [(rows, _decoded(col)) for (rows, col) in entries]
+        return (None, [col for (_, col) in entries])
+    if len(entries) == 1:
+        return (entries[0][0], [entries[0][1]])
+    entries = [(rows, _decoded(col)) for (rows, col) in entries]
+    common = None
+    for (rows, _) in entries:
+        if rows is not None:
+            common = set(rows) if common is None else common & set(rows)
+    common = sorted(common)
+    aligned = []
+    for (rows, col) in entries:
+        if rows is None:
+            aligned.append([col[i] for i in common])
+        else:
+            pos = {r: j for (j, r) in enumerate(rows)}
+            aligned.append([col[pos[i]] for i in common])
+    return (common, aligned)
+
+
+def _item(idx: int, col: list) -> list:
+    # element `idx` of each (list) value of a multi-output column, or None
+    return [output_item(v, idx) for v in col]
+
+
+def _decoded(col: list | Categorical) -> list:
+    return col.decode() if isinstance(col, Categorical) else col
@@ -0,0 +1,187 @@
+"""
+bento_transforms.converters.route
+
+Convert across several models in one pass.
+
+A ConverterRegistry holds Converters, each indexed as a hop from its
+from_model to its to_model ((Model, Version) pairs; see Converter). It
+finds the shortest route -- a sequence of hops -- between two endpoints,
+e.g. CCDI 3.0.0 -> CCDI 3.1.0 -> CDS 10.0.0 -> GC 1.0.
+
+A route is compiled, per source node, into a single ExecutionPlan (see
+converters.plan): working back from each target property of the last hop,
+the transform producing it is chained to the transforms producing its
+inputs at the hop before, and so on down to source properties. Each
+target property thus gets a fused pipeline of batch steps from the source
+columns, and no intermediate records are built; steps shared by several
+targets are computed once. Target properties that cannot be traced back
+to properties of the source node are listed by RoutePlan.unreachable.
+"""
+from __future__ import annotations
+from collections import deque
+from typing import Collection, Dict, Iterable, Iterator, List, Tuple
+from toolz import partition_all
+from .plan import ExecutionPlan
+
+Endpoint = Tuple[str, str | None]
+
+
+class RoutePlan(ExecutionPlan):
+    """
+    The ExecutionPlan of a route from the records of `source_node` (see
+    module docstring).
+    """
+    def __init__(self, source_node: str, hops: List):
+        super().__init__(source_node, {})
+        self._route = [(c.from_model, c.to_model) for c in hops]
+        self.unreachable = []
+        # (level, '<node>.<prop>') -> column key or None, and
+        # (level, handle) -> output column keys, while compiling
+        (columns, compiled) = ({}, {})
+        last = hops[-1]
+        reducers = set(last.reducer_transforms())
+        done = set()
+        for (hdl, gtf) in last.transforms.items():
+            if hdl in reducers:
+                continue
+            for outp in gtf.Outputs:
+                for p in outp.Props:
+                    prop = f"{outp.Node}.{p}"
+                    if prop in done:
+                        continue
+                    done.add(prop)
+                    key = self._column(hops, columns, compiled, len(hops),
+                                       prop)
+                    if key is None:
+                        self.unreachable.append(prop)
+                    else:
+                        self.add_output(outp.Node, p, key)
+
+    @property
+    def route(self) -> List[Tuple[Endpoint, Endpoint]]:
+        """The hops of the route, as (from model, to model) pairs."""
+        return list(self._route)
+
+    def _column(self, hops: List, columns: dict, compiled: dict,
+                level: int, prop: str) -> tuple | None:
+        # column key of property `prop` of the model at `level` (0: the
+        # source model; i: the target model of hop i)
+        if (level, prop) in columns:
+            return columns[(level, prop)]
+        (node, p) = prop.split(".", 1)
+        if level == 0:
+            key = self.source(p) if node == self._source_node else None
+        else:
+            key = self._produce(hops, columns, compiled, level, prop)
+        columns[(level, prop)] = key
+        return key
+
+    def _produce(self, hops: List, columns: dict, compiled: dict,
+                 level: int, prop: str) -> tuple | None:
+        hop = hops[level - 1]
+        reducers = set(hop.reducer_transforms())
+        for hdl in hop.transforms_producing(prop):
+            if hdl in reducers:
+                continue
+            gtf = hop.transforms[hdl]
+            if (level, hdl) not in compiled:
+                inputs = [self._column(hops, columns, compiled, level - 1,
+                                       f"{i.Node}.{p}")
+                          for i in gtf.Inputs for p in i.Props]
+                if None in inputs:
+                    continue
+                (model, version) = hop.to_model
+                compiled[(level, hdl)] = self.compile_transform(
+                    f"{model} {version}:{hdl}", gtf, inputs)
+            outs = [f"{o.Node}.{p}" for o in gtf.Outputs for p in o.Props]
+            return compiled[(level, hdl)][outs.index(prop)]
+        return None
+
+
+class ConverterRegistry:
+    """
+    An index of Converters by the (Model, Version) pairs they convert
+    between, which routes and converts records across several of them.
+    """
+    def __init__(self, converters: Iterable = ()):
+        self._hops = {}  # from endpoint -> { to endpoint: Converter }
+        self._plans = {}
+        for cvtr in converters:
+            self.add(cvtr)
+
+    def add(self, cvtr) -> None:
+        """Register Converter `cvtr`, as a hop from_model -> to_model."""
+        (frm, to) = (cvtr.from_model, cvtr.to_model)
+        if to in self._hops.get(frm, {}):
+            raise RuntimeError(f"A converter from {frm} to {to} is already "
+                               "registered")
+        self._hops.setdefault(frm, {})[to] = cvtr
+        self._plans.clear()
+
+    def endpoints(self) -> List[Endpoint]:
+        """Return the (Model, Version) pairs of the registered hops."""
+        eps = {}
+        for (frm, tos) in self._hops.items():
+            eps[frm] = None
+            for to in tos:
+                eps[to] = None
+        return list(eps)
+
+    def route(self, frm: str | Endpoint, to: str | Endpoint) -> List:
+        """
+        Return the Converters of the shortest route from endpoint `frm`
+        to endpoint `to`, each a (Model, Version) pair, or a Model name
+        (matching any version). Raises RuntimeError if there is none.
+        """
+        (frm, to) = (_endpoint(frm), _endpoint(to))
+        starts = [ep for ep in self.endpoints() if _matches(ep, frm)]
+        via = {ep: None for ep in starts}
+        queue = deque(starts)
+        while queue:
+            ep = queue.popleft()
+            if _matches(ep, to) and via[ep] is not None:
+                hops = []
+                while via[ep] is not None:
+                    (ep, cvtr) = via[ep]
+                    hops.append(cvtr)
+                return hops[::-1]
+            for (nxt, cvtr) in self._hops.get(ep, {}).items():
+                if nxt not in via:
+                    via[nxt] = (ep, cvtr)
+                    queue.append(nxt)
+        raise RuntimeError(f"No route from {frm} to {to}")
+
+    def plan(self, frm: str | Endpoint, to: str | Endpoint,
+             source_node: str) -> RoutePlan:
+        """
+        Return the fused execution plan converting `source_node` records
+        along the route from `frm` to `to`. Plans are compiled once and
+        cached.
+        """
+        k = (_endpoint(frm), _endpoint(to), source_node)
+        if k not in self._plans:
+            self._plans[k] = RoutePlan(source_node, self.route(frm, to))
+        return self._plans[k]
+
+    def convert_records(self, records: Iterable[dict],
+                        frm: str | Endpoint, to: str | Endpoint,
+                        source_node: str, chunksize: int = 1000,
+                        categorical: str | Collection[str] | None = "auto"
+                        ) -> Iterator[Dict[str, dict]]:
+        """
+        Convert `source_node` records from model `frm` to model `to`, in
+        one pass, `chunksize` at a time (see Converter.convert_records()).
+        Yields one dict per record, of the form
+        { <target node>: { <target prop>: <value>, ... }, ... }.
+        """
+        plan = self.plan(frm, to, source_node)
+        for chunk in partition_all(chunksize, records):
+            yield from plan.execute(chunk, categorical=categorical)
+
+
+def _endpoint(ep: str | Endpoint) -> Endpoint:
+    return (ep, None) if isinstance(ep, str) else tuple(ep)
+
+
+def _matches(ep: Endpoint, want: Endpoint) -> bool:
+    return ep[0] == want[0] and want[1] in (None, ep[1])
@@ -0,0 +1,149 @@
+"""
+bento_transforms.converters.steps
+
+Resolve transform steps (TfStepSpec) to callables, with their Params
+bound: in scalar form (one value per call) for create_transform_function,
+and in batch form (one column per call) for create_batch_function and
+execution plans.
+"""
+from __future__ import annotations
+import importlib
+import json
+from functools import partial
+from typing import Callable
+from pydantic import ValidationError
+from ..mdf.pymodels import TfStepSpec
+from ..tflib import registry
+from ..tflib.purity import is_pure
+
+# (package, version, entrypoint) -> step function
+_resolved = {}
+
+
+def scalar_step(step: TfStepSpec) -> Callable:
+    """Return the step function, with Params bound."""
+    if (step.Package.Name == "Identity"):
+        return _identity
+    method = resolve_step(step)
+    kw = step_kwargs(step, method)
+    if kw:
+        method = partial(method, **kw)
+    return method
+
+
+def batch_step(step: TfStepSpec) -> Callable:
+    """
+    Return the batch form of the step, with Params bound: its registered
+    batch kernel (see tflib.kernels) if any, otherwise the step function
+    mapped over the input column(s).
+    """
+    if (step.Package.Name == "Identity"):
+        return _pass_column
+    method = resolve_step(step)
+    kw = step_kwargs(step, method)
+    kernel = getattr(method, "batch", None)
+    if kernel is not None:
+        return partial(kernel, **kw)
+    return partial(_elementwise, partial(method, **kw))
+
+
+def step_signature(step: TfStepSpec) -> str:
+    """
+    Return a string identifying the computation a step performs:
+    its package, entrypoint and Params.
+    """
+    return json.dumps([step.Package.Name, step.Package.Version,
+                       step.Entrypoint, step.Params],
+                      sort_keys=True, default=str)
+
+
+def step_is_pure(step: TfStepSpec) -> bool:
+    """
+    Return False if the step's function is declared impure (see
+    tflib.purity).
+    """
+    return step.Package.Name == "Identity" or is_pure(resolve_step(step))
+
+
+def output_item(value, idx: int):
+    """
+    Return output `idx` of a value of a multi-output step (a list, one
+    element per output), or None where the step returned fewer elements
+    than it has outputs. (The scalar form of a transform, which zips
+    outputs with elements, leaves such outputs out.)
+    """
+    if isinstance(value, (list, tuple)) and idx < len(value):
+        return value[idx]
+    return None
+
+
+def _identity(x):
+    return x
+
+
+def _elementwise(func: Callable, *columns) -> list:
+    if len(columns) == 1:
+        return [func(x) for x in columns[0]]
+    return [func(*row) for row in zip(*columns)]
+
+
+def _pass_column(*columns):
+    if len(columns) == 1:
+        return columns[0]
+    return [list(row) for row in zip(*columns)]
+
+
+def resolve_step(step: TfStepSpec) -> Callable:
+    """
+    Return the function named by the step's Package and Entrypoint.
+    The function is looked up in the tflib registry (see
+    tflib.registry), or failing that, imported. Resolutions are cached
+    for the life of the process, across transforms and converters.
+    """
+    key = (step.Package.Name.replace("-", "_"), step.Package.Version,
+           step.Entrypoint)
+    method = _resolved.get(key)
+    if method is None:
+        method = registry.lookup(*key)
+        if method is None:
+            method = _import_step(key[0], step.Entrypoint)
+        _resolved[key] = method
+    return method
+
+
+def _import_step(mod: str, entrypoint: str) -> Callable:
+    ep = entrypoint.split(".")
+    mth = ep.pop()
+    method = None
+    qmod = ".".join([mod]+ep)
+    try:
+        module = importlib.import_module(qmod)
+        if hasattr(module, mth):
+            method = getattr(module, mth)
+    except ModuleNotFoundError:
+        # check if imported to the top level via __init__.py
+        module = importlib.import_module(".".join([mod, "__init__"]))
+        if hasattr(module, ".".join(ep)):
+            method = getattr(getattr(module, ".".join(ep)), mth, None)
+    if method is None:
+        raise RuntimeError(f"Module {mod} has no method '{mth}'")
+    return method
+
+
+def step_kwargs(step: TfStepSpec, method: Callable) -> dict:
+    """
+    Return the keyword arguments that bind the step's Params to `method`.
+    If `method` declares a params model (see tflib.params), the Params are
+    validated against it here, once, and the model instance is bound;
+    otherwise the raw Params (if any) are bound.
+    """
+    model = getattr(method, "params_model", None)
+    if model is None:
+        return {} if step.Params is None else {"params": step.Params}
+    try:
+        return {"params": model(**(step.Params or {}))}
+    except (ValidationError, TypeError) as e:
+        raise RuntimeError(f"Invalid Params for step '{step.Entrypoint}' "
+                           f"(processing {step.Params}): {e}") from e
+
+
@@ -1,21 +1,78 @@
+import hashlib
+import json
 import minicypher as mc
 from toolz import first, last
 from itertools import pairwise
-from bento_meta.mdb import make_nanoid
 from bento_meta.objects import Node, Property
 from bento_meta.tf_objects import Transform, TfStep
 
+# alphabet of bento_meta.mdb.make_nanoid
+NANOID_ALPHABET = ("abcdefghijkmnopqrstuvwxyzABCDEFGHJKMNPQRSTUVWXYZ"
+                   "0123456789")
+
+
+def content_nanoid(*parts, size: int = 6) -> str:
+    """
+    Return a nanoid derived from `parts` (JSON-serializable values), in
+    the form of bento_meta.mdb.make_nanoid's: the same parts always give
+    the same nanoid.
+    """
+    n = int.from_bytes(hashlib.sha256(json.dumps(parts).encode()).digest(),
+                       "big")
+    out = []
+    for _ in range(size):
+        (n, i) = divmod(n, len(NANOID_ALPHABET))
+        out.append(NANOID_ALPHABET[i])
+    return "".join(out)
+
+
+def tf_signature(tf: Transform) -> list:
+    """
+    The sorted (Model, Version) pairs of the input properties of `tf`,
+    and those of its output properties. (Handles are only unique within a
+    pair of models.)
+    """
+    return [sorted({(p.model, p.version or "") for p in props.values()})
+            for props in (tf.input_props, tf.output_props)]
+
+
+def tf_nanoid(tf: Transform) -> str:
+    """
+    The nanoid of transform `tf`, derived from its handle and signature
+    (see tf_signature()).
+    """
+    return content_nanoid("transform", tf.handle, tf_signature(tf))
+
+
+def step_nanoids(tf: Transform) -> list:
+    """
+    The nanoids of the steps of `tf`, in order, derived from the
+    transform's handle and signature and each step's position and
+    content, so that re-upserting an unchanged transform merges the same
+    step nodes.
+    """
+    sig = tf_signature(tf)
+    ids = []
+    stp = tf.first_step
+    while stp is not None:
+        ids.append(content_nanoid("tf_step", tf.handle, sig, len(ids),
+                                  stp.package, stp.version, stp.entrypoint,
+                                  stp.params_json))
+        stp = stp.next_step
+    return ids
+
 
 def create_tf_and_steps(tf: Transform) -> dict:
     stmts = []
-    tfn_id = make_nanoid()
+    tfn_id = tf_nanoid(tf)
+    stp_ids = iter(step_nanoids(tf))
     tfn = mc.N(label="transform",
                props=[mc.P(handle="handle", value=tf.handle),
                       mc.P(handle="nanoid", value=tfn_id)])
     stepns = {}
     stp = tf.first_step
     while stp is not None:
-        stpn_id = make_nanoid()
+        stpn_id = next(stp_ids)
         stepns[stpn_id] = mc.N(label="tf_step",
                                props=[mc.P(handle="package", value=stp.package),
                                       mc.P(handle="version", value=stp.version),
@@ -67,7 +124,9 @@ def link_tf_to_io(tf_nanoid: str, tf: Transform) -> list:
     stmts = []
     tfn = mc.N(label="transform",
                props=[mc.P(handle="nanoid", value=tf_nanoid)])
-    for prop in tf.input_props.values():
+    # links record the position of the property among the inputs (or
+    # outputs), which the graph would not otherwise preserve
+    for (i, prop) in enumerate(tf.input_props.values()):
         t = t_from_property(prop)
         stmts.append(
             mc.Statement(
@@ -75,14 +134,15 @@ def link_tf_to_io(tf_nanoid: str, tf: Transform) -> list:
                 mc.With(t.nodes()[1].plain_var(),
                          tfn.plain_var()),
                 mc.Merge(
-                    mc.R(Type="value_as_tf_input").relate(
+                    mc.R(Type="value_as_tf_input",
+                         props=[mc.P(handle="position", value=i)]).relate(
                          t.nodes()[1].plain_var(),
                          tfn.plain_var())
                 ),
                 terminate=True
             )
         )
-    for prop in tf.output_props.values():
+    for (i, prop) in enumerate(tf.output_props.values()):
         t = t_from_property(prop)
         stmts.append(
             mc.Statement(
@@ -90,7 +150,8 @@ def link_tf_to_io(tf_nanoid: str, tf: Transform) -> list:
                 mc.With(tfn.plain_var(),
                         t.nodes()[1].plain_var()),
                 mc.Merge(
-                    mc.R(Type="tf_output_as_value").relate(
+                    mc.R(Type="tf_output_as_value",
+                         props=[mc.P(handle="position", value=i)]).relate(
                         tfn.plain_var(),
                         t.nodes()[1].plain_var())
                 ),
@@ -114,3 +175,114 @@ def t_from_property(prop: Property):
                     mc.P(handle="handle", value=prop.handle)])
     r = mc.R(Type="has_property")
     return r.relate(n, p)
+
+
+# Bulk upsert: one parameterized statement per kind of graph element, each
+# applied to a list of rows (parameter $rows) with UNWIND. Transform and
+# tf_step nodes are merged on their nanoids, which are derived from their
+# content (see tf_nanoid() and step_nanoids()), so an unchanged transform
+# is merged onto the same nodes; tf_step properties are then set, since
+# MERGE cannot match on null property values.
+BULK_STMTS = {
+    "transform": (
+        "UNWIND $rows AS row "
+        "MERGE (t:transform {handle: row.handle, nanoid: row.nanoid})"),
+    "tf_step": (
+        "UNWIND $rows AS row "
+        "MERGE (s:tf_step {nanoid: row.nanoid}) SET s += row.props"),
+    "first_tf_step": (
+        "UNWIND $rows AS row "
+        "MATCH (t:transform {nanoid: row.tf}), (s:tf_step {nanoid: row.step}) "
+        "MERGE (t)-[:first_tf_step]->(s)"),
+    "last_tf_step": (
+        "UNWIND $rows AS row "
+        "MATCH (t:transform {nanoid: row.tf}), (s:tf_step {nanoid: row.step}) "
+        "MERGE (t)-[:last_tf_step]->(s)"),
+    "next_tf_step": (
+        "UNWIND $rows AS row "
+        "MATCH (a:tf_step {nanoid: row.src}), (b:tf_step {nanoid: row.dst}) "
+        "MERGE (a)-[:next_tf_step]->(b)"),
+    "value_as_tf_input": (
+        "UNWIND $rows AS row "
+        "MATCH (n:node {model: row.node_model, version: row.node_version, "
+        "handle: row.node})-[:has_property]->"
+        "(p:property {model: row.model, version: row.version, "
+        "handle: row.prop}), (t:transform {nanoid: row.tf}) "
+        "MERGE (p)-[:value_as_tf_input {position: row.position}]->(t)"),
+    "tf_output_as_value": (
+        "UNWIND $rows AS row "
+        "MATCH (n:node {model: row.node_model, version: row.node_version, "
+        "handle: row.node})-[:has_property]->"
+        "(p:property {model: row.model, version: row.version, "
+        "handle: row.prop}), (t:transform {nanoid: row.tf}) "
+        "MERGE (t)-[:tf_output_as_value {position: row.position}]->(p)"),
+}
+
+
+def tf_rows(tf: Transform) -> dict:
+    """
+    Return the BULK_STMTS parameter rows that upsert `tf`, as
+    { <kind>: [ <row>, ... ] }: the same nodes and links as
+    create_tf_and_steps() and link_tf_to_io().
+    """
+    rows = {k: [] for k in BULK_STMTS}
+    tfn_id = tf_nanoid(tf)
+    rows["transform"].append({"handle": tf.handle, "nanoid": tfn_id})
+    step_ids = step_nanoids(tf)
+    stp = tf.first_step
+    for stp_id in step_ids:
+        props = {"package": stp.package, "version": stp.version,
+                 "entrypoint": stp.entrypoint,
+                 "params_json": stp.params_json}
+        rows["tf_step"].append(
+            {"nanoid": stp_id,
+             "props": {k: v for (k, v) in props.items() if v is not None}})
+        stp = stp.next_step
+    if step_ids:
+        rows["first_tf_step"].append({"tf": tfn_id, "step": step_ids[0]})
+        rows["last_tf_step"].append({"tf": tfn_id, "step": step_ids[-1]})
+    rows["next_tf_step"].extend({"src": a, "dst": b}
+                                for (a, b) in pairwise(step_ids))
+    for (kind, props) in (("value_as_tf_input", tf.input_props),
+                          ("tf_output_as_value", tf.output_props)):
+        for (i, prop) in enumerate(props.values()):
+            node = [e for e in prop.belongs.values() if isinstance(e, Node)][0]
+            rows[kind].append({"tf": tfn_id, "position": i,
+                               "node_model": node.model,
+                               "node_version": node.version,
+                               "node": node.handle, "model": prop.model,
+                               "version": prop.version, "prop": prop.handle})
+    return rows
+
+
+# Sync: statements removing transforms (by handle) before the changed
+# ones are upserted again. drop_transform deletes the transforms with the
+# handle, and their steps, except the one with nanoid row.keep (if
+# given); only transforms from model row.from_model to model row.to_model
+# (and versions, if not null) are matched, as in graph.retrieve.IO_QUERY,
+# since handles are not unique across models. clear_transform deletes the
+# steps and property links of the transform with nanoid row.keep.
+SYNC_STMTS = {
+    "drop_transform": (
+        "UNWIND $rows AS row "
+        "MATCH (fn:node {model: row.from_model})-[:has_property]->"
+        "(:property)-[:value_as_tf_input]->"
+        "(t:transform {handle: row.handle})-[:tf_output_as_value]->"
+        "(:property)<-[:has_property]-(tn:node {model: row.to_model}) "
+        "WHERE (row.from_version IS NULL OR fn.version = row.from_version) "
+        "AND (row.to_version IS NULL OR tn.version = row.to_version) "
+        "AND (row.keep IS NULL OR t.nanoid <> row.keep) "
+        "WITH DISTINCT t "
+        "OPTIONAL MATCH (t)-[:first_tf_step]->(:tf_step)"
+        "-[:next_tf_step*0..]->(s:tf_step) "
+        "DETACH DELETE s, t"),
+    "clear_transform": (
+        "UNWIND $rows AS row "
+        "MATCH (t:transform {nanoid: row.keep}) "
+        "OPTIONAL MATCH (t)-[:first_tf_step]->(:tf_step)"
+        "-[:next_tf_step*0..]->(s:tf_step) "
+        "DETACH DELETE s "
+        "WITH DISTINCT t "
+        "OPTIONAL MATCH (t)-[r:value_as_tf_input|tf_output_as_value]-() "
+        "DELETE r"),
+}
@@ -6,13 +6,19 @@ Store and retrieve transforms using MDB.
 """
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
-from typing import List
+from typing import Dict, List, Tuple
+from toolz import partition_all
 from ..mdf.pymodels import GeneralTransform
 from .mc_utils import (
+    BULK_STMTS,
+    SYNC_STMTS,
     create_tf_and_steps,
-    link_tf_to_io
+    link_tf_to_io,
+    tf_nanoid,
+    tf_rows
 )
     
 from bento_meta.objects import Node, Property
@@ -21,6 +27,7 @@ from bento_meta.tf_objects import Transform, TfStep
 
 class TransformModel:
     def __init__(self, gtfs=dict[GeneralTransform]):
+        self._gtfs = dict(gtfs)
         self._transforms = {}
         for (hdl, tf) in gtfs.items():
             self._transforms[hdl] = gtf_to_tf_graph(tf, hdl)
@@ -38,7 +45,89 @@ class TransformModel:
                 link_tf_to_io(ss['tf_nanoid'], tf)
             )
         return stmts
-                 
+
+    def cypher_for_bulk_upsert(self, batch_size: int = 1000
+                               ) -> List[Tuple[str, dict]]:
+        """
+        Return the upsert of all transforms as a few parameterized
+        statements, each with parameter payloads of at most `batch_size`
+        rows: a list of (statement, {"rows": [ ... ]}) pairs, to run in
+        order. Creates the same nodes and links as cypher_for_upsert()
+        (see mc_utils.BULK_STMTS), in far fewer round trips, and lets the
+        server reuse the statements' plans.
+        """
+        return self._bulk(self.transforms, batch_size)
+
+    def diff(self, stored: Dict[str, GeneralTransform]) -> dict:
+        """
+        Compare the transforms with `stored`, a snapshot of the transforms
+        in MDB (e.g., from graph.retrieve.load_transforms()). Returns the
+        handles to "create", "update" (changed content) and "delete", and
+        the number "unchanged".
+        """
+        current = {hdl: content_hash(gtf) for (hdl, gtf) in self._gtfs.items()}
+        before = {hdl: content_hash(gtf) for (hdl, gtf) in stored.items()}
+        return {
+            "create": [h for h in current if h not in before],
+            "update": [h for h in current
+                       if h in before and current[h] != before[h]],
+            "delete": [h for h in before if h not in current],
+            "unchanged": sum(1 for h in current
+                             if before.get(h) == current[h]),
+        }
+
+    def cypher_for_sync(self, stored: Dict[str, GeneralTransform],
+                        batch_size: int = 1000) -> List[Tuple[str, dict]]:
+        """
+        Return the statements that bring MDB from snapshot `stored` to the
+        current transforms (see diff()), as for cypher_for_bulk_upsert():
+        deleted transforms are removed with their steps; changed ones have
+        their steps and property links replaced (keeping the transform
+        node, and removing any others with its handle between the same
+        models); new and changed ones are then upserted. Transforms of
+        other models are never touched, even if they share a handle, nor
+        are unchanged ones, so an empty list means MDB is up to date.
+        """
+        diff = self.diff(stored)
+        drop = ([{"handle": h, "keep": None, **_endpoints(stored[h])}
+                 for h in diff["delete"]] +
+                [{"handle": h, "keep": tf_nanoid(self.transforms[h]),
+                  **_endpoints(stored[h])}
+                 for h in diff["update"]])
+        clear = drop[len(diff["delete"]):]
+        stmts = [(SYNC_STMTS[k], {"rows": list(batch)})
+                 for (k, rows) in (("drop_transform", drop),
+                                   ("clear_transform", clear))
+                 for batch in partition_all(batch_size, rows)]
+        changed = diff["create"] + diff["update"]
+        return stmts + self._bulk({h: self.transforms[h] for h in changed},
+                                  batch_size)
+
+    @staticmethod
+    def _bulk(transforms: dict, batch_size: int) -> List[Tuple[str, dict]]:
+        rows = {k: [] for k in BULK_STMTS}
+        for tf in transforms.values():
+            for (k, rs) in tf_rows(tf).items():
+                rows[k].extend(rs)
+        return [(BULK_STMTS[k], {"rows": list(batch)})
+                for k in BULK_STMTS
+                for batch in partition_all(batch_size, rows[k])]
+
+
+def _endpoints(gtf: GeneralTransform) -> dict:
+    # the models (and versions) a stored transform converts between, which
+    # scope its handle (see mc_utils.SYNC_STMTS)
+    return {"from_model": gtf.Inputs[0].Model,
+            "from_version": gtf.Inputs[0].Version,
+            "to_model": gtf.Outputs[0].Model,
+            "to_version": gtf.Outputs[0].Version}
+
+
+def content_hash(gtf: GeneralTransform) -> str:
+    """Hash of a transform's inputs, outputs and steps."""
+    return hashlib.sha256(json.dumps(gtf.model_dump(), sort_keys=True,
+                                     default=str).encode()).hexdigest()
+
 
 def gtf_to_tf_graph(gtf: GeneralTransform, handle: str) -> Transform:
     tf = Transform({"handle": handle})
@@ -0,0 +1,145 @@
+"""
+bento_transforms.graph.retrieve
+
+Retrieve transforms stored in MDB (see graph.meta) as GeneralTransform
+objects, ready for Converter(gtfs=...).
+
+All transforms from one model to another are loaded with two queries:
+IO_QUERY finds the transforms having an input property in the from model
+and an output property in the to model, with all their input and output
+properties; STEPS_QUERY then walks the first_tf_step -> next_tf_step
+chain of each of them. Inputs and outputs are put in the order recorded
+by the 'position' of their links (see graph.mc_utils); links written
+without one sort last, by model, version, node and property.
+
+If both model versions are given, the transforms are cached as JSON in
+the directory named by the environment variable BENTO_TRANSFORMS_CACHE
+(see tflib.tables), keyed by models and versions, so that workers can be
+started without querying MDB. (Without a version, the model's latest
+transforms may change, so nothing is cached.)
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List
+from ..mdf.pymodels import GeneralTransform
+from ..tflib.tables import cache_dir
+
+IO_QUERY = (
+    "MATCH (fn:node {model: $from_model})-[:has_property]->(:property)"
+    "-[:value_as_tf_input]->(t:transform)-[:tf_output_as_value]->"
+    "(:property)<-[:has_property]-(tn:node {model: $to_model}) "
+    "WHERE ($from_version IS NULL OR fn.version = $from_version) "
+    "AND ($to_version IS NULL OR tn.version = $to_version) "
+    "WITH DISTINCT t "
+    "MATCH (n:node)-[:has_property]->(p:property)"
+    "-[r:value_as_tf_input|tf_output_as_value]-(t) "
+    "RETURN t.nanoid AS tf, t.handle AS handle, type(r) AS rel, "
+    "n.model AS model, n.version AS version, n.handle AS node, "
+    "p.handle AS prop, r.position AS position"
+)
+
+STEPS_QUERY = (
+    "UNWIND $tfs AS tf "
+    "MATCH (t:transform {nanoid: tf})-[:first_tf_step]->(s0:tf_step) "
+    "MATCH path = (s0)-[:next_tf_step*0..]->(s:tf_step) "
+    "OPTIONAL MATCH (t)-[:last_tf_step]->(l:tf_step) "
+    "RETURN tf, length(path) AS pos, s.package AS package, "
+    "s.version AS version, s.entrypoint AS entrypoint, "
+    "s.params_json AS params_json, s.nanoid = l.nanoid AS last"
+)
+
+
+def load_transforms(mdb, from_model: str, to_model: str,
+                    from_version: str | None = None,
+                    to_version: str | None = None,
+                    refresh: bool = False) -> Dict[str, GeneralTransform]:
+    """
+    Return the transforms from `from_model` to `to_model` stored in MDB
+    `mdb` (a bento_meta MDB, or a neo4j Driver), as { <handle>:
+    <GeneralTransform> }. With both versions given, the transforms are
+    read from the local cache if there, and cached otherwise (`refresh`
+    forces a query).
+    """
+    path = None
+    if from_version is not None and to_version is not None:
+        path = cache_path(from_model, from_version, to_model, to_version)
+        if path.exists() and not refresh:
+            with path.open() as f:
+                return {hdl: GeneralTransform(**gtf)
+                        for (hdl, gtf) in json.load(f).items()}
+    driver = getattr(mdb, "driver", mdb)
+    params = {"from_model": from_model, "to_model": to_model,
+              "from_version": from_version, "to_version": to_version}
+    io_rows = _read(driver, IO_QUERY, params)
+    tfs = sorted({r["tf"] for r in io_rows})
+    step_rows = _read(driver, STEPS_QUERY, {"tfs": tfs}) if tfs else []
+    gtfs = gtfs_from_rows(io_rows, step_rows)
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp.open("w") as f:
+            json.dump({hdl: gtf.model_dump() for (hdl, gtf) in gtfs.items()},
+                      f)
+        os.replace(tmp, path)
+    return gtfs
+
+
+def cache_path(from_model: str, from_version: str, to_model: str,
+               to_version: str) -> Path:
+    tag = json.dumps([from_model, from_version, to_model, to_version])
+    return (cache_dir() /
+            (hashlib.sha256(tag.encode()).hexdigest()[:24] + ".tfs.json"))
+
+
+def gtfs_from_rows(io_rows: List[dict],
+                   step_rows: List[dict]) -> Dict[str, GeneralTransform]:
+    """
+    Build GeneralTransforms from the rows returned by IO_QUERY and
+    STEPS_QUERY.
+    """
+    handles = {}
+    io = {}
+    io_rows = sorted(io_rows, key=lambda r: (
+        r.get("position") is None, r.get("position") or 0, r["model"],
+        r["version"], r["node"], r["prop"]))
+    for r in io_rows:
+        if handles.setdefault(r["handle"], r["tf"]) != r["tf"]:
+            raise RuntimeError(f"More than one transform with handle "
+                               f"'{r['handle']}'")
+        kind = "Inputs" if r["rel"] == "value_as_tf_input" else "Outputs"
+        (io.setdefault(r["tf"], {"Inputs": {}, "Outputs": {}})[kind]
+         .setdefault((r["model"], r["version"], r["node"]), [])
+         .append(r["prop"]))
+    steps = {}
+    for r in sorted(step_rows, key=lambda r: (r["tf"], r["pos"])):
+        steps.setdefault(r["tf"], []).append(r)
+    gtfs = {}
+    for (hdl, tf) in handles.items():
+        chain = steps.get(tf)
+        if not chain:
+            raise RuntimeError(f"Transform '{hdl}' has no steps in MDB")
+        if not chain[-1]["last"]:
+            raise RuntimeError(f"Transform '{hdl}': step chain does not end "
+                               "at its last_tf_step")
+        gtfs[hdl] = GeneralTransform(
+            **{kind: [{"Model": m, "Version": v, "Node": n,
+                       "Props": props}
+                      for ((m, v, n), props) in io[tf][kind].items()]
+               for kind in ("Inputs", "Outputs")},
+            Steps=[{"Package": {"Name": s["package"],
+                                "Version": s["version"]},
+                    "Entrypoint": s["entrypoint"],
+                    "Params": (None if s["params_json"] is None
+                               else json.loads(s["params_json"]))}
+                   for s in chain])
+    return gtfs
+
+
+def _read(driver, qry: str, parms: dict) -> List[dict]:
+    def txn_q(tx) -> List[dict]:
+        return tx.run(qry, parameters=parms).data()
+    with driver.session() as session:
+        return session.execute_read(txn_q)
@@ -1,12 +1,21 @@
 from __future__ import annotations
+from .kernels import kernel_for
+from .params import params_model, bind_params
+from .registry import register
 from .pymodels import (
     D2YParams,
     Y2DParams,
 )
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; batch kernels fall back to lists
+    np = None
 
 
+@register("arith.days_to_years")
+@params_model(D2YParams)
 def days_to_years(input: int | float | None,
-                  params: dict) -> int | None:
+                  params: dict | D2YParams) -> int | None:
     """
     Args:
         input: numeric value in days
@@ -16,14 +25,16 @@ def days_to_years(input: int | float | None,
     Returns:
         Converted value or None if sentinel detected
     """
-    params = D2YParams(**params)
+    params = bind_params(params, D2YParams)
     if input == params.sentinel or input is None:
         return None
     return round(input / params.divisor, params.precision)
 
 
+@register("arith.years_to_days")
+@params_model(Y2DParams)
 def years_to_days(input: int | float | None,
-                  params: dict) -> int:
+                  params: dict | Y2DParams) -> int:
     """
     Args:
         input: numeric value in years
@@ -32,7 +43,51 @@ def years_to_days(input: int | float | None,
     Returns:
         Converted value in days, or sentinel if input None
     """
-    params = Y2DParams(**params)
+    params = bind_params(params, Y2DParams)
     if input is None:
         return params.sentinel_if_null
     return round(input * params.multiplier)
+
+
+@kernel_for(days_to_years)
+def days_to_years_batch(inputs: list | np.ndarray,
+                        params: dict | D2YParams | None = None) -> list | np.ndarray:
+    """
+    Batch kernel for days_to_years.
+    A NumPy array input returns a float array, with NaN where the input
+    was the sentinel (or NaN): NaN stands in for the None of the scalar
+    function and of list input. (Arrays are only passed by callers of a
+    Converter's bfunction(); execution plans pass lists.)
+    """
+    params = bind_params(params, D2YParams)
+    divisor = params.divisor
+    precision = params.precision
+    sentinel = params.sentinel
+    if np is not None and isinstance(inputs, np.ndarray):
+        vals = inputs.astype(float)
+        out = np.round(vals / divisor, precision)
+        out[vals == sentinel] = np.nan
+        return out
+    return [None if (x is None or x == sentinel)
+            else round(x / divisor, precision)
+            for x in inputs]
+
+
+@kernel_for(years_to_days)
+def years_to_days_batch(inputs: list | np.ndarray,
+                        params: dict | Y2DParams | None = None) -> list | np.ndarray:
+    """
+    Batch kernel for years_to_days.
+    In a NumPy array input, NaN stands for the None of the scalar
+    function, and is converted to the sentinel_if_null value; the result
+    is a float array (of the ints the scalar function returns).
+    """
+    params = bind_params(params, Y2DParams)
+    multiplier = params.multiplier
+    sentinel_if_null = params.sentinel_if_null
+    if np is not None and isinstance(inputs, np.ndarray):
+        vals = inputs.astype(float)
+        return np.where(np.isnan(vals), sentinel_if_null,
+                        np.round(vals * multiplier))
+    return [sentinel_if_null if x is None else round(x * multiplier)
+            for x in inputs]
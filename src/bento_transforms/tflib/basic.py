@@ -1,11 +1,23 @@
 from typing import Any
+from .kernels import kernel_for
+from .registry import register
 
 
+@register("basic.identity")
 def identity(input: Any, params: None) -> Any:
     return input
 
 
+@register("basic.null")
 def null(input: Any, params: None) -> None:
     return None
 
 
+@kernel_for(identity)
+def identity_batch(inputs: list, params: None = None) -> list:
+    return inputs
+
+
+@kernel_for(null)
+def null_batch(inputs: list, params: None = None) -> list:
+    return [None] * len(inputs)
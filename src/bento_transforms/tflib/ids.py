@@ -1,30 +1,94 @@
 from __future__ import annotations
-from typing import List
+from typing import Any, List
 from .pymodels import UuidNS, UuidNSEnum
+from .kernels import kernel_for
+from .params import params_model, bind_params
+from .purity import impure
+from .registry import register
+import hashlib
 import uuid
 
+# Map enum to uuid constants
+NAMESPACES = {
+    UuidNSEnum.DNS: uuid.NAMESPACE_DNS,
+    UuidNSEnum.URL: uuid.NAMESPACE_URL,
+    UuidNSEnum.OID: uuid.NAMESPACE_OID,
+    UuidNSEnum.X500: uuid.NAMESPACE_X500
+}
 
+# version 5 and RFC 4122 variant bits, as set by uuid.UUID(version=5)
+_UUID5_MASK = ~((0xc000 << 48) | (0xf000 << 64))
+_UUID5_BITS = (0x8000 << 48) | (5 << 76)
+
+
+@register("ids.generate_uuid")
+@params_model(UuidNS)
 def generate_uuid(input: str | List[str],
-                  params: dict):
+                  params: dict | UuidNS):
     """
     Args:
         values: list/tuple of values to seed UUID
-        params.namespace: namespace enum member for uuid.uuid5 
+        params.namespace: namespace enum member for uuid.uuid5
+        params.binary: if True, return the 16 bytes of the UUID
     Returns:
-        UUID string
+        UUID string (or bytes)
     """
-    params = UuidNS(params)
+    params = bind_params(params, UuidNS)
     if not isinstance(input, (list, tuple)):
         input = [input]
 
-    # Map enum  to uuid constants
-    ns_map = {
-        UuidNSEnum.DNS: uuid.NAMESPACE_URL,
-        UuidNSEnum.URL: uuid.NAMESPACE_URL,
-        UuidNSEnum.OID: uuid.NAMESPACE_OID,
-        UuidNSEnum.X500: uuid.NAMESPACE_X500
-    }
-
-    namespace_obj = ns_map.get(params.namespace, uuid.NAMESPACE_DNS)
+    namespace_obj = NAMESPACES.get(params.namespace, uuid.NAMESPACE_DNS)
     seed = "_".join(str(v) for v in input if v is not None)
-    return str(uuid.uuid5(namespace_obj, seed))
+    ret = uuid.uuid5(namespace_obj, seed)
+    return ret.bytes if params.binary else str(ret)
+
+
+@kernel_for(generate_uuid)
+def generate_uuid_batch(*columns, params: dict | UuidNS) -> list:
+    """
+    Batch kernel for generate_uuid. Takes one column of seeds (values,
+    or lists/tuples of values), or several columns, whose rows are the
+    seed tuples. The namespace is hashed once, and its SHA-1 state copied
+    for each row.
+    """
+    params = bind_params(params, UuidNS)
+    ns = NAMESPACES.get(params.namespace, uuid.NAMESPACE_DNS)
+    copy = hashlib.sha1(ns.bytes).copy
+    (mask, bits) = (_UUID5_MASK, _UUID5_BITS)
+    seeds = columns[0] if len(columns) == 1 else zip(*columns)
+    out = []
+    for s in seeds:
+        if isinstance(s, (list, tuple)):
+            s = "_".join(str(v) for v in s if v is not None)
+        elif s is None:
+            s = ""
+        elif not isinstance(s, str):
+            s = str(s)
+        h = copy()
+        h.update(s.encode())
+        out.append((int.from_bytes(h.digest()[:16], "big") & mask) | bits)
+    if params.binary:
+        return [n.to_bytes(16, "big") for n in out]
+    return [_format(n) for n in out]
+
+
+def uuid_str(value: bytes | str | None) -> str | None:
+    """Return a binary UUID (16 bytes) as a UUID string."""
+    if isinstance(value, bytes):
+        return _format(int.from_bytes(value, "big"))
+    return value
+
+
+def _format(n: int) -> str:
+    x = "%032x" % n
+    return f"{x[:8]}-{x[8:12]}-{x[12:16]}-{x[16:20]}-{x[20:]}"
+
+
+@register("ids.random_uuid")
+@impure
+def random_uuid(input: Any = None, params: None = None) -> str:
+    """
+    Returns:
+        a random (version 4) UUID string, ignoring the input
+    """
+    return str(uuid.uuid4())
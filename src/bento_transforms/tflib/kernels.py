@@ -0,0 +1,26 @@
+"""
+bento_transforms.tflib.kernels
+
+Batch ("vectorized") kernels for transform step functions.
+
+A batch kernel takes a whole column of input values (a list, or where the
+kernel supports it, a NumPy array) and the step params, and returns a
+column of output values. Element for element, the result must equal
+mapping the scalar step function over the column.
+
+Steps whose function has no registered kernel are run element by element
+by the converter.
+"""
+from __future__ import annotations
+from typing import Callable
+
+
+def kernel_for(func: Callable) -> Callable:
+    """
+    Decorator: register the decorated function as the batch kernel
+    of scalar step function `func`.
+    """
+    def register(kernel: Callable) -> Callable:
+        func.batch = kernel
+        return kernel
+    return register
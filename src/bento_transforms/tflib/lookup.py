@@ -1,6 +1,34 @@
 from __future__ import annotations
 import typing
+from .kernels import kernel_for
+from .params import params_model, bind_params
+from .pymodels import LookupParams
+from .registry import register
+from .tables import get_table
 
+RACE_CCDI_TO_CDS = {
+    "African American": "Black or African American",
+    "European": "White",
+    "Asian": "Asian",
+    "Native American": "American Indian or Alaska Native",
+    "Pacific Islander": "Native Hawaiian or Other Pacific Islander",
+    "Other": "Other",
+    "Unknown": "Unknown",
+    "Not Reported": "Unknown"
+}
+
+RACE_CDS_TO_CCDI = {
+    "Black or African American": "African American",
+    "White": "European",
+    "Asian": "Asian",
+    "American Indian or Alaska Native": "Native American",
+    "Native Hawaiian or Other Pacific Islander": "Pacific Islander",
+    "Other": "Other",
+    "Unknown": "Unknown"
+}
+
+
+@register("lookup.race_ccdi_to_cds")
 def race_ccdi_to_cds(inp: str, params:dict | str = "NA"):
     """
     Args:
@@ -13,28 +41,60 @@ def race_ccdi_to_cds(inp: str, params:dict | str = "NA"):
         default = params['default']
     else:
         default = params
-    mapping = {
-        "African American": "Black or African American",
-        "European": "White",
-        "Asian": "Asian",
-        "Native American": "American Indian or Alaska Native",
-        "Pacific Islander": "Native Hawaiian or Other Pacific Islander",
-        "Other": "Other",
-        "Unknown": "Unknown",
-        "Not Reported": "Unknown"
-    }
-    return mapping.get(inp, default)
+    return RACE_CCDI_TO_CDS.get(inp, default)
 
 
+@register("lookup.race_cds_to_ccdi")
 def race_cds_to_ccdi(value, default="Unknown"):
     """Reverse mapping; note some CDS values map to 'Other' in CCDI"""
-    mapping = {
-        "Black or African American": "African American",
-        "White": "European",
-        "Asian": "Asian",
-        "American Indian or Alaska Native": "Native American",
-        "Native Hawaiian or Other Pacific Islander": "Pacific Islander",
-        "Other": "Other",
-        "Unknown": "Unknown"
-    }
-    return mapping.get(value, default)
+    return RACE_CDS_TO_CCDI.get(value, default)
+
+
+@kernel_for(race_ccdi_to_cds)
+def race_ccdi_to_cds_batch(inputs: list, params: dict | str = "NA") -> list:
+    if isinstance(params, dict):
+        default = params['default']
+    else:
+        default = params
+    get = RACE_CCDI_TO_CDS.get
+    return [get(x, default) for x in inputs]
+
+
+@register("lookup.table")
+@params_model(LookupParams)
+def lookup_table(value, params: LookupParams | dict):
+    """
+    Args:
+        value: value to look up
+        params.table: mapping file (TSV, CSV or JSON; see tflib.tables)
+        params.key, params.value: key and value columns (TSV/CSV;
+            default first and second)
+        params.case_sensitive: match keys exactly (True) or ignoring case
+        params.default: value to return if no mapping found
+        params.passthrough: if True, return the input value itself if no
+            mapping found
+    Returns:
+        Mapped value
+    """
+    params = bind_params(params, LookupParams)
+    return _table(params).get(value, _missing(value, params))
+
+
+@kernel_for(lookup_table)
+def lookup_table_batch(inputs: list,
+                       params: LookupParams | dict) -> list:
+    params = bind_params(params, LookupParams)
+    get = _table(params).get
+    if params.passthrough:
+        return [get(x, x) for x in inputs]
+    default = params.default
+    return [get(x, default) for x in inputs]
+
+
+def _table(params: LookupParams):
+    return get_table(params.table, key=params.key, value=params.value,
+                     case_sensitive=params.case_sensitive)
+
+
+def _missing(value, params: LookupParams):
+    return value if params.passthrough else params.default
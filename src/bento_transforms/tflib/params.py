@@ -0,0 +1,36 @@
+"""
+bento_transforms.tflib.params
+
+Declare the Params model of a transform step function.
+
+When a step function declares a pydantic params model, the converter
+validates the step's Params against it once, when the transform is
+compiled, and passes the resulting model instance as `params` on every
+call. Step functions should accept either the model instance or a plain
+dict (for direct callers); `bind_params` does the coercion and passes an
+already-validated instance through untouched.
+"""
+from __future__ import annotations
+from typing import Callable
+from pydantic import BaseModel
+
+
+def params_model(model: type[BaseModel]) -> Callable:
+    """
+    Decorator: declare `model` as the params model of the decorated
+    step function.
+    """
+    def declare(func: Callable) -> Callable:
+        func.params_model = model
+        return func
+    return declare
+
+
+def bind_params(params: dict | BaseModel | None,
+                model: type[BaseModel]) -> BaseModel:
+    """Return `params` as an instance of `model`."""
+    if isinstance(params, model):
+        return params
+    if params is None:
+        return model()
+    return model(**params)
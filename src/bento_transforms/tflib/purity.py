@@ -0,0 +1,21 @@
+"""
+bento_transforms.tflib.purity
+
+Transform step functions are expected to be pure (see README). A step
+function that is not -- its output is not determined by its input and
+params alone -- must be declared with the `impure` decorator, so that
+its results are never memoized.
+"""
+from __future__ import annotations
+from typing import Callable
+
+
+def impure(func: Callable) -> Callable:
+    """Decorator: declare the decorated step function impure."""
+    func.pure = False
+    return func
+
+
+def is_pure(func: Callable) -> bool:
+    """Return False if `func` has been declared impure."""
+    return getattr(func, "pure", True)
@@ -1,6 +1,9 @@
 from __future__ import annotations
-from typing import Pattern
-from pydantic import BaseModel
+import re
+from typing import Any, Dict, List, Pattern
+from pydantic import (
+    BaseModel, PrivateAttr, field_validator, model_validator,
+)
 from enum import Enum
 
 
@@ -24,6 +27,14 @@ class Y2DParams(BaseModel):
 
 class UuidNS(BaseModel):
     namespace: UuidNSEnum = UuidNSEnum.DNS
+    binary: bool = False
+
+
+class CaseEnum(str, Enum):
+    UPPER = 'upper'
+    LOWER = 'lower'
+    TITLE = 'title'
+    SENTENCE = 'sentence'
 
 
 class StrFuncParams(BaseModel):
@@ -32,8 +43,60 @@ class StrFuncParams(BaseModel):
     delimiter: str = " "
     position: int = 1
     pattern: Pattern | None = None
+    patterns: List[Pattern] | None = None
     replacement: str | None = None
     flags: int = 0
     default: str | None = None
     skip_null: bool = False
-    
+    _regex: Pattern | None = PrivateAttr(default=None)
+
+    @model_validator(mode="after")
+    def compile_regex(self) -> StrFuncParams:
+        # pattern and patterns are combined into one regex, compiled once
+        # with flags, when the params are bound
+        pats = ([self.pattern] if self.pattern else []) + (self.patterns
+                                                            or [])
+        if pats:
+            self._regex = re.compile(
+                "|".join(f"(?:{p.pattern})" for p in pats), self.flags)
+        return self
+
+
+class CaseParams(BaseModel):
+    case_type: CaseEnum = CaseEnum.SENTENCE
+    exceptions: frozenset[str] = frozenset()
+
+    @field_validator("exceptions", mode="before")
+    @classmethod
+    def upper_exceptions(cls, v):
+        # exceptions are matched case-insensitively
+        return frozenset(e.upper() for e in v or [])
+
+
+class LookupParams(BaseModel):
+    table: str
+    key: str | None = None
+    value: str | None = None
+    case_sensitive: bool = True
+    default: str | None = None
+    passthrough: bool = False
+
+
+class ReduceParams(BaseModel):
+    group_by: str | Dict[str, str] | None = None
+    order: List[Any] | None = None
+    delimiter: str = ";"
+    _rank: dict = PrivateAttr(default_factory=dict)
+
+    @model_validator(mode="after")
+    def rank_order(self) -> ReduceParams:
+        self._rank = {v: i for (i, v) in enumerate(self.order or [])}
+        return self
+
+    def rank(self, value) -> int:
+        """Return the position of `value` in order."""
+        try:
+            return self._rank[value]
+        except KeyError:
+            raise ValueError(f"Value '{value}' is not in order "
+                             f"{self.order}") from None
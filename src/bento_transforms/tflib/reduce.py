@@ -0,0 +1,199 @@
+"""
+bento_transforms.tflib.reduce
+
+Reducer steps: many source values -> one target value.
+
+A reducer step must be the last step of its transform. The transform's
+earlier steps map each source value as usual; the reducer then folds the
+mapped values of all the source records of a group -- those having the
+same value of the group_by column (e.g., 'study.study_id') -- into one
+value, incrementally, as records stream through (see
+converters.aggregate). None values are skipped.
+
+A reducer function takes an accumulator (None to start), a value and
+the params, and returns the new accumulator. It is declared with the
+`reducer` decorator, which also gives it a `merge` function, combining
+two accumulators (of earlier and later records, in that order), and a
+`final` function, producing the target value from an accumulator.
+"""
+from __future__ import annotations
+from typing import Any, Callable
+from .params import params_model, bind_params
+from .pymodels import ReduceParams
+from .registry import register
+
+
+def reducer(merge: Callable, final: Callable | None = None) -> Callable:
+    """
+    Decorator: declare the decorated step function a reducer, with
+    accumulator functions `merge` and `final` (default: the accumulator
+    is the value).
+    """
+    def declare(func: Callable) -> Callable:
+        func.reducer = True
+        func.merge = merge
+        func.final = final or _as_is
+        return func
+    return declare
+
+
+def is_reducer(func: Callable) -> bool:
+    """Return True if `func` is declared a reducer."""
+    return getattr(func, "reducer", False)
+
+
+def _as_is(acc, params=None):
+    return acc
+
+
+def _max(a, b, params=None):
+    if a is None:
+        return b
+    return a if b is None or a >= b else b
+
+
+def _min(a, b, params=None):
+    if a is None:
+        return b
+    return a if b is None or a <= b else b
+
+
+def _first(a, b, params=None):
+    return b if a is None else a
+
+
+def _stricter(a, b, params):
+    params = bind_params(params, ReduceParams)
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a if params.rank(a) >= params.rank(b) else b
+
+
+@register("reduce.strictest")
+@params_model(ReduceParams)
+@reducer(merge=_stricter)
+def strictest(acc, value, params: dict | ReduceParams):
+    """
+    Args:
+        value: a source value
+        params.order: the possible values, from least to most strict
+    Returns:
+        the strictest value (raises ValueError for a value not in order)
+    """
+    if value is None:
+        return acc
+    params = bind_params(params, ReduceParams)
+    params.rank(value)  # validate even the first value
+    return _stricter(acc, value, params)
+
+
+@register("reduce.max")
+@params_model(ReduceParams)
+@reducer(merge=_max)
+def max_value(acc, value, params: dict | ReduceParams | None = None):
+    return _max(acc, value)
+
+
+@register("reduce.min")
+@params_model(ReduceParams)
+@reducer(merge=_min)
+def min_value(acc, value, params: dict | ReduceParams | None = None):
+    return _min(acc, value)
+
+
+@register("reduce.first")
+@params_model(ReduceParams)
+@reducer(merge=_first)
+def first(acc, value, params: dict | ReduceParams | None = None):
+    return _first(acc, value)
+
+
+def _union(a: set | None, b: set | None, params=None) -> set | None:
+    if a is None:
+        return b
+    if b is not None:
+        a |= b
+    return a
+
+
+def _sorted(acc: set | None, params=None) -> list | None:
+    return None if acc is None else sorted(acc, key=str)
+
+
+@register("reduce.set_union")
+@params_model(ReduceParams)
+@reducer(merge=_union, final=_sorted)
+def set_union(acc: set | None, value: Any,
+              params: dict | ReduceParams | None = None) -> set | None:
+    """
+    Returns:
+        the distinct values (list values contribute their items), sorted
+    """
+    if value is None:
+        return acc
+    if acc is None:
+        acc = set()
+    if isinstance(value, (list, tuple, set)):
+        acc.update(v for v in value if v is not None)
+    else:
+        acc.add(value)
+    return acc
+
+
+def _sum(a, b, params=None):
+    return (a or 0) + (b or 0)
+
+
+def _zero(acc, params=None):
+    return acc or 0
+
+
+@register("reduce.count")
+@params_model(ReduceParams)
+@reducer(merge=_sum, final=_zero)
+def count(acc: int | None, value: Any,
+          params: dict | ReduceParams | None = None) -> int | None:
+    """
+    Returns:
+        the number of (non-None) values
+    """
+    if value is None:
+        return acc
+    return (acc or 0) + 1
+
+
+def _ordered_union(a: dict | None, b: dict | None, params=None) -> dict:
+    if a is None:
+        return b
+    if b is not None:
+        for k in b:
+            a.setdefault(k)
+    return a
+
+
+def _joined(acc: dict | None, params) -> str | None:
+    params = bind_params(params, ReduceParams)
+    if acc is None:
+        return None
+    return params.delimiter.join(str(k) for k in acc)
+
+
+@register("reduce.concat_distinct")
+@params_model(ReduceParams)
+@reducer(merge=_ordered_union, final=_joined)
+def concat_distinct(acc: dict | None, value: Any,
+                    params: dict | ReduceParams | None = None) -> dict:
+    """
+    Args:
+        params.delimiter: string joining the values
+    Returns:
+        the distinct values, in order of first appearance, joined
+    """
+    if value is None:
+        return acc
+    if acc is None:
+        acc = {}
+    acc.setdefault(value)
+    return acc
@@ -0,0 +1,102 @@
+"""
+bento_transforms.tflib.registry
+
+Registry of transform step functions, keyed by
+(package, package version, entrypoint).
+
+Functions get into the registry either
+
+* explicitly, with the `register` decorator -- all bento_transforms tflib
+  functions are registered this way; or
+* through Python entry points: an installed package can advertise its step
+  functions in the 'bento_transforms.steps' group, named by entrypoint, e.g.
+  in its pyproject.toml:
+
+      [project.entry-points."bento_transforms.steps"]
+      "mutate.update" = "bento_mutations.mutate:update"
+
+  Entry points are loaded once, the first time a lookup misses. They are
+  registered under the installed version of their package, and also
+  unversioned (unless a function is already registered so), so that
+  steps naming no version, or another version, of the package find them.
+
+A function registered without a version matches a step specifying any
+version of its package. Package names are normalized as in Transform MDF
+('-' becomes '_').
+"""
+from __future__ import annotations
+from importlib.metadata import entry_points
+from typing import Callable, Tuple
+
+ENTRY_POINT_GROUP = "bento_transforms.steps"
+
+_registry = {}
+_entry_points_loaded = False
+
+
+def register(entrypoint: str, package: str = "bento_transforms",
+             version: str | None = None) -> Callable:
+    """
+    Decorator: register the decorated function as step `entrypoint` of
+    `package` (any version, unless `version` is given).
+    """
+    def reg(func: Callable) -> Callable:
+        _registry[_key(package, version, entrypoint)] = func
+        return func
+    return reg
+
+
+def lookup(package: str, version: str | None,
+           entrypoint: str) -> Callable | None:
+    """
+    Return the function registered for the step, or None. Tries the exact
+    package version, then an unversioned registration.
+    """
+    func = _find(package, version, entrypoint)
+    if func is None and not _entry_points_loaded:
+        load_entry_points()
+        func = _find(package, version, entrypoint)
+    return func
+
+
+def load_entry_points(eps: list | None = None) -> int:
+    """
+    Register step functions advertised by installed packages in the
+    'bento_transforms.steps' entry point group (or the entry points
+    `eps`). Returns the number registered.
+    """
+    global _entry_points_loaded
+    if eps is None:
+        eps = entry_points(group=ENTRY_POINT_GROUP)
+        _entry_points_loaded = True
+    n = 0
+    for ep in eps:
+        dist = getattr(ep, "dist", None)
+        if dist is not None:
+            (package, version) = (dist.name, dist.version)
+        else:
+            (package, version) = (ep.value.split(".")[0].split(":")[0], None)
+        key = _key(package, version, ep.name)
+        if key not in _registry:
+            _registry[key] = ep.load()
+            n += 1
+        _registry.setdefault(_key(package, None, ep.name), _registry[key])
+    return n
+
+
+def registered() -> dict:
+    """Return a copy of the registry."""
+    return dict(_registry)
+
+
+def _find(package: str, version: str | None,
+          entrypoint: str) -> Callable | None:
+    func = _registry.get(_key(package, version, entrypoint))
+    if func is None and version is not None:
+        func = _registry.get(_key(package, None, entrypoint))
+    return func
+
+
+def _key(package: str, version: str | None,
+         entrypoint: str) -> Tuple[str, str | None, str]:
+    return (package.replace("-", "_"), version, entrypoint)
@@ -1,11 +1,16 @@
 from __future__ import annotations
-import typing
-import re
-from .pymodels import StrFuncParams
+from .pymodels import CaseEnum, CaseParams, StrFuncParams
+from .kernels import kernel_for
+from .params import params_model, bind_params
+from .registry import register
 
+_PUNCT = '.,;:!?'
 
+
+@register("string.extract_middle_name")
+@params_model(StrFuncParams)
 def extract_middle_name(input: str | None,
-                        params: StrFuncParams):
+                        params: dict | StrFuncParams):
     """
     Args:
         input: full name string
@@ -15,81 +20,93 @@ def extract_middle_name(input: str | None,
     Returns:
         Extracted name part or default
     """
+    params = bind_params(params, StrFuncParams)
     if not input:
-        return default
+        return params.default
     parts = str(input).split(params.delimiter)
     if len(parts) > params.position:
         return parts[params.position]
     return params.default
 
 
+@register("string.strip_pattern")
+@params_model(StrFuncParams)
 def strip_pattern(input: str | None,
-                  params: StrFuncParams):
+                  params: dict | StrFuncParams):
     """
     Args:
-        value: string to process
-        pattern: regex pattern to match and remove
-        replacement: string to replace matches with (default empty)
-        flags: regex flags (0=none, re.IGNORECASE=2, etc)
+        input: string to process
+        params.pattern: regex pattern to match and remove
+        params.patterns: more patterns; all are matched in a single pass
+        params.replacement: string to replace matches with (default empty)
+        params.flags: regex flags (0=none, re.IGNORECASE=2, etc)
     Returns:
         String with pattern removed
     """
-    if not value or not pattern:
-        return value
-    return re.sub(pattern, replacement, str(value), flags=flags)
+    params = bind_params(params, StrFuncParams)
+    if not input or params._regex is None:
+        return input
+    return params._regex.sub(params.replacement or "", str(input))
 
 
-def normalize_case(value, case_type="sentence", 
-                   exceptions=None):
+@register("string.normalize_case")
+@params_model(CaseParams)
+def normalize_case(value, params: dict | CaseParams | None = None):
     """
     Args:
         value: string to normalize
-        case_type: one of 'upper', 'lower', 'title', 'sentence'
-        exceptions: list of words to preserve capitalization 
+        params.case_type: one of 'upper', 'lower', 'title', 'sentence'
+        params.exceptions: list of words to preserve capitalization
                    (e.g., ['NOS', 'NEC'] for diagnosis)
     Returns:
         Normalized string
     """
+    params = bind_params(params, CaseParams)
     if not value:
         return value
-
-    exceptions = exceptions or []
     value_str = str(value)
 
-    if case_type == "upper":
+    if params.case_type == CaseEnum.UPPER:
         return value_str.upper()
-    elif case_type == "lower":
+    elif params.case_type == CaseEnum.LOWER:
         return value_str.lower()
-    elif case_type == "title":
+    elif params.case_type == CaseEnum.TITLE:
         return value_str.title()
-    elif case_type == "sentence":
-        words = value_str.split()
-        result = []
-        for i, word in enumerate(words):
-            # Check if word or its core (without punctuation) 
-            # is in exceptions
-            word_core = word.rstrip('.,;:!?')
-            if word_core.upper() in [e.upper() for e in exceptions]:
-                result.append(word_core.upper())
-            elif i == 0:
-                result.append(word.capitalize())
-            else:
-                result.append(word.lower())
-        return " ".join(result)
-    return value_str
-
-
-def split(input: str, params: dict) -> list:
-    params = StrFuncParams(**params) # for type checking
+    return _sentence_case(value_str, params.exceptions)
+
+
+def _sentence_case(value_str: str, exceptions: frozenset) -> str:
+    result = []
+    for i, word in enumerate(value_str.split()):
+        # Check if word or its core (without punctuation)
+        # is in exceptions
+        word_core = word.rstrip(_PUNCT)
+        if word_core.upper() in exceptions:
+            result.append(word_core.upper() + word[len(word_core):])
+        elif i == 0:
+            result.append(word.capitalize())
+        else:
+            result.append(word.lower())
+    return " ".join(result)
+
+
+@register("string.split")
+@params_model(StrFuncParams)
+def split(input: str, params: dict | StrFuncParams) -> list:
+    params = bind_params(params, StrFuncParams)
     return input.split(sep=params.delimiter)
 
 
-def add_prefix(input: str, params: dict) -> str:
-    params = StrFuncParams(**params)
+@register("string.add_prefix")
+@params_model(StrFuncParams)
+def add_prefix(input: str, params: dict | StrFuncParams) -> str:
+    params = bind_params(params, StrFuncParams)
     return params.prefix + input
 
 
-def concat_fields(args, params: dict):
+@register("string.concat_fields")
+@params_model(StrFuncParams)
+def concat_fields(args, params: dict | StrFuncParams):
     """
     in params:
         values: list/tuple of values to concatenate
@@ -100,15 +117,15 @@ def concat_fields(args, params: dict):
     Returns:
         Concatenated string
     """
-    params = StrFuncParams(**params)
+    params = bind_params(params, StrFuncParams)
     if not isinstance(args, (list, tuple)):
         args = [args]
 
     if params.skip_null:
-        clean_values = [str(v) for v in args 
+        clean_values = [str(v) for v in args
                         if v is not None and str(v).strip()]
     else:
-        clean_values = [str(v) if v is not None else "" 
+        clean_values = [str(v) if v is not None else ""
                         for v in args]
 
     result = params.delimiter.join(clean_values)
@@ -117,3 +134,77 @@ def concat_fields(args, params: dict):
     if params.suffix:
         result = f"{result}{params.suffix}"
     return result
+
+
+# batch kernels (see tflib.kernels): params are bound once per column,
+# and regexes and exception sets were compiled when the params were
+# validated
+
+@kernel_for(extract_middle_name)
+def extract_middle_name_batch(inputs: list,
+                              params: dict | StrFuncParams) -> list:
+    params = bind_params(params, StrFuncParams)
+    (delim, pos, default) = (params.delimiter, params.position,
+                             params.default)
+    out = []
+    for x in inputs:
+        if not x:
+            out.append(default)
+            continue
+        parts = str(x).split(delim)
+        out.append(parts[pos] if len(parts) > pos else default)
+    return out
+
+
+@kernel_for(strip_pattern)
+def strip_pattern_batch(inputs: list, params: dict | StrFuncParams) -> list:
+    params = bind_params(params, StrFuncParams)
+    if params._regex is None:
+        return list(inputs)
+    sub = params._regex.sub
+    repl = params.replacement or ""
+    return [sub(repl, str(x)) if x else x for x in inputs]
+
+
+@kernel_for(normalize_case)
+def normalize_case_batch(inputs: list,
+                         params: dict | CaseParams | None = None) -> list:
+    params = bind_params(params, CaseParams)
+    case = params.case_type
+    if case == CaseEnum.SENTENCE:
+        exc = params.exceptions
+        return [_sentence_case(str(x), exc) if x else x for x in inputs]
+    conv = {CaseEnum.UPPER: str.upper, CaseEnum.LOWER: str.lower,
+            CaseEnum.TITLE: str.title}[case]
+    return [conv(str(x)) if x else x for x in inputs]
+
+
+@kernel_for(split)
+def split_batch(inputs: list, params: dict | StrFuncParams) -> list:
+    params = bind_params(params, StrFuncParams)
+    sep = params.delimiter
+    return [x.split(sep) for x in inputs]
+
+
+@kernel_for(add_prefix)
+def add_prefix_batch(inputs: list, params: dict | StrFuncParams) -> list:
+    params = bind_params(params, StrFuncParams)
+    prefix = params.prefix
+    return [prefix + x for x in inputs]
+
+
+@kernel_for(concat_fields)
+def concat_fields_batch(inputs: list, params: dict | StrFuncParams) -> list:
+    params = bind_params(params, StrFuncParams)
+    (delim, skip_null) = (params.delimiter, params.skip_null)
+    (prefix, suffix) = (params.prefix or "", params.suffix or "")
+    out = []
+    for args in inputs:
+        if not isinstance(args, (list, tuple)):
+            args = [args]
+        if skip_null:
+            vals = [str(v) for v in args if v is not None and str(v).strip()]
+        else:
+            vals = [str(v) if v is not None else "" for v in args]
+        out.append(prefix + delim.join(vals) + suffix)
+    return out
@@ -0,0 +1,216 @@
+"""
+bento_transforms.tflib.tables
+
+Mapping tables for data-driven lookup steps (see lookup.table).
+
+A mapping table is read from a TSV, CSV or JSON file of key -> value
+entries, and compiled into an index file: the keys sorted (by UTF-8
+bytes, casefolded for case-insensitive tables), with their values, in a
+flat binary layout. The index is memory-mapped and binary-searched, so
+every process using a table -- e.g. the workers of a process pool --
+shares one read-only copy of it in the OS page cache, rather than
+building its own dict.
+
+Index files are written to the directory named by the environment
+variable BENTO_TRANSFORMS_CACHE (default: <tmp>/bento_transforms), named
+for the source file's path, size and modification time and the table
+options, so an edited mapping file gets a new index. Each process opens
+a table once; clear_tables() drops the open tables.
+
+Index layout:
+  8 bytes   magic b'BTLKUP1\\n'
+  8 bytes   number of entries n (unsigned, little-endian)
+  16n bytes for each entry, in key order: key offset, key length,
+            value offset, value length (unsigned 32-bit, native order)
+  ...       UTF-8 key and value bytes
+"""
+from __future__ import annotations
+import csv
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+from array import array
+from pathlib import Path
+
+MAGIC = b"BTLKUP1\n"
+HEADER = 16
+
+# (path, key column, value column, case_sensitive) -> MappingTable
+_tables = {}
+
+
+def cache_dir() -> Path:
+    return Path(os.environ.get("BENTO_TRANSFORMS_CACHE",
+                               Path(tempfile.gettempdir()) /
+                               "bento_transforms"))
+
+
+def get_table(path: str | Path, key: str | None = None,
+              value: str | None = None,
+              case_sensitive: bool = True) -> MappingTable:
+    """
+    Return the mapping table in file `path`, opening (and if need be,
+    compiling) it on first use in this process. For TSV and CSV files,
+    `key` and `value` name the key and value columns (default: the first
+    and second).
+    """
+    k = (str(path), key, value, case_sensitive)
+    table = _tables.get(k)
+    if table is None:
+        table = _tables[k] = MappingTable(path, key=key, value=value,
+                                          case_sensitive=case_sensitive)
+    return table
+
+
+def clear_tables() -> None:
+    """Close the mapping tables opened in this process."""
+    for table in _tables.values():
+        table.close()
+    _tables.clear()
+
+
+class MappingTable:
+    """
+    A read-only, memory-mapped mapping of strings to strings, compiled
+    from mapping file `path` (see module docstring).
+    """
+    def __init__(self, path: str | Path, key: str | None = None,
+                 value: str | None = None, case_sensitive: bool = True,
+                 hot_size: int = 65536):
+        self.path = Path(path).resolve()
+        self.case_sensitive = case_sensitive
+        if not self.path.is_file():
+            raise RuntimeError(f"Mapping table '{path}' not found")
+        st = self.path.stat()
+        tag = json.dumps([str(self.path), st.st_size, st.st_mtime_ns,
+                          key, value, case_sensitive])
+        self.index_path = (cache_dir() /
+                           (hashlib.sha256(tag.encode()).hexdigest()[:24]
+                            + ".lkp"))
+        if not self.index_path.exists():
+            compile_index(read_mapping(self.path, key, value,
+                                       case_sensitive),
+                          self.index_path)
+        with self.index_path.open("rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC:
+            raise RuntimeError(f"'{self.index_path}' is not a mapping "
+                               "table index")
+        self._n = int.from_bytes(self._mm[8:HEADER], "little")
+        self._ix = memoryview(self._mm)[
+            HEADER:HEADER + 16 * self._n].cast("I")
+        self._hot = {}
+        self._hot_size = hot_size
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: str, default=None):
+        """Return the value for `key`, or `default` if there is none."""
+        try:
+            v = self._hot[key]
+            return default if v is None else v
+        except KeyError:
+            pass
+        except TypeError:
+            return default  # unhashable
+        if not isinstance(key, str):
+            return default
+        v = self._search(key if self.case_sensitive else key.casefold())
+        # recently looked-up keys (and misses) are kept in a small dict
+        if len(self._hot) >= self._hot_size:
+            self._hot.clear()
+        self._hot[key] = v
+        return default if v is None else v
+
+    def _search(self, key: str) -> str | None:
+        k = key.encode()
+        (mm, ix) = (self._mm, self._ix)
+        (lo, hi) = (0, self._n)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            off = ix[4 * mid]
+            cand = mm[off:off + ix[4 * mid + 1]]
+            if cand < k:
+                lo = mid + 1
+            elif cand > k:
+                hi = mid
+            else:
+                voff = ix[4 * mid + 2]
+                return mm[voff:voff + ix[4 * mid + 3]].decode()
+        return None
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._ix.release()
+            self._mm.close()
+            self._mm = None
+
+
+def read_mapping(path: Path, key: str | None = None,
+                 value: str | None = None,
+                 case_sensitive: bool = True) -> dict:
+    """
+    Read the mapping in file `path`: a JSON object of key: value, or a
+    TSV/CSV file with a header row (see get_table). Keys are casefolded
+    if not `case_sensitive`. Raises RuntimeError if two entries map the
+    same key to different values.
+    """
+    if path.suffix.lower() == ".json":
+        with path.open() as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise RuntimeError(f"Mapping table '{path}' is not a JSON "
+                               "object")
+        pairs = data.items()
+    else:
+        delim = "," if path.suffix.lower() == ".csv" else "\t"
+        with path.open(newline="") as f:
+            rdr = csv.reader(f, delimiter=delim)
+            hdr = next(rdr, None)
+            if not hdr or len(hdr) < 2:
+                raise RuntimeError(f"Mapping table '{path}' needs a header "
+                                   "row of at least two columns")
+            try:
+                (ki, vi) = (hdr.index(key) if key else 0,
+                            hdr.index(value) if value else 1)
+            except ValueError:
+                raise RuntimeError(f"Mapping table '{path}' has no column "
+                                   f"'{key if key not in hdr else value}'")
+            pairs = [(row[ki], row[vi]) for row in rdr if row]
+    mapping = {}
+    for (k, v) in pairs:
+        if not isinstance(v, str):
+            raise RuntimeError(f"Mapping table '{path}': value for '{k}' "
+                               "is not a string")
+        nk = k if case_sensitive else k.casefold()
+        if mapping.get(nk, v) != v:
+            raise RuntimeError(f"Mapping table '{path}': conflicting "
+                               f"values for key '{k}'")
+        mapping[nk] = v
+    return mapping
+
+
+def compile_index(mapping: dict, path: Path) -> None:
+    """Write `mapping` (str -> str) as an index file (see module docs)."""
+    entries = sorted((k.encode(), v.encode()) for (k, v) in mapping.items())
+    ix = array("I")
+    blob = bytearray()
+    base = HEADER + 16 * len(entries)
+    for (k, v) in entries:
+        ix.extend((base + len(blob), len(k)))
+        blob += k
+        ix.extend((base + len(blob), len(v)))
+        blob += v
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp.open("wb") as f:
+        f.write(MAGIC + len(entries).to_bytes(8, "little"))
+        f.write(ix.tobytes())
+        f.write(blob)
+    os.replace(tmp, path)
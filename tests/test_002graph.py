@@ -1,5 +1,7 @@
+import re
 import pytest
 from bento_transforms.mdf import TransformReader
+from bento_transforms.graph import mc_utils
 from bento_transforms.graph.meta import TransformModel
 from bento_meta.objects import Node, Property, Tag
 from bento_meta.tf_objects import Transform, TfStep
@@ -31,3 +33,144 @@ def test_meta_graph(samplesd):
     tag = Tag({"key": "Source", "value":"SB2"})
     mtf.tags[tag.key] = tag
     
+
+
+ENTITY = re.compile(r"\((\w+):(\w+) \{((?:'[^']*'|[^'}])*)\}\)")
+PROP = re.compile(r"(\w+):'([^']*)'")
+MERGE_REL = re.compile(
+    r"MERGE \((\w+)\)-\[\w+:(\w+)(?: \{position:(\d+)\})?\]->\((\w+)\)")
+
+
+def statement_facts(stmt):
+    # the node or link created by a per-statement upsert
+    ents = {v: (lbl, dict(PROP.findall(props)))
+            for (v, lbl, props) in ENTITY.findall(stmt)}
+    m = MERGE_REL.search(stmt)
+    if m is None:
+        ((lbl, props),) = ents.values()
+        return (lbl, frozenset(props.items()))
+
+    def desc(v):
+        (lbl, props) = ents[v]
+        if "nanoid" in props:
+            return props["nanoid"]
+        return (lbl, props["model"], props["version"], props["handle"])
+    (a, typ, pos, b) = m.groups()
+    owners = tuple(desc(v) for (v, (lbl, _)) in ents.items()
+                   if lbl == "node")
+    return (typ, desc(a), desc(b), owners, pos and int(pos))
+
+
+def bulk_facts(kind, row):
+    if kind == "transform":
+        return (kind, frozenset(row.items()))
+    if kind == "tf_step":
+        return (kind, frozenset({**row["props"],
+                                 "nanoid": row["nanoid"]}.items()))
+    if kind in ("first_tf_step", "last_tf_step"):
+        return (kind, row["tf"], row["step"], (), None)
+    if kind == "next_tf_step":
+        return (kind, row["src"], row["dst"], (), None)
+    prop = ("property", row["model"], row["version"], row["prop"])
+    owner = (("node", row["node_model"], row["node_version"], row["node"]),)
+    if kind == "value_as_tf_input":
+        return (kind, prop, row["tf"], owner, row["position"])
+    return (kind, row["tf"], prop, owner, row["position"])
+
+
+def test_bulk_upsert(samplesd):
+    tmdf = TransformReader(samplesd / "transforms.yaml",
+                           samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    tmdl = TransformModel(tmdf.transforms)
+    stmts = [str(s) for s in tmdl.cypher_for_upsert()]
+    bulk = tmdl.cypher_for_bulk_upsert(batch_size=3)
+
+    assert {s for (s, _) in bulk} <= set(mc_utils.BULK_STMTS.values())
+    assert all(0 < len(p["rows"]) <= 3 for (_, p) in bulk)
+    assert len(bulk) < len(stmts)
+    kinds = {v: k for (k, v) in mc_utils.BULK_STMTS.items()}
+    facts = [bulk_facts(kinds[s], row) for (s, p) in bulk for row in p["rows"]]
+    assert len(facts) == len(stmts)
+    assert set(facts) == {statement_facts(s) for s in stmts}
+    # nodes are merged before they are linked
+    order = [kinds[s] for (s, _) in bulk]
+    assert order.index("tf_step") > order.index("transform")
+    assert order[-1] == "tf_output_as_value"
+
+
+def test_sync(samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    current = tmdf.transforms
+    # nanoids are derived from content: upserts are repeatable
+    def nanoids():
+        return [re.findall(r"nanoid:'(\w+)'", str(s))
+                for s in TransformModel(current).cypher_for_upsert()]
+    assert nanoids() == nanoids()
+    tmdl = TransformModel(current)
+    assert tmdl.cypher_for_sync(current) == []
+
+    # the same handle in another pair of models is another transform
+    gtf = current["age_days_to_years"]
+    other = gtf.model_copy(update={"Inputs": [
+        i.model_copy(update={"Version": "9.9.9"}) for i in gtf.Inputs]})
+    (a, b) = (TransformModel({"age_days_to_years": g}).transforms[
+        "age_days_to_years"] for g in (gtf, other))
+    assert mc_utils.tf_nanoid(a) != mc_utils.tf_nanoid(b)
+    assert not (set(mc_utils.step_nanoids(a)) &
+                set(mc_utils.step_nanoids(b)))
+
+    stored = dict(current)
+    del stored["lookup_and_prefix"]
+    stored["age_days_to_years"] = current["age_days_to_years"].model_copy(
+        deep=True)
+    stored["age_days_to_years"].Steps[0].Params["precision"] = 2
+    stored["old_tf"] = current["fullname_to_fmlnames"]
+    assert tmdl.diff(stored) == {"create": ["lookup_and_prefix"],
+                                 "update": ["age_days_to_years"],
+                                 "delete": ["old_tf"], "unchanged": 2}
+
+    sync = tmdl.cypher_for_sync(stored)
+    kinds = {v: k for (k, v) in {**mc_utils.BULK_STMTS,
+                                 **mc_utils.SYNC_STMTS}.items()}
+    rows = {}
+    for (stmt, params) in sync:
+        rows.setdefault(kinds[stmt], []).extend(params["rows"])
+    keep = mc_utils.tf_nanoid(tmdl.transforms["age_days_to_years"])
+    scope = {"from_model": "CCDI", "from_version": "3.1.0",
+             "to_model": "CDS", "to_version": "10.0.0"}
+    assert rows["drop_transform"] == [
+        {"handle": "old_tf", "keep": None, **scope},
+        {"handle": "age_days_to_years", "keep": keep, **scope}]
+    assert rows["clear_transform"] == [{"handle": "age_days_to_years",
+                                        "keep": keep, **scope}]
+    assert {r["handle"] for r in rows["transform"]} == {
+        "lookup_and_prefix", "age_days_to_years"}
+    assert len(rows["tf_step"]) == 3
+    # deletes come first, and the full upsert is much larger
+    assert list(rows)[:2] == ["drop_transform", "clear_transform"]
+    assert len(sync) < len(tmdl.cypher_for_bulk_upsert(batch_size=1))
+
+    # two model pairs sharing a handle: syncing one drops only its own
+    def moved(gtf, frm, to):
+        return gtf.model_copy(update={
+            "Inputs": [i.model_copy(update=frm) for i in gtf.Inputs],
+            "Outputs": [o.model_copy(update=to) for o in gtf.Outputs]})
+    ccdi_cds = {"old_tf": current["fullname_to_fmlnames"]}
+    cds_gc = {"old_tf": moved(current["fullname_to_fmlnames"],
+                              {"Model": "CDS", "Version": "10.0.0"},
+                              {"Model": "GC", "Version": "1.0"})}
+    assert (mc_utils.tf_nanoid(TransformModel(ccdi_cds).transforms["old_tf"])
+            != mc_utils.tf_nanoid(TransformModel(cds_gc).transforms["old_tf"]))
+    ((stmt, params),) = TransformModel({}).cypher_for_sync(ccdi_cds)
+    assert stmt == mc_utils.SYNC_STMTS["drop_transform"]
+    assert "(fn:node {model: row.from_model})" in stmt
+    assert "(tn:node {model: row.to_model})" in stmt
+    assert params["rows"] == [{"handle": "old_tf", "keep": None, **scope}]
+    ((stmt, params),) = TransformModel({}).cypher_for_sync(cds_gc)
+    assert params["rows"] == [{"handle": "old_tf", "keep": None,
+                               "from_model": "CDS", "from_version": "10.0.0",
+                               "to_model": "GC", "to_version": "1.0"}]
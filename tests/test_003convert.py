@@ -1,9 +1,13 @@
 import pytest
 from bento_transforms.mdf import TransformReader
+from bento_transforms.mdf.pymodels import GeneralTransform, IdentityTransform
+from bento_transforms.converters.categorical import Categorical
 from bento_transforms.converters.converter import (
     create_transform_function,
     Converter,
 )
+from bento_transforms.tflib.arith import years_to_days, years_to_days_batch
+from bento_transforms.tflib.pymodels import Y2DParams
 from typing import Callable
 from pdb import set_trace
 
@@ -80,3 +84,441 @@ def test_converter(samplesd):
         cvtr.convert(frm="study_personell.personnel_name",
                      to=["investigator.first_name", "investigator.middle_name",
                          "investigator.last_name"])        
+
+
+def test_convert_records(samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    cvtr = Converter(tmdf=tmdf)
+    assert set(cvtr.transforms_for_node("study_personnel")) == {
+        "study_personnel_email_address_to_investigator_email",
+        "fullname_to_fmlnames",
+    }
+    recs = [
+        {"personnel_name": "James Earl Jones",
+         "email_address": "jej@example.com"},
+        {"personnel_name": "Sigismund Leonhart Popbutton"},
+    ] * 3
+    out = list(cvtr.convert_records(iter(recs), source_node="study_personnel",
+                                    chunksize=4))
+    assert len(out) == 6
+    assert out[0]["investigator"] == {"first_name": "James",
+                                      "middle_name": "Earl",
+                                      "last_name": "Jones",
+                                      "email": "jej@example.com"}
+    assert out[1]["investigator"]["middle_name"] == "Leonhart"
+    assert "email" not in out[1]["investigator"]
+    assert out[5] == out[1]
+
+
+def test_batch_functions(samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    cvtr = Converter(tmdf=tmdf)
+    bf = cvtr.bfunction("age_days_to_years")
+    tf = cvtr.tfunction("age_days_to_years")
+    col = [730, -999, None, 3652, 1]
+    assert bf(col) == [tf(x) for x in col] == [2.0, None, None, 10.0, 0.0]
+    assert bf(diagnosis_age_at_diagnosis=col) == bf(col)
+
+    # string.split batch kernel
+    bf = cvtr.bfunction("fullname_to_fmlnames")
+    ret = bf(["James Earl Jones", "Sigismund Leonhart Popbutton"])
+    assert ret["investigator_middle_name"] == ["Earl", "Leonhart"]
+    # fewer values than outputs: missing outputs are None
+    tf = cvtr.tfunction("fullname_to_fmlnames")
+    assert tf("Jane Doe") == {"investigator_first_name": "Jane",
+                              "investigator_middle_name": "Doe"}
+    ret = bf(["Jane Doe", "James Earl Jones"])
+    assert ret == {"investigator_first_name": ["Jane", "James"],
+                   "investigator_middle_name": ["Doe", "Earl"],
+                   "investigator_last_name": [None, "Jones"]}
+    assert bf(Categorical.encode(["Jane Doe", "Jane Doe"])) == {
+        "investigator_first_name": ["Jane"] * 2,
+        "investigator_middle_name": ["Doe"] * 2,
+        "investigator_last_name": [None] * 2}
+
+    # multistep, kernel then elementwise
+    bf = cvtr.bfunction("lookup_and_prefix")
+    assert bf(["Native American", "Martian"]) == [
+        "GC:American Indian or Alaska Native", "GC:NA"]
+
+    # identity
+    bf = cvtr.bfunction("study_personnel_email_address_to_investigator_email")
+    assert bf(["a", "b"]) == ["a", "b"]
+
+    recs = [{"age_at_diagnosis": 365}, {}, {"age_at_diagnosis": -999}]
+    out = list(cvtr.convert_records(recs, source_node="diagnosis",
+                                    chunksize=2))
+    assert out == [{"diagnosis": {"age_at_diagnosis": 1.0}},
+                   {"diagnosis": {}},
+                   {"diagnosis": {"age_at_diagnosis": None}}]
+
+
+def test_numpy_batch_kernels(samplesd):
+    np = pytest.importorskip("numpy")
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    cvtr = Converter(tmdf=tmdf)
+    bf = cvtr.bfunction("age_days_to_years")
+    tf = cvtr.tfunction("age_days_to_years")
+    col = [730, -999, 3652, 1, 400]
+    out = bf(np.array(col))
+    assert isinstance(out, np.ndarray)
+    # NaN where the scalar path gives None (the sentinel)
+    assert [None if np.isnan(v) else v for v in out.tolist()] == [
+        tf(x) for x in col]
+    out = bf(np.array([730.0, np.nan]))
+    assert out[0] == 2.0 and np.isnan(out[1])
+
+    p = Y2DParams()
+    vals = [2, None, 0.5, 10, 1.5]
+    out = years_to_days_batch(
+        np.array([np.nan if v is None else v for v in vals]), params=p)
+    assert out.tolist() == [years_to_days(v, p) for v in vals] == \
+        years_to_days_batch(vals, params=p)
+
+
+def test_params_bound_at_build(samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    gtf = tmdf.transforms["age_days_to_years"].model_copy(deep=True)
+    gtf.Steps[0].Params = None
+    cvtr = Converter(gtfs={"age": gtf})
+    # Params: null means use the default params
+    assert cvtr.tfunction("age")(730) == 2.0
+    assert cvtr.bfunction("age")([730]) == [2.0]
+
+    gtf = gtf.model_copy(deep=True)
+    gtf.Steps[0].Params = {"precision": "two"}
+    with pytest.raises(RuntimeError, match="Transform 'age': Invalid Params"):
+        Converter(gtfs={"age": gtf})
+
+
+def test_execution_plan(samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    gtfs = dict(tmdf.transforms)
+    lkup = gtfs["lookup_and_prefix"]
+    # shares its (only) step with the first step of lookup_and_prefix
+    gtfs["race_to_cds"] = GeneralTransform(
+        Inputs=lkup.Inputs,
+        Outputs=[lkup.Outputs[0].model_copy(update={"Props": ["race_cds"]})],
+        Steps=lkup.Steps[:1])
+    # identity fan-out from the same source
+    email = gtfs["study_personnel_email_address_to_investigator_email"]
+    gtfs["email_copy"] = IdentityTransform(
+        Inputs=email.Inputs,
+        Outputs=[email.Outputs[0].model_copy(update={"Node": "personnel"})])
+    cvtr = Converter(gtfs=gtfs)
+
+    plan = cvtr.plan("participant")
+    assert plan.summary() == {"transforms": 2, "sources": 1, "ops": 2,
+                              "shared_ops": 1, "outputs": 2, "copies": 0}
+    assert plan.ops[0].handles == ["lookup_and_prefix", "race_to_cds"]
+    out = plan.execute([{"race": "Native American"}, {}])
+    assert out == [{"participant": {
+        "race": "GC:American Indian or Alaska Native",
+        "race_cds": "American Indian or Alaska Native"}},
+                   {"participant": {}}]
+
+    plan = cvtr.plan("study_personnel")
+    assert plan.summary()["sources"] == 2
+    assert plan.summary()["copies"] == 2
+    assert "copy  personnel.email <- study_personnel.email_address" in \
+        plan.describe()
+    out = list(cvtr.convert_records(
+        [{"email_address": "a@b.c", "personnel_name": "A B C"}],
+        "study_personnel"))
+    assert out[0]["personnel"] == {"email": "a@b.c"}
+    assert out[0]["investigator"]["email"] == "a@b.c"
+    assert out[0]["investigator"]["last_name"] == "C"
+
+    # fewer values than outputs, as the scalar form
+    tf = cvtr.tfunction("fullname_to_fmlnames")
+    recs = [{"personnel_name": "Jane Doe"}] * 20
+    for cat in ("auto", None):
+        out = list(cvtr.convert_records(recs, "study_personnel",
+                                        categorical=cat))
+        assert out[0]["investigator"] == {
+            k.removeprefix("investigator_"): v
+            for (k, v) in tf("Jane Doe").items()} == {
+            "first_name": "Jane", "middle_name": "Doe"}
+    (cols,) = cvtr.convert_columns(recs[:2], "study_personnel",
+                                   categorical=None)
+    assert cols["investigator"]["last_name"] == [None, None]
+
+    assert set(cvtr.plans()) == {"study_personnel", "participant",
+                                 "diagnosis"}
+
+
+def test_impure_ops_not_shared(samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    lkup = tmdf.transforms["lookup_and_prefix"]
+    gtfs = {hdl: GeneralTransform(
+        Inputs=lkup.Inputs,
+        Outputs=[lkup.Outputs[0].model_copy(update={"Props": [prop]})],
+        Steps=[{"Package": {"Name": "bento_transforms"},
+                "Entrypoint": "ids.random_uuid"}])
+            for (hdl, prop) in [("mint_a", "id_a"), ("mint_b", "id_b")]}
+    cvtr = Converter(gtfs=gtfs)
+    plan = cvtr.plan("participant")
+    assert plan.summary()["ops"] == 2
+    assert plan.summary()["shared_ops"] == 0
+    (out,) = plan.execute([{"race": "Asian"}], categorical=None)
+    assert out["participant"]["id_a"] != out["participant"]["id_b"]
+
+
+def test_memoization(samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    gtfs = dict(tmdf.transforms)
+    gtfs["mint_id"] = GeneralTransform(
+        Inputs=gtfs["lookup_and_prefix"].Inputs,
+        Outputs=gtfs["lookup_and_prefix"].Outputs,
+        Steps=[{"Package": {"Name": "bento_transforms"},
+                "Entrypoint": "ids.random_uuid"}])
+    gtfs["seed_id"] = GeneralTransform(
+        Inputs=gtfs["lookup_and_prefix"].Inputs,
+        Outputs=gtfs["lookup_and_prefix"].Outputs,
+        Steps=[{"Package": {"Name": "bento_transforms"},
+                "Entrypoint": "ids.generate_uuid"}])
+    cvtr = Converter(gtfs=gtfs, memo_size=2)
+    tf = cvtr.tfunction("lookup_and_prefix")
+    for v in ["Asian", "Asian", "European", "Asian", "Other", "European"]:
+        tf(v)
+    assert cvtr.memo_stats()["lookup_and_prefix"] == {
+        "hits": 2, "misses": 4, "evictions": 2, "uncacheable": 0,
+        "size": 2, "maxsize": 2, "policy": "lru"}
+    assert tf(participant_race="Asian") == "GC:Asian"
+
+    # copied outputs
+    tf = cvtr.tfunction("fullname_to_fmlnames")
+    ret = tf("James Earl Jones")
+    ret["investigator_first_name"] = "Darth"
+    assert tf("James Earl Jones")["investigator_first_name"] == "James"
+    assert cvtr.memo_stats()["fullname_to_fmlnames"]["hits"] == 1
+
+    # unhashable inputs
+    tf = cvtr.tfunction("seed_id")
+    assert tf(["a", "b"]) == tf(["a", "b"]) != tf(["a", "c"])
+    assert cvtr.memo_stats()["seed_id"]["hits"] == 1
+
+    # equal values of different types are cached apart
+    gtfs["concat"] = GeneralTransform(
+        Inputs=gtfs["lookup_and_prefix"].Inputs,
+        Outputs=gtfs["lookup_and_prefix"].Outputs,
+        Steps=[{"Package": {"Name": "bento_transforms"},
+                "Entrypoint": "string.concat_fields"}])
+    cvtr = Converter(gtfs=gtfs, memo_size=8)
+    tf = cvtr.tfunction("concat")
+    assert [tf(1), tf(True), tf(1.0), tf(1)] == ["1", "True", "1.0", "1"]
+    assert cvtr.memo_stats()["concat"]["hits"] == 1
+
+    # impure step: not memoized
+    assert not cvtr.is_pure("mint_id")
+    tf = cvtr.tfunction("mint_id")
+    assert tf("Asian") != tf("Asian")
+    assert "mint_id" not in cvtr.memo_stats()
+
+    with pytest.raises(RuntimeError, match="Unknown eviction policy"):
+        Converter(gtfs=gtfs, memo_size=2,
+                  memo_policy="mru").tfunction("lookup_and_prefix")
+
+
+def test_categorical(samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    cvtr = Converter(tmdf=tmdf)
+    races = ["Asian", "European", "Native American", "Martian"]
+    recs = [{"race": races[i % 4]} for i in range(100)] + [{}]
+    plain = list(cvtr.convert_records(recs, "participant", categorical=None))
+    for cat in ("auto", {"race"}):
+        assert list(cvtr.convert_records(recs, "participant",
+                                         categorical=cat)) == plain
+    (cols,) = cvtr.convert_columns(recs[:100], "participant")
+    col = cols["participant"]["race"]
+    assert isinstance(col, Categorical)
+    assert len(col.categories) == 4
+    assert col == [r["participant"]["race"] for r in plain[:100]]
+
+    # impure steps run once per row, encoded or not
+    lkup = tmdf.transforms["lookup_and_prefix"]
+    mint = Converter(gtfs={"mint_id": GeneralTransform(
+        Inputs=lkup.Inputs, Outputs=lkup.Outputs,
+        Steps=lkup.Steps[:1] + [{"Package": {"Name": "bento_transforms"},
+                                 "Entrypoint": "ids.random_uuid"}])})
+    same = [{"race": "Asian"}] * 50
+    for cat in ("auto", {"race"}, None):
+        ids = {r["participant"]["race"]
+               for r in mint.convert_records(same, "participant",
+                                             categorical=cat)}
+        assert len(ids) == 50
+
+    bf = cvtr.bfunction("fullname_to_fmlnames")
+    ret = bf(Categorical.encode(["A B C", "D E F", "A B C"]))
+    assert isinstance(ret["investigator_last_name"], Categorical)
+    assert ret["investigator_last_name"] == ["C", "F", "C"]
+
+
+def test_indexes(samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    cvtr = Converter(tmdf=tmdf)
+    assert cvtr.transforms_consuming("participant.race") == [
+        "lookup_and_prefix"]
+    assert cvtr.transforms_producing("investigator.middle_name") == [
+        "fullname_to_fmlnames"]
+    assert cvtr.transforms_producing("investigator.shoe_size") == []
+    assert set(cvtr.computable_from(["study_personnel.personnel_name",
+                                     "study_personnel.email_address",
+                                     "participant.race"])) == {
+        "fullname_to_fmlnames", "lookup_and_prefix",
+        "study_personnel_email_address_to_investigator_email"}
+    assert cvtr.computable_from(["study_personnel.title"]) == []
+    assert cvtr.find_transforms(to="investigator.last_name") == [
+        "fullname_to_fmlnames"]
+    assert cvtr.find_transforms(frm="study_personnel.personnel_name",
+                                to="investigator.email") == []
+    assert len(cvtr.find_transforms()) == len(cvtr.transforms)
+
+
+def test_instrumentation(samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    cvtr = Converter(tmdf=tmdf)
+    assert cvtr.instruments is None
+    with pytest.raises(RuntimeError, match="instrument=True"):
+        cvtr.stats()
+
+    cvtr = Converter(tmdf=tmdf, instrument=True)
+    events = []
+    cvtr.add_hook(lambda *ev: events.append(ev))
+    tf = cvtr.tfunction("lookup_and_prefix")
+    for v in ["Asian", "European", "Martian"]:
+        tf(v)
+    with pytest.raises(TypeError):
+        tf({})
+    st = cvtr.stats()["transforms"]["lookup_and_prefix"]
+    assert st["calls"] == 4
+    assert st["errors"] == 1
+    assert st["p50_us"] <= st["p99_us"]
+    assert [s["entrypoint"] for s in st["steps"]] == [
+        step.Entrypoint for step in tmdf.transforms["lookup_and_prefix"].Steps]
+    assert st["steps"][0]["calls"] == 4
+    assert ("lookup_and_prefix", None) in {ev[:2] for ev in events}
+
+    recs = [{"age_at_diagnosis": d} for d in (365, 730, -999)]
+    list(cvtr.convert_records(recs, "diagnosis"))
+    (op,) = cvtr.stats()["plans"]["diagnosis"]
+    assert op["entrypoint"] == "arith.days_to_years"
+    assert op["handles"] == ["age_days_to_years"]
+    assert (op["calls"], op["rows"]) == (1, 3)
+    assert events[-1][0] == "plan:diagnosis"
+
+    cvtr.instruments.reset()
+    assert cvtr.stats()["transforms"]["lookup_and_prefix"]["calls"] == 0
+
+
+def test_collect_errors(samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    cvtr = Converter(tmdf=tmdf)
+    recs = [{"personnel_name": "James Earl Jones", "email_address": "j@x"},
+            {"personnel_name": None, "email_address": "n@x"},
+            {"personnel_name": "A B C", "email_address": "a@x"}]
+    with pytest.raises(AttributeError):
+        list(cvtr.convert_records(recs, "study_personnel"))
+    dead = []
+    out = list(cvtr.convert_records(recs, "study_personnel", chunksize=2,
+                                    on_error="collect",
+                                    dead_letter=dead.append))
+    assert out[1] == {"investigator": {"email": "n@x"}}
+    assert out[2]["investigator"]["last_name"] == "C"
+    (err,) = dead
+    assert err["record"] == 1
+    assert err["handles"] == ["fullname_to_fmlnames"]
+    assert err["entrypoint"] == "string.split"
+    assert err["input"] == [None]
+    assert err["error"] == "AttributeError"
+
+    # a short multi-output result is not an error; its record keeps the
+    # outputs the step returned
+    dead = []
+    out = list(cvtr.convert_records(
+        recs + [{"personnel_name": "Jane Doe", "email_address": "d@x"}],
+        "study_personnel", on_error="collect", dead_letter=dead.append))
+    assert len(dead) == 1
+    assert out[3]["investigator"] == {"email": "d@x", "first_name": "Jane",
+                                      "middle_name": "Doe"}
+
+    out = []
+    with pytest.raises(RuntimeError, match="Error budget exceeded"):
+        for rec in cvtr.convert_records(recs * 10, "study_personnel",
+                                        chunksize=9, on_error="collect",
+                                        max_errors=5):
+            out.append(rec)
+    # the chunk that exceeds the budget (6th error, in records 9-17) is
+    # still yielded
+    assert len(out) == 18
+    assert out[17]["investigator"]["last_name"] == "C"
+    with pytest.raises(RuntimeError, match="Unknown on_error mode"):
+        list(cvtr.convert_records(recs, "study_personnel", on_error="skip"))
+
+
+def test_specialized_functions(samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    gtfs = dict(tmdf.transforms)
+    split = gtfs["fullname_to_fmlnames"]
+    # single output from a list-returning step
+    gtfs["split_one"] = split.model_copy(update={"Outputs": [
+        split.Outputs[0].model_copy(update={"Props": ["first_name"]})]})
+    # a step returning lists, dicts or scalars
+    gtfs["parse_json"] = GeneralTransform(
+        Inputs=split.Inputs, Outputs=split.Outputs,
+        Steps=[{"Package": {"Name": "json"}, "Entrypoint": "loads"}])
+    for (hdl, gtf) in gtfs.items():
+        general = create_transform_function(gtf)
+        pos = create_transform_function(gtf, handle=hdl, calling="positional")
+        kw = create_transform_function(gtf, handle=hdl, calling="keyword")
+        (arg,) = [f"{i.Node}_{p}" for i in gtf.Inputs for p in i.Props]
+        for v in ["James Earl Jones", "Jane Doe", "Asian", 730, '["a", "b"]',
+                  '{"x": 1, "y": 2}', "5"]:
+            try:
+                expected = general(v)
+            except Exception:
+                continue
+            assert pos(v) == expected
+            assert kw(**{arg: v}) == expected
+        with pytest.raises(TypeError):
+            kw(v)
+    assert "f1(f0(participant_race)" in create_transform_function(
+        gtfs["lookup_and_prefix"], handle="lookup_and_prefix",
+        calling="positional").source
+    # identity step dropped
+    assert "ret = study_personnel_email_address\n" in \
+        create_transform_function(
+            gtfs["study_personnel_email_address_to_investigator_email"],
+            calling="positional").source
+    with pytest.raises(RuntimeError, match="Unknown calling convention"):
+        create_transform_function(gtfs["lookup_and_prefix"], calling="both")
+
+    cvtr = Converter(tmdf=tmdf, calling="keyword", memo_size=8,
+                     instrument=True)
+    tf = cvtr.tfunction("lookup_and_prefix")
+    assert tf(participant_race="Asian") == "GC:Asian"
+    assert cvtr.stats()["transforms"]["lookup_and_prefix"]["calls"] == 1
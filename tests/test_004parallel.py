@@ -0,0 +1,38 @@
+import pytest
+import pickle
+from bento_transforms.mdf import TransformReader
+from bento_transforms.converters.converter import Converter
+
+
+@pytest.fixture
+def cvtr(samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    return Converter(tmdf=tmdf)
+
+
+def test_compiled_transforms_pickle(cvtr):
+    for hdl in cvtr.transforms:
+        tf = pickle.loads(pickle.dumps(cvtr.tfunction(hdl)))
+        bf = pickle.loads(pickle.dumps(cvtr.bfunction(hdl)))
+        assert tf.inputs == cvtr.tfunction(hdl).inputs
+        assert bf.outputs == cvtr.bfunction(hdl).outputs
+    tf = pickle.loads(pickle.dumps(cvtr.tfunction("lookup_and_prefix")))
+    assert tf("Native American") == "GC:American Indian or Alaska Native"
+
+
+def test_convert_records_parallel(cvtr):
+    names = ["James Earl Jones", "Sigismund Leonhart Popbutton"]
+    recs = [{"personnel_name": names[i % 2], "email_address": f"p{i}@x.org"}
+            for i in range(103)]
+    serial = list(cvtr.convert_records(recs, "study_personnel", chunksize=10))
+    par = list(cvtr.convert_records_parallel(iter(recs), "study_personnel",
+                                             chunksize=10, processes=2))
+    assert par == serial
+    unord = list(cvtr.convert_records_parallel(iter(recs), "study_personnel",
+                                               chunksize=10, processes=2,
+                                               ordered=False))
+    assert len(unord) == 103
+    assert (sorted(r["investigator"]["email"] for r in unord) ==
+            sorted(r["investigator"]["email"] for r in serial))
@@ -0,0 +1,80 @@
+import pytest
+from importlib.metadata import EntryPoint
+from types import SimpleNamespace
+from bento_transforms.mdf import TransformReader
+from bento_transforms.mdf.pymodels import GeneralTransform, TfStepSpec
+from bento_transforms.converters.converter import Converter
+from bento_transforms.converters import steps
+from bento_transforms.converters.steps import resolve_step
+from bento_transforms.tflib import registry, string
+
+
+def shout(input, params=None):
+    return input.upper() + "!"
+
+
+@pytest.fixture
+def scratch_registry(monkeypatch):
+    # registrations and resolutions made by a test are discarded after it
+    monkeypatch.setattr(registry, "_registry", dict(registry._registry))
+    monkeypatch.setattr(steps, "_resolved", dict(steps._resolved))
+
+
+def test_registry_resolution(scratch_registry):
+    registry.register("util.shout", package="my-tflib",
+                      version="1.0.0")(shout)
+    step = TfStepSpec(Package={"Name": "bento-transforms", "Version": "0.1.1"},
+                      Entrypoint="string.split")
+    assert resolve_step(step) is string.split
+    assert registry.lookup("bento_transforms", None,
+                           "string.split") is string.split
+
+    step = TfStepSpec(Package={"Name": "my_tflib", "Version": "1.0.0"},
+                      Entrypoint="util.shout")
+    assert resolve_step(step) is shout
+    assert registry.lookup("my_tflib", "2.0.0", "util.shout") is None
+
+    gtf = GeneralTransform(
+        Inputs=[{"Model": "A", "Version": "1", "Node": "n", "Props": ["p"]}],
+        Outputs=[{"Model": "B", "Version": "1", "Node": "n", "Props": ["p"]}],
+        Steps=[step])
+    assert Converter(gtfs={"shout": gtf}).tfunction("shout")("hey") == "HEY!"
+
+
+def test_entry_points(scratch_registry):
+    eps = [EntryPoint(name="basic.nothing",
+                      value="bento_transforms.tflib.basic:null",
+                      group=registry.ENTRY_POINT_GROUP)]
+    assert registry.load_entry_points(eps) == 1
+    assert registry.lookup("bento_transforms", "9.9",
+                           "basic.nothing")("x", None) is None
+
+
+def test_entry_point_versions(scratch_registry):
+    ep = SimpleNamespace(name="util.twice", value="my_steps.util:twice",
+                         dist=SimpleNamespace(name="my-steps",
+                                              version="1.2.0"),
+                         load=lambda: shout)
+    assert registry.load_entry_points([ep]) == 1
+    # the installed version, or any other, or none
+    for version in ("1.2.0", "1.3.0", None):
+        assert registry.lookup("my_steps", version, "util.twice") is shout
+    step = TfStepSpec(Package={"Name": "my-steps"}, Entrypoint="util.twice")
+    assert resolve_step(step) is shout
+
+
+def test_resolve_all(samplesd):
+    tmdf = TransformReader(samplesd / "transforms.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    cvtr = Converter(tmdf=tmdf)
+    with pytest.raises(RuntimeError, match="Cannot resolve") as e:
+        cvtr.resolve_all()
+    assert "Transform 'acl_to_authz', step 'string.format'" in str(e.value)
+    assert "Transform 'age_days_to_years', step 'mutate.update'" in \
+        str(e.value)
+
+
+def test_registry_restored():
+    assert registry.lookup("my_tflib", "1.0.0", "util.shout") is None
+    assert ("my_tflib", "1.0.0", "util.shout") not in steps._resolved
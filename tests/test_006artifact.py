@@ -0,0 +1,60 @@
+import json
+import pytest
+import shutil
+from bento_transforms.mdf import TransformReader
+from bento_transforms.converters.converter import Converter
+from bento_transforms.converters.artifact import read_header, is_stale
+
+
+def test_save_load(samplesd, tmp_path):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    cvtr = Converter(tmdf=tmdf)
+    assert cvtr.tfunction("lookup_and_prefix")("Asian") == "GC:Asian"
+    art = tmp_path / "cvtr.art"
+    header = cvtr.save(art)
+    assert header == read_header(art)
+    assert header["source_hash"] == cvtr.source_hash
+
+    cvtr2 = Converter.load(art)
+    assert list(cvtr2.transforms) == list(cvtr.transforms)
+    assert cvtr2.transforms_consuming("participant.race") == [
+        "lookup_and_prefix"]
+    assert cvtr2.tfunction("lookup_and_prefix")("Asian") == "GC:Asian"
+    recs = [{"personnel_name": "A B C", "email_address": "a@b.c"}]
+    assert (list(cvtr2.convert_records(recs, "study_personnel")) ==
+            list(cvtr.convert_records(recs, "study_personnel")))
+
+    # corrupted payload
+    data = art.read_bytes()
+    bad = tmp_path / "bad.art"
+    bad.write_bytes(data[:-1] + bytes([data[-1] ^ 1]))
+    with pytest.raises(RuntimeError, match="content hash"):
+        Converter.load(bad)
+
+    # written by another package version
+    (head, payload) = data.split(b"\n", 1)
+    other = dict(header, bento_transforms="0.0.0-other")
+    bad.write_bytes(json.dumps(other).encode() + b"\n" + payload)
+    with pytest.raises(RuntimeError, match="written by bento-transforms "
+                       "0.0.0-other"):
+        Converter.load(bad)
+
+
+def test_reload_on_source_change(samplesd, tmp_path):
+    yml = tmp_path / "tf.yaml"
+    shutil.copy(samplesd / "tf_func_test.yaml", yml)
+    art = tmp_path / "cvtr.art"
+    schema = samplesd / "mdf-schema-tf.yaml"
+    assert is_stale(art, [yml])
+    cvtr = Converter.load(art, yaml_files=[yml], mdf_schema=schema)
+    assert art.exists() and not is_stale(art, [yml])
+    assert "lookup_and_prefix" in cvtr.transforms
+
+    yml.write_text(yml.read_text().replace("lookup_and_prefix",
+                                           "lookup_then_prefix"))
+    assert is_stale(art, [yml])
+    cvtr = Converter.load(art, yaml_files=[yml], mdf_schema=schema)
+    assert "lookup_then_prefix" in cvtr.transforms
+    assert "lookup_then_prefix" in Converter.load(art).transforms
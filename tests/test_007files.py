@@ -0,0 +1,94 @@
+import pytest
+import csv
+import json
+from bento_transforms.mdf import TransformReader
+from bento_transforms.converters.converter import Converter
+
+
+def read_tsv(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f, delimiter="\t"))
+
+
+def test_convert_files(samplesd, tmp_path):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    cvtr = Converter(tmdf=tmdf)
+    sp = tmp_path / "study_personnel.tsv"
+    sp.write_text("type\tpersonnel_name\temail_address\n" +
+                  "".join(f"study_personnel\tJames Earl Jones{i}\tj{i}@x.org\n"
+                          for i in range(25)) +
+                  "study_personnel\tNo Email Here\t\n")
+    dx = tmp_path / "diagnosis.tsv"
+    dx.write_text("type\tage_at_diagnosis\ndiagnosis\t730\ndiagnosis\t\n")
+    res = cvtr.convert_files({"study_personnel": sp, "diagnosis": dx},
+                             tmp_path / "out", chunksize=4, queue_size=1,
+                             parsers={"age_at_diagnosis": int})
+    assert set(res["files"]) == {"investigator", "diagnosis"}
+    assert res["stages"]["read"]["rows"] == 28
+    assert res["stages"]["convert"]["rows"] == 28
+    assert res["stages"]["write"]["rows"] == 28
+
+    inv = read_tsv(res["files"]["investigator"])
+    assert len(inv) == 26
+    assert list(inv[0]) == ["type", "email", "first_name", "middle_name",
+                            "last_name"]
+    assert inv[3] == {"type": "investigator", "first_name": "James",
+                      "middle_name": "Earl", "last_name": "Jones3",
+                      "email": "j3@x.org"}
+    assert inv[25]["email"] == ""
+    dxo = read_tsv(res["files"]["diagnosis"])
+    assert [r["age_at_diagnosis"] for r in dxo] == ["2.0", ""]
+
+
+def test_convert_files_error(samplesd, tmp_path):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    cvtr = Converter(tmdf=tmdf)
+    dx = tmp_path / "diagnosis.tsv"
+    dx.write_text("type\tage_at_diagnosis\n" + "diagnosis\t730\n" * 50 +
+                  "diagnosis\tseven\n")
+    # unparsed string reaches days_to_years
+    with pytest.raises(TypeError):
+        cvtr.convert_files({"diagnosis": dx}, tmp_path / "out",
+                           chunksize=5, queue_size=1)
+
+
+def test_convert_files_dead_letter(samplesd, tmp_path):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    cvtr = Converter(tmdf=tmdf)
+    dx = tmp_path / "diagnosis.tsv"
+    dx.write_text("type\tage_at_diagnosis\n" + "diagnosis\t730\n" * 50 +
+                  "diagnosis\tseven\n" + "diagnosis\t365\n")
+    parsers = {"age_at_diagnosis": lambda v: int(v) if v.isdigit() else v}
+    res = cvtr.convert_files({"diagnosis": dx}, tmp_path / "out",
+                             chunksize=5, queue_size=1, parsers=parsers,
+                             on_error="collect")
+    assert res["errors"] == 1
+    # the failed record has no output
+    assert res["stages"]["write"]["rows"] == 51
+    dxo = read_tsv(res["files"]["diagnosis"])
+    assert [r["age_at_diagnosis"] for r in dxo[-2:]] == ["2.0", "1.0"]
+    (err,) = [json.loads(ln) for ln in res["dead_letter"].open()]
+    assert err["record"] == 50
+    assert err["node"] == "diagnosis"
+    assert err["input"] == ["seven"]
+    assert err["handles"] == ["age_days_to_years"]
+
+    with pytest.raises(RuntimeError, match="Error budget exceeded"):
+        cvtr.convert_files({"diagnosis": dx}, tmp_path / "out",
+                           chunksize=5, parsers=parsers,
+                           on_error="collect", max_errors=0)
+    # the chunk that exceeded the budget is written, as convert_records
+    # yields it
+    assert len(read_tsv(tmp_path / "out" / "diagnosis.tsv")) == 51
+
+    # outputs of an earlier run are not reported (or left behind)
+    dx.write_text("type\tage_at_diagnosis\n")
+    res = cvtr.convert_files({"diagnosis": dx}, tmp_path / "out")
+    assert res["files"] == {}
+    assert not (tmp_path / "out" / "diagnosis.tsv").exists()
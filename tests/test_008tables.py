@@ -0,0 +1,84 @@
+import pytest
+import json
+from bento_transforms.mdf import TransformReader
+from bento_transforms.mdf.pymodels import GeneralTransform
+from bento_transforms.converters.converter import Converter
+from bento_transforms.tflib.lookup import lookup_table, lookup_table_batch
+from bento_transforms.tflib import tables
+
+
+@pytest.fixture
+def crosswalk(tmp_path, monkeypatch):
+    monkeypatch.setenv("BENTO_TRANSFORMS_CACHE", str(tmp_path / "cache"))
+    tables.clear_tables()
+    tsv = tmp_path / "race.tsv"
+    tsv.write_text("ccdi\tcds\tnote\n"
+                   "African American\tBlack or African American\tx\n"
+                   "European\tWhite\tx\n"
+                   "Asian\tAsian\tx\n"
+                   "Not Reported\tUnknown\tx\n")
+    yield tsv
+    tables.clear_tables()
+
+
+def test_lookup_table(crosswalk, tmp_path):
+    p = {"table": str(crosswalk)}
+    assert lookup_table("European", p) == "White"
+    assert lookup_table("european", p) is None
+    assert lookup_table(None, p) is None
+    assert lookup_table("Martian", {**p, "default": "Unknown"}) == "Unknown"
+    assert lookup_table("Martian", {**p, "passthrough": True}) == "Martian"
+    ci = {**p, "case_sensitive": False}
+    assert lookup_table("EUROPEAN", ci) == "White"
+    assert lookup_table_batch(["asian", "Martian", None, "asian"],
+                              {**ci, "default": "NA"}) == [
+        "Asian", "NA", "NA", "Asian"]
+    assert lookup_table("x", {**p, "key": "cds", "value": "note"}) is None
+    assert lookup_table("White", {**p, "key": "cds", "value": "ccdi"}) == (
+        "European")
+
+    # compiled once, then reopened from the index
+    tbl = tables.get_table(str(crosswalk))
+    assert len(tbl) == 4
+    assert tbl.index_path.exists()
+    tables.clear_tables()
+    assert tables.get_table(str(crosswalk)).get("Asian") == "Asian"
+
+    js = tmp_path / "race.json"
+    js.write_text(json.dumps({"Asian": "Asian", "ASIAN": "Asian",
+                              "Other": "Other"}))
+    assert lookup_table("asian", {"table": str(js),
+                                  "case_sensitive": False}) == "Asian"
+    js.write_text(json.dumps({"Asian": "Asian", "ASIAN": "Other"}))
+    with pytest.raises(RuntimeError, match="conflicting values"):
+        tables.MappingTable(js, case_sensitive=False)
+    with pytest.raises(RuntimeError, match="no column 'ccds'"):
+        tables.MappingTable(crosswalk, key="ccds")
+    with pytest.raises(RuntimeError, match="not found"):
+        lookup_table("Asian", {"table": str(tmp_path / "nope.tsv")})
+
+
+def test_lookup_table_converter(crosswalk, samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    gtf = tmdf.transforms["lookup_and_prefix"]
+    gtfs = {"race": GeneralTransform(
+        Inputs=gtf.Inputs, Outputs=gtf.Outputs,
+        Steps=[{"Package": {"Name": "bento_transforms"},
+                "Entrypoint": "lookup.table",
+                "Params": {"table": str(crosswalk), "default": "Unknown"}}])}
+    cvtr = Converter(gtfs=gtfs)
+    assert cvtr.tfunction("race")("Asian") == "Asian"
+    recs = [{"race": r} for r in ["Asian", "European", "Martian"] * 20]
+    serial = list(cvtr.convert_records(recs, "participant", chunksize=7))
+    assert serial[2] == {"participant": {"race": "Unknown"}}
+    par = list(cvtr.convert_records_parallel(recs, "participant",
+                                             chunksize=7, processes=2))
+    assert par == serial
+    with pytest.raises(RuntimeError, match="Invalid Params"):
+        Converter(gtfs={"race": GeneralTransform(
+            Inputs=gtf.Inputs, Outputs=gtf.Outputs,
+            Steps=[{"Package": {"Name": "bento_transforms"},
+                    "Entrypoint": "lookup.table",
+                    "Params": {"default": "Unknown"}}])})
@@ -0,0 +1,46 @@
+import pytest
+from bento_transforms.tflib import string
+from bento_transforms.tflib.pymodels import CaseParams, StrFuncParams
+
+
+def test_string_functions():
+    assert string.extract_middle_name("James Earl Jones", {}) == "Earl"
+    assert string.extract_middle_name("Cher", {"default": ""}) == ""
+    assert string.extract_middle_name(None, {"default": "-"}) == "-"
+
+    p = StrFuncParams(pattern=r"\s+jr\.?$", flags=2)
+    assert string.strip_pattern("John Smith JR.", p) == "John Smith"
+    assert string.strip_pattern(None, p) is None
+    assert string.strip_pattern("x", {}) == "x"
+    # several patterns, one pass
+    p = StrFuncParams(pattern=r"^dr\.?\s+", patterns=[r"\s+jr\.?$"],
+                      replacement="", flags=2)
+    assert p._regex.pattern == r"(?:^dr\.?\s+)|(?:\s+jr\.?$)"
+    assert string.strip_pattern("Dr. John Smith Jr.", p) == "John Smith"
+
+    p = CaseParams(exceptions=["nos", "NEC"])
+    assert p.exceptions == {"NOS", "NEC"}
+    assert string.normalize_case("ADENOCARCINOMA, nos.", p) == (
+        "Adenocarcinoma, NOS.")
+    assert string.normalize_case("tumor", {"case_type": "upper"}) == "TUMOR"
+    assert string.normalize_case("", p) == ""
+    with pytest.raises(ValueError):
+        CaseParams(case_type="camel")
+
+
+@pytest.mark.parametrize("func,params,column", [
+    (string.extract_middle_name, {"default": "-"},
+     ["James Earl Jones", "Cher", None, ""]),
+    (string.strip_pattern, {"pattern": "[0-9]+", "patterns": ["-"],
+                            "replacement": "#"}, ["ab-12", None, "x"]),
+    (string.normalize_case, {"exceptions": ["NOS"]},
+     ["ADENOCARCINOMA nos", None, "a b"]),
+    (string.normalize_case, {"case_type": "title"}, ["a b", None]),
+    (string.split, {"delimiter": ","}, ["a,b", "c"]),
+    (string.add_prefix, {"prefix": "GC:"}, ["a", "b"]),
+    (string.concat_fields, {"delimiter": "-", "skip_null": True,
+                            "suffix": "!"}, [["a", None, "b"], "c", None]),
+])
+def test_string_kernels(func, params, column):
+    params = func.params_model(**params)
+    assert func.batch(column, params) == [func(x, params) for x in column]
@@ -0,0 +1,47 @@
+import uuid
+from bento_transforms.mdf.pymodels import GeneralTransform
+from bento_transforms.converters.converter import Converter
+from bento_transforms.tflib.ids import (
+    generate_uuid, generate_uuid_batch, uuid_str,
+)
+from bento_transforms.tflib.pymodels import UuidNS
+
+
+def test_generate_uuid_batch():
+    seeds = [("phs002431", "PT_1"), ["phs002431", None, 7], "PT_2", None, 42]
+    for ns in ("dns", "url", "oid", "x500"):
+        p = UuidNS(namespace=ns)
+        assert generate_uuid_batch(seeds, params=p) == [
+            generate_uuid(s, p) for s in seeds]
+    # default (dns) namespace
+    assert generate_uuid("PT_1", {}) == str(uuid.uuid5(uuid.NAMESPACE_DNS,
+                                                       "PT_1"))
+    assert generate_uuid("PT_1", {"namespace": "url"}) == str(
+        uuid.uuid5(uuid.NAMESPACE_URL, "PT_1"))
+    assert generate_uuid_batch(["a", "b"], ["c", None], params={}) == [
+        generate_uuid(["a", "c"], {}), generate_uuid(["b"], {})]
+
+    binary = UuidNS(binary=True)
+    ids = generate_uuid_batch(seeds, params=binary)
+    assert ids == [generate_uuid(s, binary) for s in seeds]
+    assert all(isinstance(b, bytes) and len(b) == 16 for b in ids)
+    assert [uuid_str(b) for b in ids] == generate_uuid_batch(seeds,
+                                                             params={})
+    assert uuid.UUID(bytes=ids[0]).version == 5
+
+
+def test_binary_uuids_written_as_strings(tmp_path):
+    gtfs = {"pid_to_id": GeneralTransform(
+        Inputs=[{"Model": "CCDI", "Version": "1", "Node": "participant",
+                 "Props": ["participant_id"]}],
+        Outputs=[{"Model": "CDS", "Version": "1", "Node": "participant",
+                  "Props": ["id"]}],
+        Steps=[{"Package": {"Name": "bento_transforms"},
+                "Entrypoint": "ids.generate_uuid",
+                "Params": {"binary": True}}])}
+    cvtr = Converter(gtfs=gtfs)
+    src = tmp_path / "participant.tsv"
+    src.write_text("type\tparticipant_id\nparticipant\tPT_1\n")
+    res = cvtr.convert_files({"participant": src}, tmp_path / "out")
+    assert res["files"]["participant"].read_text().splitlines()[1] == (
+        "participant\t" + generate_uuid("PT_1", {}))
@@ -0,0 +1,110 @@
+import pytest
+from bento_meta.model import Model
+from bento_meta.objects import Node, Edge, Property
+from bento_transforms.mdf.pymodels import GeneralTransform
+from bento_transforms.converters.converter import Converter
+from bento_transforms.converters.join import links_from_model
+from bento_transforms.tflib.ids import generate_uuid
+
+LINKS = {
+    "diagnosis": {"participant": ("participant.participant_id",
+                                  "participant_id")},
+    "participant": {"study": ("study.study_id", "study_id")},
+}
+
+
+def io(node, *props):
+    return {"Model": "CCDI", "Version": "1", "Node": node,
+            "Props": list(props)}
+
+
+@pytest.fixture
+def cvtr():
+    gtfs = {
+        "dx_id": GeneralTransform(
+            Inputs=[io("study", "study_id"),
+                    io("participant", "participant_id"),
+                    io("diagnosis", "diagnosis_id")],
+            Outputs=[io("diagnosis", "id")],
+            Steps=[{"Package": {"Name": "bento_transforms"},
+                    "Entrypoint": "ids.generate_uuid"}]),
+        "dx_race_age": GeneralTransform(
+            Inputs=[io("participant", "race"), io("diagnosis", "age")],
+            Outputs=[io("diagnosis", "race", "age")],
+            Steps=[{"Package": {"Name": "Identity"},
+                    "Entrypoint": "identity"}]),
+        "race": GeneralTransform(
+            Inputs=[io("participant", "race")],
+            Outputs=[io("participant", "race")],
+            Steps=[{"Package": {"Name": "Identity"},
+                    "Entrypoint": "identity"}]),
+    }
+    return Converter(gtfs=gtfs)
+
+
+def sources():
+    studies = [{"study_id": f"S{i}"} for i in range(3)]
+    parts = [{"participant_id": f"P{i}", "race": f"R{i % 4}",
+              "study.study_id": f"S{i % 3}"} for i in range(10)]
+    dxs = [{"diagnosis_id": f"D{i}", "age": i,
+            "participant.participant_id": f"P{i % 11}"} for i in range(30)]
+    return {"study": studies, "participant": parts, "diagnosis": dxs}
+
+
+def test_convert_joined(cvtr):
+    assert cvtr.joined_transforms() == ["dx_id", "dx_race_age"]
+    eng = cvtr.join_engine("dx_id", LINKS)
+    assert eng.probe == "diagnosis"
+    assert [h[:2] for h in eng.hops] == [("diagnosis", "participant"),
+                                          ("participant", "study")]
+    out = list(eng.run(cvtr.bfunction("dx_id"), sources(), batch_size=7))
+    # diagnoses of the missing participant P10 are not converted
+    assert len(out) == 28
+    assert eng.stats["unmatched"] == 2
+    (rec, res) = out[4]
+    assert rec["diagnosis_id"] == "D4"
+    assert res == {"diagnosis": {"id": generate_uuid(["S1", "P4", "D4"],
+                                                     {})}}
+
+    out = dict((r["diagnosis_id"], o) for (r, o) in cvtr.convert_joined(
+        "dx_race_age", sources(), LINKS))
+    assert out["D13"] == {"diagnosis": {"race": "R2", "age": 13}}
+
+    # spilled to disk: same results, in partition order
+    eng = cvtr.join_engine("dx_id", LINKS, max_build_rows=2, partitions=3)
+    spilled = list(eng.run(cvtr.bfunction("dx_id"), sources()))
+    assert set(eng.stats["spilled_hops"]) == {("diagnosis", "participant"),
+                                              ("participant", "study")}
+    in_memory = cvtr.convert_joined("dx_id", sources(), LINKS)
+    assert sorted(o["diagnosis"]["id"] for (_, o) in spilled) == sorted(
+        o["diagnosis"]["id"] for (_, o) in in_memory)
+
+    with pytest.raises(RuntimeError, match="all ancestors"):
+        cvtr.join_engine("dx_id", {"diagnosis": LINKS["diagnosis"]})
+
+
+def test_join_node_files(cvtr, tmp_path):
+    src = sources()
+    paths = {}
+    for (node, recs) in src.items():
+        cols = list(recs[0])
+        paths[node] = tmp_path / f"{node}.tsv"
+        paths[node].write_text(
+            "\t".join(cols) + "\n" +
+            "".join("\t".join(str(r[c]) for c in cols) + "\n"
+                    for r in recs))
+    out = dict((r["diagnosis_id"], o) for (r, o) in cvtr.convert_joined(
+        "dx_race_age", paths, LINKS))
+    assert out["D13"] == {"diagnosis": {"race": "R2", "age": "13"}}
+
+
+def test_links_from_model():
+    m = Model("CCDI")
+    m.add_node(Node({"handle": "study"}))
+    m.add_node(Node({"handle": "participant"}))
+    m.add_prop(m.nodes["study"], Property({"handle": "study_id",
+                                           "is_key": True}))
+    m.add_prop(m.nodes["study"], Property({"handle": "study_name"}))
+    m.add_edge(Edge({"handle": "of_study", "src": m.nodes["participant"],
+                     "dst": m.nodes["study"]}))
+    assert links_from_model(m) == {"participant": LINKS["participant"]}
@@ -0,0 +1,117 @@
+import pytest
+from bento_transforms.mdf.pymodels import GeneralTransform
+from bento_transforms.mdf.reader import TransformReader
+from bento_transforms.converters.converter import Converter
+from bento_transforms.converters.aggregate import Aggregator
+from bento_transforms.tflib import reduce
+
+ORDER = {"order": ["open", "registered", "controlled"]}
+
+
+def fold(func, values, params=None):
+    acc = None
+    for v in values:
+        acc = func(acc, v, params)
+    return func.final(acc, params)
+
+
+def test_reducers():
+    assert fold(reduce.strictest,
+                ["open", None, "controlled", "registered"],
+                ORDER) == "controlled"
+    with pytest.raises(ValueError, match="not in order"):
+        fold(reduce.strictest, ["secret"], ORDER)
+    assert fold(reduce.max_value, [3, None, 7, 5]) == 7
+    assert fold(reduce.min_value, [3, None, 7, 5]) == 3
+    assert fold(reduce.first, [None, "b", "a"]) == "b"
+    assert fold(reduce.set_union, ["b", ["a", "c"], None, "a"]) == \
+        ["a", "b", "c"]
+    assert fold(reduce.count, ["x", None, "y"]) == 2
+    assert fold(reduce.count, [None]) == 0
+    assert fold(reduce.concat_distinct, ["b", "a", "b", None],
+                {"delimiter": "|"}) == "b|a"
+    assert fold(reduce.max_value, []) is None
+    # merging partial accumulators gives the same result
+    for (func, vals, params) in ((reduce.strictest,
+                                  ["registered", "open", "controlled"],
+                                  ORDER),
+                                 (reduce.concat_distinct, list("abcab"),
+                                  {"delimiter": ""}),
+                                 (reduce.count, list("abcab"), None)):
+        (a, b) = (None, None)
+        for v in vals[:2]:
+            a = func(a, v, params)
+        for v in vals[2:]:
+            b = func(b, v, params)
+        assert (func.final(func.merge(a, b, params), params) ==
+                fold(func, vals, params))
+
+
+def sources():
+    cyto = [{"acl": ["open", "registered"][i % 2],
+             "study.study_id": f"S{i % 50}"} for i in range(200)]
+    seq = [{"acl": "Controlled" if i % 7 == 0 else "open",
+            "file_type": ["BAM", "FASTQ", "VCF"][i // 60 % 3],
+            "study.study_id": None if i == 1 else f"S{i % 60}"}
+           for i in range(300)]
+    return {"cytogenomic_file": cyto, "sequencing_file": seq,
+            "study": [{"study_id": "S0"}]}
+
+
+def test_aggregate_mdf(samplesd):
+    tmdf = TransformReader(samplesd / "tf_reduce_test.yaml",
+                           handle="transforms",
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    cvtr = Converter(tmdf)
+    assert cvtr.reducer_transforms() == ["file_acl_to_study_acl",
+                                         "file_formats"]
+    assert cvtr.joined_transforms() == []
+    assert cvtr.transforms_for_node("sequencing_file") == []
+    with pytest.raises(RuntimeError, match="is a reducer"):
+        cvtr.tfunction("file_formats")
+
+    out = dict(cvtr.aggregate("file_acl_to_study_acl", sources(),
+                              chunksize=64))
+    assert len(out) == 60
+    # S0 has a 'Controlled' sequencing file (i = 0); S1's files are
+    # cytogenomic 'registered' and sequencing 'open' (i = 1 is ungrouped)
+    assert out["S0"] == {"study": {"acl": "controlled"}}
+    assert out["S1"] == {"study": {"acl": "registered"}}
+    assert out["S53"] == {"study": {"acl": "open"}}
+    fmts = dict(cvtr.aggregate("file_formats", sources()))
+    assert fmts["S0"]["study"]["file_types"] == "BAM,FASTQ,VCF"
+
+    # spilling to disk does not change the results
+    agg = cvtr.aggregator("file_acl_to_study_acl", max_groups=8,
+                          partitions=4)
+    assert dict(agg.run(sources(), chunksize=16)) == out
+    assert agg.stats["spills"] > 1
+    assert agg.stats["records"] == 500
+    assert agg.stats["ungrouped"] == 1
+    agg = cvtr.aggregator("file_formats", max_groups=8)
+    assert dict(agg.run(sources(), chunksize=16)) == fmts
+
+
+def test_aggregator_errors():
+    def gtf(params, entrypoint="reduce.max"):
+        return GeneralTransform(
+            Inputs=[{"Model": "A", "Version": "1", "Node": "file",
+                     "Props": ["size"]}],
+            Outputs=[{"Model": "B", "Version": "1", "Node": "study",
+                      "Props": ["size"]}],
+            Steps=[{"Package": {"Name": "bento_transforms"},
+                    "Entrypoint": entrypoint, "Params": params}])
+    with pytest.raises(RuntimeError, match="requires Params 'group_by'"):
+        Aggregator(gtf(None))
+    with pytest.raises(RuntimeError, match="no column for input nodes"):
+        Aggregator(gtf({"group_by": {"sample": "study.study_id"}}))
+    with pytest.raises(RuntimeError, match="not a reducer"):
+        Aggregator(gtf(None, entrypoint="arith.days_to_years"))
+    agg = Aggregator(gtf({"group_by": "study"}))
+    agg.feed("file", [{"size": 3, "study": "A"}, {"size": 9, "study": "A"},
+                      {"size": 4, "study": "B"}])
+    agg.feed("file", [{"size": 5, "study": "B"}])
+    assert list(agg.results()) == [("A", {"study": {"size": 9}}),
+                                   ("B", {"study": {"size": 5}})]
+    with pytest.raises(RuntimeError, match="not an input"):
+        agg.feed("sample", [])
@@ -0,0 +1,97 @@
+import json
+import pytest
+from bento_transforms.mdf import TransformReader
+from bento_transforms.converters.converter import Converter
+from bento_transforms.graph import retrieve
+
+
+class RecordedDriver:
+    """Stand-in neo4j Driver replaying recorded query responses."""
+    def __init__(self, path):
+        with open(path) as f:
+            self.recorded = json.load(f)
+        self.queries = 0
+
+    def session(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_read(self, txn_q):
+        return txn_q(self)
+
+    def run(self, qry, parameters=None):
+        self.queries += 1
+        for rec in self.recorded:
+            if rec["query"] == qry and rec["parameters"] == parameters:
+                return Result(rec["data"])
+        raise AssertionError(f"No recorded response for {qry} {parameters}")
+
+
+class Result:
+    def __init__(self, data):
+        self._data = data
+
+    def data(self):
+        return [dict(d) for d in self._data]
+
+
+@pytest.fixture
+def driver(samplesd, tmp_path, monkeypatch):
+    monkeypatch.setenv("BENTO_TRANSFORMS_CACHE", str(tmp_path))
+    return RecordedDriver(samplesd / "mdb_responses.json")
+
+
+def test_load_transforms(samplesd, driver):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    gtfs = retrieve.load_transforms(driver, "CCDI", "CDS",
+                                    from_version="3.1.0",
+                                    to_version="10.0.0")
+    assert driver.queries == 2
+    assert set(gtfs) == set(tmdf.transforms)
+    for (hdl, gtf) in gtfs.items():
+        assert gtf.model_dump() == tmdf.transforms[hdl].model_dump()
+    cvtr = Converter(gtfs=gtfs)
+    assert cvtr.tfunction("fullname_to_fmlnames")("Ed J Smith") == {
+        "investigator_first_name": "Ed",
+        "investigator_middle_name": "J",
+        "investigator_last_name": "Smith"}
+
+    # cached by model versions: no further queries
+    assert retrieve.cache_path("CCDI", "3.1.0", "CDS", "10.0.0").exists()
+    assert retrieve.load_transforms(driver, "CCDI", "CDS",
+                                    from_version="3.1.0",
+                                    to_version="10.0.0") == gtfs
+    assert driver.queries == 2
+    retrieve.load_transforms(driver, "CCDI", "CDS", from_version="3.1.0",
+                             to_version="10.0.0", refresh=True)
+    assert driver.queries == 4
+    # other versions are not answered from the cache
+    with pytest.raises(AssertionError, match="No recorded response"):
+        retrieve.load_transforms(driver, "CCDI", "CDS",
+                                 from_version="3.0.0", to_version="10.0.0")
+
+
+def test_gtfs_from_rows(samplesd):
+    with open(samplesd / "mdb_responses.json") as f:
+        (io, steps) = (rec["data"] for rec in json.load(f))
+    with pytest.raises(RuntimeError, match="no steps"):
+        retrieve.gtfs_from_rows(io, [s for s in steps
+                                     if s["entrypoint"] != "string.split"])
+    broken = [s for s in steps if s["entrypoint"] != "string.concat_fields"]
+    with pytest.raises(RuntimeError, match="does not end"):
+        retrieve.gtfs_from_rows(io, broken)
+    dup = dict(io[0], tf="other")
+    with pytest.raises(RuntimeError, match="More than one transform"):
+        retrieve.gtfs_from_rows(io + [dup], steps)
+    # links written without positions are ordered by property
+    unordered = [{k: v for (k, v) in r.items() if k != "position"}
+                 for r in io]
+    gtf = retrieve.gtfs_from_rows(unordered, steps)["fullname_to_fmlnames"]
+    assert gtf.Outputs[0].Props == ["first_name", "last_name", "middle_name"]
@@ -0,0 +1,105 @@
+import pickle
+import pytest
+from bento_transforms.mdf.pymodels import GeneralTransform
+from bento_transforms.mdf.reader import TransformReader
+from bento_transforms.converters.converter import Converter
+from bento_transforms.converters.route import ConverterRegistry
+
+
+def io(model, version, node, *props):
+    return {"Model": model, "Version": version, "Node": node,
+            "Props": list(props)}
+
+
+def step(entrypoint, params=None):
+    if entrypoint == "identity":
+        return {"Package": {"Name": "Identity"}, "Entrypoint": "identity"}
+    return {"Package": {"Name": "bento_transforms"},
+            "Entrypoint": entrypoint, "Params": params}
+
+
+@pytest.fixture
+def registry(samplesd):
+    old = ("CCDI", "3.0.0")
+    new = ("CCDI", "3.1.0")
+    upgrade = Converter(gtfs={
+        "name": GeneralTransform(
+            Inputs=[io(*old, "study_personnel", "name")],
+            Outputs=[io(*new, "study_personnel", "personnel_name")],
+            Steps=[step("identity")]),
+        "email": GeneralTransform(
+            Inputs=[io(*old, "study_personnel", "email")],
+            Outputs=[io(*new, "study_personnel", "email_address")],
+            Steps=[step("string.normalize_case", {"case_type": "lower"})]),
+    })
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    cds = ("CDS", "10.0.0")
+    gc = ("GC", "1.0")
+    to_gc = Converter(gtfs={
+        "given_name": GeneralTransform(
+            Inputs=[io(*cds, "investigator", "first_name")],
+            Outputs=[io(*gc, "person", "given_name")],
+            Steps=[step("string.normalize_case", {"case_type": "upper"})]),
+        "person_id": GeneralTransform(
+            Inputs=[io(*cds, "investigator", "last_name", "email")],
+            Outputs=[io(*gc, "person", "person_id")],
+            Steps=[step("ids.generate_uuid")]),
+        "email": GeneralTransform(
+            Inputs=[io(*cds, "investigator", "email")],
+            Outputs=[io(*gc, "person", "email")],
+            Steps=[step("identity")]),
+        "phone": GeneralTransform(
+            Inputs=[io(*cds, "investigator", "phone")],
+            Outputs=[io(*gc, "person", "phone")],
+            Steps=[step("identity")]),
+    })
+    return ConverterRegistry([upgrade, Converter(tmdf), to_gc])
+
+
+def records():
+    return [{"name": f"Ann {'BQ'[i % 2]} Lee{i}",
+             "email": f"Ann.Lee{i}@Example.org"} for i in range(40)]
+
+
+def test_route(registry):
+    assert registry.endpoints() == [("CCDI", "3.0.0"), ("CCDI", "3.1.0"),
+                                    ("CDS", "10.0.0"), ("GC", "1.0")]
+    hops = registry.route(("CCDI", "3.0.0"), "GC")
+    assert [c.to_model for c in hops] == [("CCDI", "3.1.0"),
+                                          ("CDS", "10.0.0"), ("GC", "1.0")]
+    # from any CCDI version: the shortest route
+    assert len(registry.route("CCDI", ("GC", "1.0"))) == 2
+    with pytest.raises(RuntimeError, match="No route"):
+        registry.route("GC", "CCDI")
+    with pytest.raises(RuntimeError, match="already registered"):
+        registry.add(hops[0])
+
+
+def test_fused_conversion(registry):
+    (frm, to) = (("CCDI", "3.0.0"), ("GC", "1.0"))
+    plan = registry.plan(frm, to, "study_personnel")
+    assert plan.unreachable == ["person.phone"]
+    assert plan.sources == ["name", "email"]
+    assert registry.plan(frm, to, "study_personnel") is plan
+    # the split of the name is computed once for both of its targets
+    desc = plan.describe()
+    assert desc.count("string.split") == 1
+    assert "write person.person_id" in desc
+
+    # same result as converting hop by hop, materializing each model
+    recs = records()
+    for cvtr in registry.route(frm, to):
+        node = {("CCDI", "3.1.0"): "study_personnel",
+                ("CDS", "10.0.0"): "study_personnel",
+                ("GC", "1.0"): "investigator"}[cvtr.to_model]
+        recs = [next(iter(out.values()))
+                for out in cvtr.convert_records(recs, node)]
+    fused = list(registry.convert_records(records(), frm, to,
+                                          "study_personnel", chunksize=16))
+    assert fused == [{"person": r} for r in recs]
+    assert fused[1]["person"]["given_name"] == "ANN"
+    assert fused[1]["person"]["email"] == "ann.lee1@example.org"
+    assert pickle.loads(pickle.dumps(plan)).execute(records()[:2]) == \
+        fused[:2]
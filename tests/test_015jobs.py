@@ -0,0 +1,127 @@
+import json
+import os
+import time
+import pytest
+from bento_transforms.mdf import TransformReader
+from bento_transforms.mdf.pymodels import GeneralTransform
+from bento_transforms.converters.converter import Converter
+from bento_transforms.converters import jobs
+
+
+def lenient(v):
+    return int(v) if v.isdigit() else None
+
+
+@pytest.fixture
+def cvtr(samplesd):
+    tmdf = TransformReader(samplesd / "tf_func_test.yaml",
+                           handle='transforms',
+                           mdf_schema=samplesd / "mdf-schema-tf.yaml")
+    return Converter(tmdf=tmdf)
+
+
+@pytest.fixture
+def sources(tmp_path):
+    sp = tmp_path / "study_personnel.tsv"
+    sp.write_text("type\tpersonnel_name\temail_address\n" +
+                  "".join(f"study_personnel\tZoë Earl Jönes{i}\tj{i}@x.org\n"
+                          for i in range(230)), encoding="utf-8")
+    dx = tmp_path / "diagnosis.tsv"
+    ages = [str(365 * (i % 9)) for i in range(75)]
+    ages[50] = "seven"
+    dx.write_text("type\tage_at_diagnosis\n" +
+                  "".join(f"diagnosis\t{a}\n" for a in ages))
+    return {"study_personnel": sp, "diagnosis": dx}
+
+
+def test_conversion_job(cvtr, sources, tmp_path):
+    job = cvtr.conversion_job(tmp_path / "job", sources, partition_rows=40)
+    assert [(p["node"], p["rows"]) for p in job.partitions] == (
+        [("study_personnel", 40)] * 5 + [("study_personnel", 30)] +
+        [("diagnosis", 40), ("diagnosis", 35)])
+
+    # a failing partition stops the worker; completed ones are kept
+    with pytest.raises(ValueError):
+        job.run(cvtr, processes=1, parsers={"age_at_diagnosis": int})
+    assert job.status()["pending"] == ["00007"]
+    assert not list((tmp_path / "job" / "locks").iterdir())
+
+    # resuming converts only what is left, and merges
+    job = cvtr.conversion_job(tmp_path / "job", sources, partition_rows=40)
+    res = job.run(cvtr, processes=2, parsers={"age_at_diagnosis": lenient})
+    assert res["converted"] == ["00007"]
+    ref = cvtr.convert_files(sources, tmp_path / "ref", chunksize=7,
+                             parsers={"age_at_diagnosis": lenient})
+    assert set(res["files"]) == set(ref["files"]) == {"investigator",
+                                                      "diagnosis"}
+    for (n, path) in res["files"].items():
+        assert path.read_bytes() == ref["files"][n].read_bytes()
+    ckpt = job.checkpoint("00000")
+    assert ckpt["outputs"]["investigator"]["rows"] == 40
+
+    # damaged outputs are detected and converted again
+    part = tmp_path / "job" / "parts" / "00002" / "investigator"
+    part.write_text(part.read_text()[:-20])
+    res = job.run(cvtr, processes=1, parsers={"age_at_diagnosis": lenient})
+    assert res["converted"] == ["00002"]
+    assert (res["files"]["investigator"].read_bytes() ==
+            ref["files"]["investigator"].read_bytes())
+
+    # a fresh run over several processes gives the same outputs
+    job2 = cvtr.conversion_job(tmp_path / "job2", sources,
+                               partition_rows=25)
+    res2 = job2.run(cvtr, processes=3, parsers={"age_at_diagnosis": lenient})
+    assert len(res2["converted"]) == len(job2.partitions) == 13
+    for (n, path) in res2["files"].items():
+        assert path.read_bytes() == ref["files"][n].read_bytes()
+
+
+def test_job_locks_and_checks(cvtr, sources, tmp_path, monkeypatch):
+    job = cvtr.conversion_job(tmp_path / "job", sources, partition_rows=100)
+    locks = tmp_path / "job" / "locks"
+    locks.mkdir()
+    # a live claim is respected; a dead worker's claim is taken over
+    (locks / "00001.lock").write_text(json.dumps(
+        {"host": os.uname().nodename, "pid": os.getpid(),
+         "time": time.time()}))
+    res = job.run(cvtr, processes=1, parsers={"age_at_diagnosis": lenient})
+    assert res["converted"] == ["00000", "00002", "00003"]
+    assert res["files"] is None
+    assert job.status()["pending"] == ["00001"]
+    (locks / "00001.lock").write_text(json.dumps(
+        {"host": os.uname().nodename, "pid": 2 ** 22 + 12345,
+         "time": time.time()}))
+    res = job.run(cvtr, processes=1, parsers={"age_at_diagnosis": lenient})
+    assert res["converted"] == ["00001"]
+    assert set(res["files"]) == {"investigator", "diagnosis"}
+    assert not list(locks.iterdir())
+
+    # a worker that judged a lock stale, but finds another worker's fresh
+    # lock in its place when moving it aside, puts that lock back
+    (tmp_path / "job" / "checkpoints" / "00002.json").unlink()
+    fresh = {"host": os.uname().nodename, "pid": os.getpid(),
+             "time": time.time(), "token": "t0"}
+    (locks / "00002.lock").write_text(json.dumps(fresh))
+    monkeypatch.setattr(jobs, "_stale",
+                        lambda lock, stale_after: dict(fresh, time=0))
+    assert job._claim("00002", 3600) is None
+    assert json.loads((locks / "00002.lock").read_text()) == fresh
+    assert [f.name for f in locks.iterdir()] == ["00002.lock"]
+    monkeypatch.undo()
+    job._release("00002", "t1")
+    assert (locks / "00002.lock").exists()
+    job._release("00002", "t0")
+    assert not (locks / "00002.lock").exists()
+
+    with pytest.raises(RuntimeError, match="different job"):
+        cvtr.conversion_job(tmp_path / "job", sources, partition_rows=50)
+    other = Converter(gtfs={"age": GeneralTransform(**dict(
+        cvtr.transforms["age_days_to_years"].model_dump(), Steps=[
+            {"Package": {"Name": "Identity"}, "Entrypoint": "identity"}]))})
+    with pytest.raises(RuntimeError, match="different converter"):
+        job.run(other, processes=1)
+    os.utime(sources["diagnosis"], ns=(0, 0))
+    job.verify()
+    (tmp_path / "job" / "checkpoints" / "00003.json").unlink()
+    with pytest.raises(RuntimeError, match="has changed"):
+        job.run(cvtr, processes=1, parsers={"age_at_diagnosis": lenient})